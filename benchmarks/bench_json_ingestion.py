@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bin import format_release_note, json_stream  # noqa: E402
+
+
+def setup_arg_parser():
+    """ Initialize the argument parser and set the list of arguments. """
+
+    arg_parser = argparse.ArgumentParser(
+        description="""Benchmark comparing the time and peak memory needed to
+                       read all the pull requests of a large exported JSON
+                       file, either by loading the whole file or by streaming
+                       it.""")
+    arg_parser.add_argument(
+        "-n", "--pull-requests",
+        dest="pull_requests",
+        type=int,
+        default=20000,
+        help="number of pull requests in the JSON file (default: 20000)")
+
+    return arg_parser
+
+
+def write_export(path, pull_requests_nb):
+    """ Write an exported JSON file with synthetic pull requests whose
+        description is similar in size to GitHub's. """
+
+    with open(path, "w", encoding="utf8") as json_file:
+        json.dump({
+            "total_count": pull_requests_nb,
+            "incomplete_results": False,
+            "items": [{
+                "number": number,
+                "title": "Pull request number {}".format(number),
+                "html_url": "https://github.com/o/r/pull/{}".format(number),
+                "body": "Description of the pull request. " * 40,
+                "labels": [{"name": "label{}".format(number % 20),
+                            "color": "ededed", "default": False}],
+                "user": {"login": "user{}".format(number % 500),
+                         "html_url": "https://github.com/user{}"
+                         .format(number % 500)},
+                "milestone": {"title": "v1.0.0"},
+                "pull_request": {"merged_at": "2024-01-01T00:00:00Z"},
+                "score": 1.0
+            } for number in range(pull_requests_nb)]
+        }, json_file)
+
+
+def count_fallback(path):
+    """ Count the pull requests with the pure Python incremental reader. """
+
+    with open(path, "r", encoding="utf8") as json_file:
+        return sum(1 for _ in json_stream.iter_items_fallback(json_file))
+
+
+def measure(name, function):
+    """ Measure the time and peak memory needed to run a function. """
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = function()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print("{:<20} {:>8} pull requests {:>8.2f}s {:>10.1f} MB peak"
+          .format(name, count, elapsed, peak / (1024 * 1024)))
+
+
+def main():
+    arg_parser = setup_arg_parser()
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "githublist.json")
+        write_export(path, args.pull_requests)
+        print("Input file: {:.1f} MB".format(
+            os.path.getsize(path) / (1024 * 1024)))
+
+        measure("json.load", lambda: sum(
+            1 for _ in format_release_note.iter_items(path)))
+        measure("stream (fallback)", lambda: count_fallback(path))
+        if json_stream.ijson:
+            measure("stream (ijson)", lambda: sum(
+                1 for _ in json_stream.iter_items(path)))
+
+
+if __name__ == "__main__":
+    main()
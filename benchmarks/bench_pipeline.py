@@ -0,0 +1,436 @@
+#!/usr/bin/env python
+
+import argparse
+import bisect
+import contextlib
+from datetime import datetime, timedelta, timezone
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import io
+import json
+import os
+import random
+import re
+import shlex
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bin import format_release_note, github_export_pull_requests, \
+    github_session, release_note_rules  # noqa: E402
+
+DATE_FORMAT = github_export_pull_requests.DATE_FORMAT
+# Syllables the words of the synthetic titles are made of
+SYLLABLES = ["ba", "co", "di", "fe", "gu", "ka", "lo", "mi", "ne", "po",
+             "ra", "se", "ti", "vo", "za", "bri", "cla", "dro", "fli", "gra"]
+# Maximum number of results returned by GitHub's search
+SEARCH_LIMIT = github_export_pull_requests.GITHUB_SEARCH_LIMIT
+
+
+def setup_arg_parser():
+    """ Initialize the argument parser and set the list of arguments. """
+
+    arg_parser = argparse.ArgumentParser(
+        description="""Benchmark measuring separately the time needed to
+                       export, parse, classify and render synthetic pull
+                       requests, served by a local stand-in of GitHub's search
+                       API.""")
+    arg_parser.add_argument(
+        "-n", "--pull-requests",
+        dest="pull_requests",
+        type=int,
+        nargs="+",
+        default=[100, 10000, 100000],
+        help="""numbers of pull requests of the milestones to benchmark
+                (default: 100 10000 100000)""")
+    arg_parser.add_argument(
+        "--labels",
+        type=int,
+        default=50,
+        help="number of distinct labels of the pull requests (default: 50)")
+    arg_parser.add_argument(
+        "--title-length",
+        dest="title_length",
+        type=int,
+        default=60,
+        help="approximate length of the pull requests' titles (default: 60)")
+    arg_parser.add_argument(
+        "--rules",
+        type=int,
+        default=10,
+        help="""number of rules of each kind: labels and words to include and
+                exclude (default: 10)""")
+    arg_parser.add_argument(
+        "--latency",
+        type=float,
+        default=20,
+        help="latency of the stand-in server in milliseconds (default: 20)")
+    arg_parser.add_argument(
+        "-j", "--concurrency",
+        type=int,
+        default=8,
+        help="number of result pages requested in parallel (default: 8)")
+    arg_parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="seed of the generated pull requests (default: 0)")
+
+    return arg_parser
+
+
+def get_vocabulary():
+    """ Get the words the synthetic titles are made of. """
+
+    return [first + second for first in SYLLABLES for second in SYLLABLES]
+
+
+def generate_pull_requests(pull_requests_nb, labels_nb, title_length, seed):
+    """ Generate synthetic pull requests similar to the ones returned by
+        GitHub's search, sorted by creation date. """
+
+    rng = random.Random(seed)
+    vocabulary = get_vocabulary()
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+    items = []
+    for number in range(1, pull_requests_nb + 1):
+        words = []
+        while sum(len(word) + 1 for word in words) < title_length:
+            words.append(rng.choice(vocabulary))
+        created_at = start + timedelta(minutes=number)
+        merged = rng.random() < 0.9
+        author = "user{}".format(rng.randrange(max(1, pull_requests_nb // 20)))
+        items.append({
+            "number": number,
+            "title": " ".join(words).capitalize(),
+            "html_url": "https://github.com/o/r/pull/{}".format(number),
+            "body": "Description of the pull request. " * 10,
+            "labels": [{"name": "label-{}".format(label), "color": "ededed",
+                        "default": False}
+                       for label in rng.sample(range(labels_nb),
+                                               min(labels_nb,
+                                                   rng.randrange(4)))],
+            "user": {"login": author,
+                     "html_url": "https://github.com/{}".format(author)},
+            "milestone": {"title": "v1.0.0"},
+            "state": "closed",
+            "comments": rng.randrange(20),
+            "created_at": created_at.strftime(DATE_FORMAT),
+            "updated_at": (created_at + timedelta(days=rng.randrange(30)))
+            .strftime(DATE_FORMAT),
+            "pull_request": {"merged_at": created_at.strftime(DATE_FORMAT)
+                             if merged else None},
+            "score": 1.0
+        })
+    return items
+
+
+def generate_rules(rules_nb, labels_nb):
+    """ Generate the labels and words to highlight, include and exclude. """
+
+    vocabulary = get_vocabulary()
+    labels = ["label-{}".format(label) for label in range(labels_nb)]
+    return {
+        "highlights": labels[:1],
+        "excl_labels": labels[1:1 + rules_nb],
+        "incl_labels": labels[1 + rules_nb:1 + 2 * rules_nb],
+        "excl_words": vocabulary[:rules_nb],
+        "incl_words": vocabulary[rules_nb:2 * rules_nb]
+    }
+
+
+class SearchServer(ThreadingHTTPServer):
+    """ Local stand-in of GitHub's search API, answering with the synthetic
+        pull requests after a fixed latency. It supports the pagination
+        (with Link headers), the 1000 results limit, the created:, updated:>=,
+        milestone: and state: qualifiers, the sorting used by the exporter
+        and the conditional requests (with ETag headers). The same search
+        is also available through the GraphQL API. """
+
+    daemon_threads = True
+
+    def __init__(self, items, latency):
+        super().__init__(("127.0.0.1", 0), SearchHandler)
+        self.set_items(items)
+        self.latency = latency
+        self.requests = 0
+        self.queries = []  # (query, results per page) of each request
+        self.failing_pages = set()  # Pages answered with an error
+        self.not_modified = 0  # Requests answered with a 304 Not Modified
+        self.lock = threading.Lock()
+
+    def set_items(self, items):
+        """ Replace the pull requests, which can be modified between two
+            searches. """
+
+        self.items = sorted(items, key=lambda item: item["created_at"])
+        self.created = [item["created_at"] for item in self.items]
+
+    def search(self, query):
+        """ Get the results of a search query, sorted as requested. """
+
+        start, end = 0, len(self.items)
+        sorting = "sort:updated-desc"
+        milestones, state, updated = set(), None, ""
+        for qualifier in shlex.split(query):
+            # Several milestones are combined as (milestone:a OR milestone:b)
+            qualifier = qualifier.strip("()")
+            if qualifier.startswith("created:"):
+                window_start, window_end = qualifier[8:].split("..")
+                start = bisect.bisect_left(self.created, window_start)
+                end = bisect.bisect_right(self.created, window_end)
+            elif qualifier.startswith("milestone:"):
+                milestones.add(qualifier[10:])
+            elif qualifier.startswith("state:"):
+                state = qualifier[6:]
+            elif qualifier.startswith("updated:>="):
+                updated = qualifier[10:]
+            elif qualifier.startswith("sort:"):
+                sorting = qualifier
+        results = [item for item in self.items[start:end]
+                   if (not milestones or item["milestone"] and
+                       item["milestone"]["title"] in milestones) and
+                   (not state or item.get("state", "closed") == state) and
+                   item["updated_at"] >= updated]
+        return github_export_pull_requests.sort_pull_requests(results,
+                                                              sorting)
+
+
+def to_graphql_node(item):
+    """ Convert a pull request of the search results into the node returned
+        by the GraphQL API's search. """
+
+    login = item["user"]["login"]
+    bot = login.endswith("[bot]")
+    return {
+        "number": item["number"],
+        "title": item["title"],
+        "url": item["html_url"],
+        "createdAt": item["created_at"],
+        "updatedAt": item["updated_at"],
+        "mergedAt": item["pull_request"]["merged_at"],
+        "comments": {"totalCount": item["comments"]},
+        "milestone": item["milestone"],
+        "author": {"__typename": "Bot" if bot else "User",
+                   "login": login[:-len("[bot]")] if bot else login,
+                   "url": item["user"]["html_url"]},
+        "labels": {"nodes": [{"name": label["name"]}
+                             for label in item["labels"]]}
+    }
+
+
+class SearchHandler(BaseHTTPRequestHandler):
+    """ Handler of the requests sent to the stand-in search API. """
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        url = urlsplit(self.path)
+        parameters = parse_qs(url.query)
+        page = int(parameters.get("page", ["1"])[0])
+        per_page = int(parameters.get("per_page", ["30"])[0])
+        with self.server.lock:
+            self.server.requests = self.server.requests + 1
+            self.server.queries.append((parameters["q"][0], per_page))
+
+        if page in self.server.failing_pages:
+            self.send_error(422, "Page {} failed".format(page))
+            return
+        results = self.server.search(parameters["q"][0])
+
+        # Results beyond the search limit are never returned
+        available = min(len(results), SEARCH_LIMIT)
+        last_page = max(1, -(-available // per_page))
+        body = json.dumps({
+            "total_count": len(results),
+            "incomplete_results": False,
+            "items": results[(page - 1) * per_page:
+                             min(page * per_page, available)]
+        }).encode("utf8")
+        etag = '"{}"'.format(hashlib.sha256(body).hexdigest())
+
+        if self.headers.get("If-None-Match") == etag:
+            with self.server.lock:
+                self.server.not_modified = self.server.not_modified + 1
+            self.send_response(304)
+            body = b""
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("X-RateLimit-Resource", "search")
+        self.send_header("X-RateLimit-Limit", "1000000")
+        self.send_header("X-RateLimit-Remaining", "1000000")
+        self.send_header("X-RateLimit-Reset", str(int(time.time()) + 60))
+        if page < last_page:
+            links = []
+            for relation, target in (("next", page + 1), ("last", last_page)):
+                parameters["page"] = [str(target)]
+                links.append('<http://{}:{}{}?{}>; rel="{}"'.format(
+                    *self.server.server_address, url.path,
+                    urlencode(parameters, doseq=True), relation))
+            self.send_header("Link", ", ".join(links))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        time.sleep(self.server.latency)
+        request = json.loads(self.rfile.read(
+            int(self.headers["Content-Length"])))
+        variables = request["variables"]
+        per_page = int(re.search(r"first: (\d+)", request["query"]).group(1))
+        with self.server.lock:
+            self.server.requests = self.server.requests + 1
+            self.server.queries.append((variables["query"], per_page))
+        results = self.server.search(variables["query"])
+
+        # The cursors are the offsets of the next results
+        available = min(len(results), SEARCH_LIMIT)
+        start = int(variables.get("cursor") or 0)
+        end = min(start + per_page, available)
+        body = json.dumps({"data": {"search": {
+            "issueCount": len(results),
+            "pageInfo": {"hasNextPage": end < available,
+                         "endCursor": str(end)},
+            "nodes": [to_graphql_node(item) for item in results[start:end]]
+        }}}).encode("utf8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("X-RateLimit-Resource", "graphql")
+        self.send_header("X-RateLimit-Limit", "1000000")
+        self.send_header("X-RateLimit-Remaining", "1000000")
+        self.send_header("X-RateLimit-Reset", str(int(time.time()) + 60))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_):
+        pass
+
+
+def classify(records, rules):
+    """ Classify the pull requests records into the sections of the release
+        note, in the same way as format_release_note.execute does. """
+
+    sections = {section: {} for section in (
+        release_note_rules.LABEL_EXCLUDED, release_note_rules.LABEL_INCLUDED,
+        release_note_rules.WORD_EXCLUDED, release_note_rules.WORD_INCLUDED)}
+    highlighted, regular, authors = [], [], set()
+    for record in records:
+        if not record.merged:
+            continue
+        authors.add(record.author)
+        section, key = rules.classify(record.title, record.labels)
+        if section == release_note_rules.HIGHLIGHTED:
+            highlighted.append(record)
+        elif section == release_note_rules.REGULAR:
+            regular.append(record)
+        else:
+            sections[section].setdefault(key, []).append(record)
+    return highlighted, regular, sections, authors
+
+
+def render(classified, milestone_title):
+    """ Render all the documents of the release note. """
+
+    highlighted, regular, sections, authors = classified
+    documents = [format_release_note.render_final_release_note(
+        regular, milestone_title, highlighted,
+        sections[release_note_rules.LABEL_INCLUDED],
+        sections[release_note_rules.WORD_INCLUDED], True, authors)]
+    documents.extend(format_release_note.render_excluded_prs_notes(
+        sections[release_note_rules.LABEL_EXCLUDED],
+        sections[release_note_rules.WORD_EXCLUDED], True).values())
+    documents.append(format_release_note.render_authors(authors))
+    return documents
+
+
+def measure(timings, stage, function):
+    """ Measure the time needed to run a function, and return its result. """
+
+    start = time.perf_counter()
+    result = function()
+    timings[stage] = time.perf_counter() - start
+    return result
+
+
+def benchmark(pull_requests_nb, args, directory):
+    """ Run all the stages of the benchmark for a number of pull requests,
+        and return the time spent in each of them. """
+
+    items = generate_pull_requests(pull_requests_nb, args.labels,
+                                   args.title_length, args.seed)
+    options = generate_rules(args.rules, args.labels)
+    timings = {}
+
+    server = SearchServer(items, args.latency / 1000)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    github_session.GITHUB_API_URL = "http://{}:{}".format(
+        *server.server_address)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            pull_requests = measure(
+                timings, "export",
+                lambda: github_export_pull_requests.request_pull_requests(
+                    "repo:o/r", "milestone:v1.0.0", "sort:updated-desc",
+                    "benchmark", concurrency=args.concurrency))
+    finally:
+        server.shutdown()
+        server.server_close()
+    timings["requests"] = server.requests
+
+    path = os.path.join(directory, "githublist.json")
+    github_export_pull_requests.save_pull_requests(pull_requests, path)
+
+    records = measure(timings, "parse", lambda: list(
+        format_release_note.iter_pull_requests(path)))
+    rules = release_note_rules.RuleSet(
+        format_release_note.setup_highlighted_labels(options["highlights"]),
+        format_release_note.setup_labels_of_interest(options["excl_labels"]),
+        format_release_note.setup_labels_of_interest(options["incl_labels"]),
+        format_release_note.setup_words_of_interest(options["excl_words"]),
+        format_release_note.setup_words_of_interest(options["incl_words"]))
+    classified = measure(timings, "classify",
+                         lambda: classify(records, rules))
+    measure(timings, "render", lambda: render(classified, "v1.0.0"))
+
+    # Whole formatting, including the writing of the files
+    with contextlib.redirect_stdout(io.StringIO()):
+        measure(timings, "format", lambda: format_release_note.execute(
+            path, False, True, options["highlights"], options["excl_labels"],
+            options["incl_labels"], options["excl_words"],
+            options["incl_words"],
+            output_options=format_release_note.OutputOptions(
+                output_dir=directory)))
+
+    if len(pull_requests["items"]) != pull_requests_nb:
+        print("Warning: {} pull requests exported out of {}".format(
+            len(pull_requests["items"]), pull_requests_nb))
+    return timings
+
+
+def main():
+    arg_parser = setup_arg_parser()
+    args = arg_parser.parse_args()
+
+    print("{:>8} {:>9} {:>9} {:>9} {:>9} {:>9} {:>9}".format(
+        "PRs", "requests", "export", "parse", "classify", "render", "format"))
+    for pull_requests_nb in args.pull_requests:
+        with tempfile.TemporaryDirectory() as directory:
+            timings = benchmark(pull_requests_nb, args, directory)
+        print("{:>8} {:>9} {:>8.3f}s {:>8.3f}s {:>8.3f}s {:>8.3f}s {:>8.3f}s"
+              .format(pull_requests_nb, timings["requests"],
+                      timings["export"], timings["parse"],
+                      timings["classify"], timings["render"],
+                      timings["format"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+
+import contextlib
+import os
+import secrets
+import stat
+
+# Permissions requested for the temporary files, which the process' umask
+# then restricts as for any file it creates
+FILE_MODE = 0o666
+
+
+def create_temp_file(path):
+    """ Create a uniquely named temporary file in the same directory as a
+        file, and return its file descriptor and path. If the file exists,
+        the temporary file is given its permissions, otherwise the ones of a
+        new file. """
+
+    directory, filename = os.path.split(path)
+    while True:
+        temp_path = os.path.join(directory or ".", "{}.{}.tmp".format(
+            filename, secrets.token_hex(4)))
+        try:
+            descriptor = os.open(temp_path, os.O_WRONLY | os.O_CREAT |
+                                 os.O_EXCL | getattr(os, "O_BINARY", 0),
+                                 FILE_MODE)
+            break
+        except FileExistsError:
+            continue
+
+    try:
+        os.chmod(temp_path, stat.S_IMODE(os.stat(path).st_mode))
+    except FileNotFoundError:
+        pass
+    except BaseException:
+        os.close(descriptor)
+        os.remove(temp_path)
+        raise
+    return descriptor, temp_path
+
+
+@contextlib.contextmanager
+def atomic_write(path, mode="w", encoding="utf8"):
+    """ Open a file to write through a uniquely named temporary file, created
+        in the same directory, which atomically replaces the file once it has
+        been written and closed. The file is never seen partially written,
+        and concurrent writers of the same file do not share their temporary
+        file: the last one to finish wins. The file keeps its permissions if
+        it already exists. The temporary file is removed if the writing
+        fails. """
+
+    descriptor, temp_path = create_temp_file(path)
+    try:
+        with os.fdopen(descriptor, mode, encoding=(
+                None if "b" in mode else encoding)) as temp_file:
+            yield temp_file
+        os.replace(temp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temp_path)
+        raise
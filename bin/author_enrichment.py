@@ -0,0 +1,286 @@
+#!/usr/bin/env python
+
+import hashlib
+import json
+import os
+import time
+from requests.exceptions import RequestException
+
+try:
+    from bin import atomic_file, github_cache, github_session
+except ImportError:  # Executed as a stand-alone script from the bin folder
+    import atomic_file
+    import github_cache
+    import github_session
+
+DEFAULT_CACHE_DIR = os.path.join(github_cache.DEFAULT_CACHE_DIR, "authors")
+DEFAULT_TTL = 7 * 24  # Hours
+
+# Users looked up in a single GraphQL request, each one through its alias
+USERS_PER_REQUEST = 100
+# Pull requests whose commits are looked up in a single GraphQL request: each
+# one costs up to 100 commits of 10 authors in GraphQL's limit of nodes
+PULL_REQUESTS_PER_REQUEST = 50
+# Authors whose previous merged pull requests are counted in a single GraphQL
+# request, each one through its own search
+SEARCHES_PER_REQUEST = 50
+
+USER_FIELDS = """
+    login
+    name
+    url
+"""
+
+COMMIT_AUTHORS_FIELDS = """
+    ... on PullRequest {
+      commits(first: 100) {
+        nodes {
+          commit {
+            authors(first: 10) {
+              nodes {
+                user {
+                  login
+                  name
+                  url
+                }
+              }
+            }
+          }
+        }
+      }
+    }
+"""
+
+
+class AuthorCache:
+    """ On-disk cache of the users, pull requests and searches looked up to
+        enrich the authors, shared by all the milestones. Every entry is
+        stored in its own file along with the time it was looked up, and is
+        looked up again once it is older than the time to live (in
+        hours). """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, ttl=DEFAULT_TTL):
+        self.directory = directory
+        self.ttl = ttl * 3600
+        os.makedirs(directory, exist_ok=True)
+
+    def get_path(self, key):
+        """ Get the path of the file caching an entry. """
+
+        digest = hashlib.sha256(key.encode("utf8")).hexdigest()
+        return os.path.join(self.directory, "{}.json".format(digest))
+
+    def load(self, key):
+        """ Load a cached entry, or None if there is none or if it
+            expired. """
+
+        try:
+            with open(self.get_path(key), "r", encoding="utf8") as cache_file:
+                entry = json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - entry["cached_at"] > self.ttl:
+            return None
+        return entry["value"]
+
+    def store(self, key, value):
+        """ Save an entry, replacing the previous one atomically. """
+
+        path = self.get_path(key)
+        with atomic_file.atomic_write(path) as cache_file:
+            json.dump({"key": key, "cached_at": time.time(), "value": value},
+                      cache_file)
+
+
+def get_users_query(count):
+    """ Get the GraphQL query looking up count users at once, the login of
+        each one being provided in the $loginN variable. """
+
+    return "query({}) {{\n{}}}\n".format(
+        ", ".join("$login{}: String!".format(index)
+                  for index in range(count)),
+        "".join("  user{0}: user(login: $login{0}) {{{1}  }}\n".format(
+            index, USER_FIELDS) for index in range(count)))
+
+
+def get_commit_authors_query(count):
+    """ Get the GraphQL query looking up the authors of the commits of count
+        pull requests at once, the link of each one being provided in the
+        $urlN variable. """
+
+    return "query({}) {{\n{}}}\n".format(
+        ", ".join("$url{}: URI!".format(index) for index in range(count)),
+        "".join("  pull{0}: resource(url: $url{0}) {{{1}  }}\n".format(
+            index, COMMIT_AUTHORS_FIELDS) for index in range(count)))
+
+
+def get_search_counts_query(count):
+    """ Get the GraphQL query counting the results of count searches at
+        once, the search query of each one being provided in the $queryN
+        variable. """
+
+    return "query({}) {{\n{}}}\n".format(
+        ", ".join("$query{}: String!".format(index) for index in range(count)),
+        "".join("  search{0}: search(query: $query{0}, type: ISSUE, first: 1) "
+                "{{ issueCount }}\n".format(index) for index in range(count)))
+
+
+def get_repository(link):
+    """ Get the repository ("owner/repo") of a pull request from its
+        link. """
+
+    return "/".join(link.split("/")[3:5])
+
+
+def send_query(session, query, variables):
+    """ Send a GraphQL query and return its data. Users that do not exist
+        (anymore), such as the bots, are not reported as errors. """
+
+    response = github_session.send_request(
+        session, "{}/graphql".format(github_session.GITHUB_API_URL),
+        json_data={"query": query, "variables": variables})
+
+    if response.status_code != 200:
+        print(response.json().get("message"))
+        response.raise_for_status()
+    data = github_session.decode_json(session, response)
+    errors = [error for error in data.get("errors") or ()
+              if error.get("type") != "NOT_FOUND"]
+    if errors:
+        for error in errors:
+            print(error.get("message"))
+        raise RequestException("GraphQL request failed")
+    return data["data"]
+
+
+class AuthorEnrichment:
+    """ Enrichment of the pull requests authors with what GitHub's search
+        results do not provide: the co-authors of the pull requests (the
+        authors of their commits, which include the Co-authored-by
+        trailers), the display name of every contributor, and whether they
+        contributed to the repository for the first time. Pull requests,
+        users and searches are looked up by batches through GraphQL aliases,
+        so that the contributors of a whole milestone only cost a few
+        requests, and they are cached on disk if a cache is provided, so
+        that the following milestones only look up the new ones. """
+
+    def __init__(self, token, cache=None, report=None):
+        self.session = github_session.create_session(token, report=report)
+        self.cache = cache
+
+    def lookup(self, kind, keys, batch_size, request_batch):
+        """ Get the values of the keys of a kind, from the cache if they are
+            cached, or by requesting the missing ones by batches otherwise.
+            request_batch returns the values of a batch of keys, in the same
+            order. """
+
+        values = {}
+        missing = []
+        for key in sorted(set(keys)):
+            value = self.cache.load("{}:{}".format(kind, key)) \
+                if self.cache else None
+            if value is None:
+                missing.append(key)
+            else:
+                values[key] = value
+
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            for key, value in zip(batch, request_batch(batch)):
+                values[key] = value
+                if self.cache:
+                    self.cache.store("{}:{}".format(kind, key), value)
+        return values
+
+    def request_users(self, logins):
+        """ Request the display names of a batch of users. """
+
+        data = send_query(self.session, get_users_query(len(logins)),
+                          {"login{}".format(index): login
+                           for index, login in enumerate(logins)})
+        return [{"name": (data["user{}".format(index)] or {}).get("name")}
+                for index in range(len(logins))]
+
+    def request_commit_authors(self, links):
+        """ Request the authors of the commits of a batch of pull requests,
+            identified by their links. Only the first 100 commits of each
+            pull request are considered, and the commits authors who are not
+            GitHub users are ignored. """
+
+        data = send_query(self.session, get_commit_authors_query(len(links)),
+                          {"url{}".format(index): link
+                           for index, link in enumerate(links)})
+
+        values = []
+        for index in range(len(links)):
+            pull_request = data["pull{}".format(index)] or {}
+            users = {}
+            for commit in (pull_request.get("commits") or {}).get("nodes",
+                                                                  ()):
+                for author in commit["commit"]["authors"]["nodes"]:
+                    user = author["user"]
+                    if user:
+                        users[user["login"]] = [user["login"], user["name"],
+                                                user["url"]]
+            values.append({"authors": [users[login]
+                                       for login in sorted(users)]})
+        return values
+
+    def request_search_counts(self, queries):
+        """ Request the number of results of a batch of searches. """
+
+        data = send_query(self.session, get_search_counts_query(len(queries)),
+                          {"query{}".format(index): query
+                           for index, query in enumerate(queries)})
+        return [{"count": data["search{}".format(index)]["issueCount"]}
+                for index in range(len(queries))]
+
+    def find_first_time_authors(self, first_merges):
+        """ Find the first-time contributors among the authors of a
+            milestone. first_merges provides the merge date and the link of
+            the earliest merged pull request of each author, a (login,
+            profile link) tuple, in the milestone: the authors who had no
+            pull request merged in the repository before it are first-time
+            contributors. Since the pull requests merged before a date do
+            not change, the searches are cached like the other lookups. The
+            bots, which cannot be searched as authors, are never first-time
+            contributors. """
+
+        queries = {}
+        for author, (merged_at, link) in first_merges.items():
+            if not author[0].endswith("[bot]"):
+                queries[author] = "repo:{} is:pr is:merged author:{} " \
+                    "merged:<{}".format(get_repository(link), author[0],
+                                        merged_at)
+
+        counts = self.lookup("search", queries.values(), SEARCHES_PER_REQUEST,
+                             self.request_search_counts)
+        return {author for author, query in queries.items()
+                if counts[query]["count"] == 0}
+
+    def enrich(self, authors, links):
+        """ Enrich the authors, a set of (login, profile link), of the pull
+            requests identified by their links. Return the set of the
+            co-authors who are not among the authors, with the same
+            structure, and the display names of all of them indexed by their
+            login (None for the users without one). """
+
+        logins = {login for login, _ in authors}
+        co_authors = set()
+        names = {}
+
+        commit_authors = self.lookup("pull", links, PULL_REQUESTS_PER_REQUEST,
+                                     self.request_commit_authors)
+        for value in commit_authors.values():
+            for login, name, url in value["authors"]:
+                names[login] = name
+                if login not in logins:
+                    co_authors.add((login, url))
+
+        users = self.lookup("user", logins - names.keys(), USERS_PER_REQUEST,
+                            self.request_users)
+        for login, value in users.items():
+            names[login] = value["name"]
+
+        return co_authors, names
@@ -1,7 +1,32 @@
 #!/usr/bin/env python
 
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 import json
+import os
+import sys
+import time
+from requests.exceptions import RequestException
+
+try:
+    from bin import atomic_file, author_enrichment, json_stream, \
+        pull_request_record, pull_request_store, release_note_manifest, \
+        release_note_rules, run_report
+except ImportError:  # Executed as a stand-alone script from the bin folder
+    import atomic_file
+    import author_enrichment
+    import json_stream
+    import pull_request_record
+    import pull_request_store
+    import release_note_manifest
+    import release_note_rules
+    import run_report
+
+# Maximum number of files written at the same time
+MAX_WRITERS = 8
+# Version of the documents' format, part of their content's fingerprint: it
+# has to be increased when the rendering of the documents changes
+DOCUMENTS_VERSION = 1
 
 
 def setup_arg_parser():
@@ -20,17 +45,105 @@ def setup_arg_parser():
         "-i", "--input",
         default="githublist.json",
         help="path of the file to parse and format (default: githublist.json)")
+    arg_parser.add_argument(
+        "--stream",
+        action="store_true",
+        default=False,
+        help="""read the pull requests of the input file one by one instead of
+                loading the whole file in memory, which is useful for very
+                large files (ijson is used to parse the file if it is
+                installed)""")
+    arg_parser.add_argument(
+        "--store",
+        help="""SQLite store the pull requests are selected from instead of
+                the input file, with --repository and --milestone""")
+    arg_parser.add_argument(
+        "--repository",
+        help="repository (OWNER/REPO) of the pull requests to select with "
+             "--store")
+    arg_parser.add_argument(
+        "--milestone",
+        help="milestone of the pull requests to select with --store")
+    arg_parser.add_argument(
+        "--report-json",
+        dest="report_json",
+        help="""JSON file in which the run report is written: time spent
+                reading, classifying, rendering and writing the pull requests
+                along with the counters of the final report""")
+    arg_parser.add_argument(
+        "--classify-jobs",
+        dest="classify_jobs",
+        type=int,
+        default=1,
+        help="""number of processes classifying the pull requests in
+                parallel, which is useful for very large inputs (default: 1,
+                the pull requests are classified by the main process)""")
+    arg_parser.add_argument(
+        "--stdout",
+        action="store_true",
+        default=False,
+        help="""print the release note on the standard output instead of
+                writing it in a file, followed by the other documents (the
+                authors and the excluded pull requests) if there are some, so
+                that no file is written; the final report is then printed on
+                the error output""")
+    arg_parser.add_argument(
+        "--output-dir",
+        dest="output_dir",
+        help="""directory in which the markdown files are written (default:
+                the current directory)""")
     arg_parser.add_argument(
         "--authors",
         action="store_true",
         default=False,
         help="save the list of pull requests authors in a dedicated file")
+    arg_parser.add_argument(
+        "--enrich-authors",
+        dest="enrich_authors",
+        action="store_true",
+        default=False,
+        help="""add the co-authors of the pull requests (the authors of their
+                commits, including the Co-authored-by trailers) to the
+                contributors, show their display names, and list the
+                contributors who had no pull request merged in the
+                repository before this milestone in a dedicated section; the
+                users, pull requests and searches are looked up by batches
+                with GitHub's GraphQL API, which requires --token""")
+    arg_parser.add_argument(
+        "-t", "--token",
+        help="GitHub authentication token, needed by --enrich-authors")
+    arg_parser.add_argument(
+        "--author-cache-dir",
+        dest="author_cache_dir",
+        default=author_enrichment.DEFAULT_CACHE_DIR,
+        help="""directory in which the users, pull requests and searches
+                looked up by --enrich-authors are cached for the following
+                milestones (default: {})"""
+        .format(author_enrichment.DEFAULT_CACHE_DIR))
+    arg_parser.add_argument(
+        "--author-cache-ttl",
+        dest="author_cache_ttl",
+        type=float,
+        default=author_enrichment.DEFAULT_TTL,
+        help="""number of hours after which the cached users, pull
+                requests and searches are looked up again (default: {})"""
+        .format(author_enrichment.DEFAULT_TTL))
     arg_parser.add_argument(
         "--pr-nb",
         dest="pr_nb",
         action="store_true",
         default=False,
         help="include the merged pull requests' number with their link")
+    arg_parser.add_argument(
+        "--skip-unchanged",
+        dest="skip_unchanged",
+        action="store_true",
+        default=False,
+        help="""keep the fingerprint of the release note's content in a
+                manifest of the output directory, and only render and write
+                its files again if the classified pull requests, the
+                contributors or the rules changed since the previous run;
+                only the files whose content changed are then written""")
     arg_parser.add_argument(
         "--highlights",
         nargs="+",
@@ -151,131 +264,291 @@ def setup_highlighted_labels(highlighted_labels):
     return labels
 
 
-def get_pr_labels(data):
-    """ Get the list of the pull request's labels (if any). """
-
-    labels = []
-    pr_labels = data["labels"]
-    if pr_labels:
-        for label in pr_labels:
-            labels.append(label["name"])
-    return labels
-
-
-def write_authors(authors, milestone_title):
-    """ Write the file containing the list of the pull requests authors. """
-
-    with open("{}-authors.md".format(milestone_title), "w",
-              encoding="utf8") as authors_file:
-        authors_file.write("## Contributors\n\n")
-        cnt = 0
-        for author, url in sorted(list(authors), key=lambda x:
-                                  x[0].casefold()):
-            if cnt > 0:
-                authors_file.write(", ")
-            authors_file.write("[{}]({})".format(author, url))
-            cnt = cnt + 1
-
-
-def write_excluded_prs_note(excluded_pull_requests,
-                            excluded_word_pull_requests,
-                            milestone_title, show_pr_nb):
-    """ Write the files containing the excluded labels.
-        Concatenated labels will be written in the same file together. """
-
-    for excluded_labels, labeled_prs in excluded_pull_requests.items():
-        # Remove characters that might cause issues with the filename
-        filename = excluded_labels.replace(
-            ":", "").replace("/", "").replace("?", "")
-
-        with open("{}-{}.md".format(milestone_title, filename),
-                  "w", encoding="utf8") as excluded_prs_file:
-            excluded_prs_file.write("### {}\n\n".format(excluded_labels))
-            for (title, link, number) in labeled_prs:
-                excluded_prs_file.write(
-                    "- {} [PR{}]({})\n".
-                    format(title, " " + number if show_pr_nb else "", link))
-
-    for excluded_words, prs in excluded_word_pull_requests.items():
-        filename = excluded_words.replace(
-            ":", "").replace("/", "").replace("?", "")
-
-        with open("{}-{}.md".format(milestone_title, filename),
-                  "w", encoding="utf8") as excluded_prs_file:
-            excluded_prs_file.write("### {}\n\n".format(excluded_words))
-            for (title, link, number) in prs:
-                excluded_prs_file.write(
-                    "- {} [PR{}]({})\n".
-                    format(title, " " + number if show_pr_nb else "", link))
-
-
-def write_final_release_note(pull_requests, milestone_title,
-                             highlighted_pull_requests, included_pull_requests,
-                             included_word_pull_requests, show_pr_nb,
-                             authors):
-    """ Write the final release note containing all the pull requests that were
-        correctly merged and not excluded because of their labels. Labels that
-        are included will be written in a different subsection. """
-
-    with open("{}-release-note.md".format(milestone_title),
-              "w", encoding="utf8") as release_note:
-        release_note.write("# Release note\n\n")
-        release_note.write("## {}\n\n".format(milestone_title))
-        if len(highlighted_pull_requests) > 0:
-            release_note.write("### Main features\n\n")
-            for (title, link, number) in highlighted_pull_requests:
-                release_note.write("- {} [PR{}]({})\n"
-                                   .format(title,
-                                           " " + number if show_pr_nb else "",
-                                           link))
-            release_note.write("\n### Other improvements\n\n")
-        for (title, link, number) in pull_requests:
-            release_note.write("- {} [PR{}]({})\n"
-                               .format(title,
-                                       " " + number if show_pr_nb else "",
-                                       link))
-        for included_labels, labeled_prs in included_pull_requests.items():
-            release_note.write("\n### {}\n\n".format(included_labels))
-            for (title, link, number) in labeled_prs:
-                release_note.write("- {} [PR{}]({})\n"
-                                   .format(title,
-                                           " " + number if show_pr_nb else "",
-                                           link))
-        for included_words, prs in included_word_pull_requests.items():
-            release_note.write("\n### {}\n\n".format(included_words))
-            for (title, link, number) in prs:
-                release_note.write("- {} [PR{}]({})\n"
-                                   .format(title,
-                                           " " + number if show_pr_nb else "",
-                                           link))
-
-        release_note.write("\n### Contributors\n\n")
-        cnt = 0
-        for author, url in sorted(list(authors), key=lambda x:
-                                  x[0].casefold()):
-            if cnt > 0:
-                release_note.write(", ")
-            release_note.write("[{}]({})".format(author, url))
-            cnt = cnt + 1
-
-
-def execute(input_file, export_authors, show_pr_nb, highlights, excl_labels,
-            incl_labels, excl_words, incl_words):
-    with open("{}".format(input_file), "r") as json_file:
-        data = json.load(json_file)
-
-    # Check that there are pull requests to parse in the input file.
-    # If the file does not directly come from the GitHub API, its structure
-    # might be different and this tests will thus fail.
-    pull_requests_data = data["items"]
-    if len(pull_requests_data) == 0:
-        print("No pull requests to parse in {}".format(input_file))
+def render_pull_requests(pull_requests, show_pr_nb):
+    """ Render a list of pull requests records as markdown, one pull request
+        per line. """
+
+    if show_pr_nb:
+        return "".join("- {} [{}]({})\n".format(pr.title, pr.link_text,
+                                                 pr.link)
+                       for pr in pull_requests)
+    return "".join("- {} [PR]({})\n".format(pr.title, pr.link)
+                   for pr in pull_requests)
+
+
+def render_authors_list(authors, names=None):
+    """ Render the list of the pull requests authors, sorted alphabetically,
+        as markdown links separated by commas. The authors are named after
+        their display name if one is provided in names, indexed by login,
+        or after their login otherwise. """
+
+    names = names or {}
+    return ", ".join("[{}]({})".format(name, url)
+                     for name, url in sorted(((names.get(author) or author,
+                                               url)
+                                              for author, url in authors),
+                                             key=lambda x: x[0].casefold()))
+
+
+def render_authors(authors, names=None, first_time_authors=None):
+    """ Render the document containing the list of the pull requests
+        authors, followed by the list of the first-time contributors if
+        there are some. """
+
+    document = "## Contributors\n\n{}".format(
+        render_authors_list(authors, names))
+    if first_time_authors:
+        document = "{}\n\n## New contributors\n\n{}".format(
+            document, render_authors_list(first_time_authors, names))
+    return document
+
+
+def render_excluded_prs_notes(excluded_pull_requests,
+                              excluded_word_pull_requests, show_pr_nb):
+    """ Render the documents containing the excluded labels and words, and
+        return them in a dictionary indexed by the excluded labels or words.
+        Concatenated labels will be rendered in the same document
+        together. """
+
+    documents = {}
+    for excluded_prs in (excluded_pull_requests, excluded_word_pull_requests):
+        for excluded_key, prs in excluded_prs.items():
+            documents[excluded_key] = "### {}\n\n{}".format(
+                excluded_key, render_pull_requests(prs, show_pr_nb))
+    return documents
+
+
+def render_final_release_note(pull_requests, milestone_title,
+                              highlighted_pull_requests,
+                              included_pull_requests,
+                              included_word_pull_requests, show_pr_nb,
+                              authors, names=None, first_time_authors=None):
+    """ Render the final release note containing all the pull requests that
+        were correctly merged and not excluded because of their labels. Labels
+        that are included will be rendered in a different subsection. The
+        first-time contributors, if there are some, are listed after the
+        contributors. """
+
+    parts = ["# Release note\n\n", "## {}\n\n".format(milestone_title)]
+    if len(highlighted_pull_requests) > 0:
+        parts.append("### Main features\n\n")
+        parts.append(render_pull_requests(highlighted_pull_requests,
+                                          show_pr_nb))
+        parts.append("\n### Other improvements\n\n")
+    parts.append(render_pull_requests(pull_requests, show_pr_nb))
+    for included_prs in (included_pull_requests, included_word_pull_requests):
+        for included_key, prs in included_prs.items():
+            parts.append("\n### {}\n\n".format(included_key))
+            parts.append(render_pull_requests(prs, show_pr_nb))
+
+    parts.append("\n### Contributors\n\n")
+    parts.append(render_authors_list(authors, names))
+    if first_time_authors:
+        parts.append("\n\n### New contributors\n\n")
+        parts.append(render_authors_list(first_time_authors, names))
+    return "".join(parts)
+
+
+def get_excluded_prs_filename(excluded_key, milestone_title):
+    """ Get the name of the file containing excluded labels or words. """
+
+    # Remove characters that might cause issues with the filename
+    filename = excluded_key.replace(
+        ":", "").replace("/", "").replace("?", "")
+    return "{}-{}.md".format(milestone_title, filename)
+
+
+def write_document(document, filename, output=None, output_dir=None,
+                   report=None):
+    """ Write a rendered document with a single call, either in a file-like
+        object if one is provided, or in the named file otherwise (in the
+        output directory, if one is provided). Files are written in a
+        temporary file first, which then atomically replaces the named file,
+        so that a partially written document is never visible. The writing is
+        timed in the run report if one is provided. """
+
+    with run_report.measure(report, "write {}".format(filename)):
+        if output is not None:
+            output.write(document)
+            return
+
+        if output_dir:
+            filename = os.path.join(output_dir, filename)
+        with atomic_file.atomic_write(filename) as document_file:
+            document_file.write(document)
+
+
+def write_documents(documents, output_dir=None, report=None):
+    """ Write rendered documents, provided as a dictionary indexed by their
+        filename, in their own files. The files are written concurrently, so
+        that the time needed to write them all is bounded by the slowest one
+        rather than by the sum of all of them, which matters on network
+        filesystems where opening and closing each file is costly. """
+
+    if len(documents) <= 1:
+        for filename, document in documents.items():
+            write_document(document, filename, output_dir=output_dir,
+                           report=report)
         return
 
-    milestone_title = pull_requests_data[0]["milestone"]["title"]
+    with ThreadPoolExecutor(
+            max_workers=min(len(documents), MAX_WRITERS)) as executor:
+        futures = [executor.submit(write_document, document, filename,
+                                   output_dir=output_dir, report=report)
+                   for filename, document in documents.items()]
+        # Raise the first error encountered, if any
+        for future in futures:
+            future.result()
+
+
+def render_documents(pull_requests, milestone_title,
+                     highlighted_pull_requests, included_pull_requests,
+                     included_word_pull_requests, excluded_pull_requests,
+                     excluded_word_pull_requests, show_pr_nb, authors,
+                     export_authors, names=None, first_time_authors=None):
+    """ Render all the documents of the release note in memory, and return
+        them in a dictionary indexed by their filename: the list of the pull
+        requests authors (if export_authors is set), the final release note
+        and the documents containing the excluded labels and words. """
+
+    documents = {}
+    if export_authors:
+        documents["{}-authors.md".format(milestone_title)] = \
+            render_authors(authors, names, first_time_authors)
+    documents["{}-release-note.md".format(milestone_title)] = \
+        render_final_release_note(
+            pull_requests, milestone_title, highlighted_pull_requests,
+            included_pull_requests, included_word_pull_requests, show_pr_nb,
+            authors, names, first_time_authors)
+    for excluded_key, document in render_excluded_prs_notes(
+            excluded_pull_requests, excluded_word_pull_requests,
+            show_pr_nb).items():
+        documents[get_excluded_prs_filename(excluded_key,
+                                            milestone_title)] = document
+    return documents
+
+
+def get_documents_content(pull_requests, milestone_title,
+                          highlighted_pull_requests, included_pull_requests,
+                          included_word_pull_requests, excluded_pull_requests,
+                          excluded_word_pull_requests, show_pr_nb, authors,
+                          export_authors, names, first_time_authors, rules):
+    """ Get the content the documents of the release note are rendered from,
+        as JSON serializable data whose fingerprint changes whenever one of
+        the documents would be rendered differently. """
+
+    def get_records_content(records):
+        return [[pr.number, pr.title, pr.link] for pr in records]
+
+    def get_sections_content(sections):
+        return [[key, get_records_content(prs)]
+                for key, prs in sections.items()]
+
+    return {
+        "version": DOCUMENTS_VERSION,
+        "milestone": milestone_title,
+        "rules": rules,
+        "show_pr_nb": show_pr_nb,
+        "export_authors": export_authors,
+        "pull_requests": get_records_content(pull_requests),
+        "highlighted": get_records_content(highlighted_pull_requests),
+        "included_labels": get_sections_content(included_pull_requests),
+        "included_words": get_sections_content(included_word_pull_requests),
+        "excluded_labels": get_sections_content(excluded_pull_requests),
+        "excluded_words": get_sections_content(excluded_word_pull_requests),
+        "authors": sorted(authors),
+        "names": names,
+        "first_time_authors": sorted(first_time_authors)
+        if first_time_authors is not None else None
+    }
+
+
+def load_pull_requests(input_file):
+    """ Load the pull requests exported in a JSON file. """
 
-    authors = set()  # Contains the username of contributors
-    pull_requests = []  # Contains tuples (title, link, number)
+    with open("{}".format(input_file), "r") as json_file:
+        return json.load(json_file)
+
+
+def iter_items(input_data, stream_input=False):
+    """ Iterate over the pull requests of the input data, which can either be
+        the path of a JSON file, the pull requests as exported from GitHub,
+        or an iterable over the pages of the response as they are received
+        from GitHub. If stream_input is set, the JSON file is read
+        incrementally instead of being loaded at once. """
+
+    if isinstance(input_data, str):
+        if stream_input:
+            yield from json_stream.iter_items(input_data)
+            return
+        input_data = load_pull_requests(input_data)
+    if isinstance(input_data, dict):
+        input_data = [input_data]
+
+    for page in input_data:
+        yield from page["items"]
+
+
+def iter_pull_requests(input_data, stream_input=False):
+    """ Iterate over the records of the pull requests of the input data,
+        which are built as soon as each pull request is read. """
+
+    from_item = pull_request_record.PullRequestRecord.from_item
+    for item in iter_items(input_data, stream_input):
+        yield from_item(item)
+
+
+class OutputOptions:
+    """ Where the documents of a release note and its final report go, and
+        how the run is recorded:
+        - output: file-like object all the documents are written in, the
+          release note first, instead of their own files;
+        - output_dir: directory the files are written in (default: the
+          current directory);
+        - documents: dictionary the rendered documents are stored in,
+          indexed by their filename, instead of being written;
+        - skip_unchanged: only render the documents if their content changed
+          since they were last written in the output directory, and only
+          write the files whose content changed;
+        - report: run report recording the time spent in each stage and the
+          counters of the final report;
+        - report_file: file-like object the final report is printed in. """
+
+    def __init__(self, output=None, output_dir=None, documents=None,
+                 skip_unchanged=False, report=None, report_file=None):
+        self.output = output
+        self.output_dir = output_dir
+        self.documents = documents
+        self.skip_unchanged = skip_unchanged
+        self.report = report
+        self.report_file = report_file
+
+
+def execute(input_data, export_authors, show_pr_nb, highlights, excl_labels,
+            incl_labels, excl_words, incl_words, stream_input=False,
+            output_options=None, enrichment=None, classify_jobs=1):
+    """ Format the pull requests into a release note. The pull requests can
+        either be provided directly as exported from GitHub, as an iterable
+        over the pages of GitHub's response, or as the path of the JSON file
+        they were exported into (read incrementally if stream_input is set).
+        Pages are classified as soon as they are provided, by chunks in
+        classify_jobs worker processes if it is greater than 1, and the
+        release note is written as set by the output options once they all
+        have been classified. If an author enrichment is provided, the
+        co-authors, display names and first-time contributors are looked up
+        with it. """
+
+    options = output_options or OutputOptions()
+    output = options.output
+    output_dir = options.output_dir
+    documents = options.documents
+    report = options.report
+    report_file = options.report_file
+
+    authors = set()  # Contains (username, profile link) of contributors
+    merged_links = []  # Links of the merged pull requests, to enrich them
+    first_merges = {}  # (Date, link) of the earliest merge of each author
+    pull_requests = []  # Contains the records of the regular pull requests
 
     # TODO: refactorize the whole setup of the included/excluded labels & words
 
@@ -324,165 +597,267 @@ def execute(input_file, export_authors, show_pr_nb, highlights, excl_labels,
     highlighted_pull_requests = []
     highlighted_counter = 0
 
+    # Compile all the rules once before classifying the pull requests
+    rules = release_note_rules.RuleSet(highlighted_labels, excluded_labels,
+                                       included_labels, excluded_words,
+                                       included_words)
+
     # Counters to print a summary at the end of the script
     total_counter = 0  # Pull requests in the input file
     regular_counter = 0  # Pull requests added to the final release note
     unmerged_counter = 0  # Pull requests closed but not merged
 
-    for pr in pull_requests_data:
+    # Pull requests selected from a store might only be the merged ones, the
+    # unmerged ones being only counted
+    if isinstance(input_data, dict):
+        unmerged_counter = input_data.get("unmerged_count", 0)
+        total_counter = unmerged_counter
+
+    milestone_title = None
+
+    # Pull requests along with their classification, if they were already
+    # classified by worker processes, or None otherwise
+    classifier = None
+    if classify_jobs > 1:
+        classifier = release_note_rules.ParallelClassifier(rules,
+                                                           classify_jobs)
+        classified_pull_requests = classifier.classify(
+            iter_pull_requests(input_data, stream_input))
+    else:
+        classified_pull_requests = (
+            (pr, None) for pr in iter_pull_requests(input_data, stream_input))
+
+    # Time spent classifying the pull requests, the rest of the loop being
+    # spent reading them (or waiting for the next pages to be received)
+    classify_time = 0.0
+    loop_start = time.perf_counter()
+
+    for pr, classification in classified_pull_requests:
         total_counter = total_counter + 1
+        if milestone_title is None:
+            milestone_title = pr.milestone
 
         # Ignore pulls requests that were closed but not merged
-        merged = False if pr["pull_request"]["merged_at"] is None else True
-        if not merged:
+        if not pr.merged:
             unmerged_counter = unmerged_counter + 1
             continue
 
         # Update list of pull requests authors
-        authors.add((pr["user"]["login"], pr["user"]["html_url"]))
-
-        # Get the labels from the pull request
-        labels = get_pr_labels(pr)
-
-        highlighted_pr = False
-        for label in labels:
-            if label in highlighted_labels:
-                highlighted_pull_requests.append(
-                    (pr["title"], pr["html_url"],
-                     "#{}".format(pr["number"])))
-                highlighted_counter = highlighted_counter + 1
-                regular_counter = regular_counter + 1
-                highlighted_pr = True
-                break
-
-        # TODO: use a function here instead of duplicating code
-        exclude_pr = False
-        for label in labels:
-            for excluded_label in excluded_labels.keys():
-                if label in excluded_label:
-                    excluded_pull_requests[excluded_label].append(
-                        (pr["title"], pr["html_url"],
-                            "#{}".format(pr["number"])))
-                    excluded_counters[excluded_label] = \
-                        excluded_counters[excluded_label] + 1
-                    exclude_pr = True
-                    break
-
-        include_pr = False  # True if the PR is included in subsections
-        for label in labels:
-            for included_label in included_labels.keys():
-                if label in included_label:
-                    included_pull_requests[included_label].append(
-                        (pr["title"], pr["html_url"],
-                            "#{}".format(pr["number"])))
-                    included_counters[included_label] = \
-                        included_counters[included_label] + 1
-                    regular_counter = regular_counter + 1
-                    include_pr = True
-                    break
-
-        if highlighted_pr or exclude_pr or include_pr:
-            continue
-
-        # Reset exclusion / inclusion booleans to check for words
-        exclude_pr = False
-        include_pr = False
-        lowered_title = pr["title"].lower()
-
-        # TODO: heavy refactoring
-        for excluded_key in excluded_words.keys():
-            if (isinstance(excluded_words[excluded_key], str)):
-                if excluded_words[excluded_key] in lowered_title:
-                    excluded_word_pull_requests[excluded_key].append(
-                        (pr["title"], pr["html_url"],
-                            "#{}".format(pr["number"])))
-                    excluded_word_counters[excluded_key] = \
-                        excluded_word_counters[excluded_key] + 1
-                    exclude_pr = True
-                    break
-            else:
-                for excluded_word in excluded_words[excluded_key]:
-                    if excluded_word in lowered_title:
-                        excluded_word_pull_requests[excluded_key].append(
-                            (pr["title"], pr["html_url"],
-                                "#{}".format(pr["number"])))
-                        excluded_word_counters[excluded_key] = \
-                            excluded_word_counters[excluded_key] + 1
-                        exclude_pr = True
-                        break
-
-        for included_key in included_words.keys():
-            if (isinstance(included_words[included_key], str)):
-                if included_words[included_key] in lowered_title:
-                    included_word_pull_requests[included_key].append(
-                        (pr["title"], pr["html_url"],
-                            "#{}".format(pr["number"])))
-                    included_word_counters[included_key] = \
-                        included_word_counters[included_key] + 1
-                    regular_counter = regular_counter + 1
-                    include_pr = True
-                    break
-
-            else:
-                for included_word in included_words[included_key]:
-                    if included_word in lowered_title:
-                        included_word_pull_requests[included_key].append(
-                            (pr["title"], pr["html_url"],
-                                "#{}".format(pr["number"])))
-                        included_word_counters[included_key] = \
-                            included_word_counters[included_key] + 1
-                        regular_counter = regular_counter + 1
-                        include_pr = True
-                        break
-
-        if exclude_pr or include_pr:
-            continue
-
-        pull_requests.append(
-            (pr["title"], pr["html_url"], "#{}".format(pr["number"])))
-        regular_counter = regular_counter + 1
+        authors.add(pr.author)
+        if enrichment:
+            merged_links.append(pr.link)
+            first_merge = first_merges.get(pr.author)
+            if first_merge is None or pr.merged_at < first_merge[0]:
+                first_merges[pr.author] = (pr.merged_at, pr.link)
+
+        # Get the section of the release note the pull request belongs to
+        if classification is None:
+            classify_start = time.perf_counter()
+            classification = rules.classify(pr.title, pr.labels)
+            classify_time = classify_time + time.perf_counter() - \
+                classify_start
+        section, key = classification
+
+        if section == release_note_rules.HIGHLIGHTED:
+            highlighted_pull_requests.append(pr)
+            highlighted_counter = highlighted_counter + 1
+            regular_counter = regular_counter + 1
+        elif section == release_note_rules.LABEL_EXCLUDED:
+            excluded_pull_requests[key].append(pr)
+            excluded_counters[key] = excluded_counters[key] + 1
+        elif section == release_note_rules.LABEL_INCLUDED:
+            included_pull_requests[key].append(pr)
+            included_counters[key] = included_counters[key] + 1
+            regular_counter = regular_counter + 1
+        elif section == release_note_rules.WORD_EXCLUDED:
+            excluded_word_pull_requests[key].append(pr)
+            excluded_word_counters[key] = excluded_word_counters[key] + 1
+        elif section == release_note_rules.WORD_INCLUDED:
+            included_word_pull_requests[key].append(pr)
+            included_word_counters[key] = included_word_counters[key] + 1
+            regular_counter = regular_counter + 1
+        else:
+            pull_requests.append(pr)
+            regular_counter = regular_counter + 1
+
+    if classifier:
+        classify_time = classifier.wait_time
+
+    if report:
+        report.add_time("read", time.perf_counter() - loop_start
+                        - classify_time, total_counter)
+        report.add_time("classify", classify_time,
+                        total_counter - unmerged_counter)
+
+    # The report is printed on the error output if the release note is
+    # printed on the standard output, so that they do not get mixed
+    if report_file is None:
+        report_file = sys.stderr if output is sys.stdout else sys.stdout
+
+    # Check that there were pull requests to parse in the input data.
+    # If the data does not directly come from the GitHub API, its structure
+    # might be different and this tests will thus fail.
+    if total_counter == 0:
+        if isinstance(input_data, str):
+            print("No pull requests to parse in {}".format(input_data),
+                  file=report_file)
+        else:
+            print("No pull requests to parse in the exported pull requests",
+                  file=report_file)
+        return
 
-    print("==== Final Report ====")
-    print("Total number of pull requests parsed: {}".format(total_counter))
+    names = None
+    first_time_authors = None  # Only known if the authors are enriched
+    if enrichment:
+        try:
+            with run_report.measure(report, "enrich authors"):
+                co_authors, names = enrichment.enrich(authors, merged_links)
+                first_time_authors = enrichment.find_first_time_authors(
+                    first_merges)
+            authors.update(co_authors)
+        except RequestException as _:
+            names = None
+            print("Exception while trying to enrich the authors, their "
+                  "logins are used instead", file=report_file)
+
+    print("==== Final Report ====", file=report_file)
+    print("Total number of pull requests parsed: {}".format(total_counter),
+          file=report_file)
     print("Total number of pull requests added to the release note: {}"
-          .format(regular_counter))
+          .format(regular_counter), file=report_file)
     if included_counters or highlighted_counter:
-        print("\tAmong which:")
+        print("\tAmong which:", file=report_file)
         print("\t- {} highlighted pull requests with the label(s) '{}'".format(
-            highlighted_counter, " ".join(str(l) for l in highlighted_labels)))
+            highlighted_counter, " ".join(str(l) for l in highlighted_labels)),
+            file=report_file)
         for label, counter in included_counters.items():
             print("\t- {} pull requests with the label(s) '{}'"
-                  .format(counter, label))
+                  .format(counter, label), file=report_file)
         for word, counter in included_word_counters.items():
             print("\t- {} pull requests with the word(s) '{}'"
-                  .format(counter, word))
-    print("Total number of unique contributors: {}".format(len(authors)))
+                  .format(counter, word), file=report_file)
+    print("Total number of unique contributors: {}".format(len(authors)),
+          file=report_file)
+    if first_time_authors is not None:
+        print("Total number of first-time contributors: {}"
+              .format(len(first_time_authors)), file=report_file)
     print("Total number of unmerged pull requests that were ignored: {}"
-          .format(unmerged_counter))
-    print("Total number of excluded pull requests with the label(s):")
+          .format(unmerged_counter), file=report_file)
+    print("Total number of excluded pull requests with the label(s):",
+          file=report_file)
     for label, counter in excluded_counters.items():
-        print("\t- '{}': {}".format(label, counter))
+        print("\t- '{}': {}".format(label, counter), file=report_file)
     for word, counter in excluded_word_counters.items():
-        print("\t- '{}': {}".format(word, counter))
+        print("\t- '{}': {}".format(word, counter), file=report_file)
+
+    if report:
+        report.release_note.update({
+            "milestone": milestone_title,
+            "parsed": total_counter,
+            "added": regular_counter,
+            "highlighted": highlighted_counter,
+            "included_labels": included_counters,
+            "included_words": included_word_counters,
+            "contributors": len(authors),
+            "first_time_contributors": len(first_time_authors)
+            if first_time_authors is not None else None,
+            "unmerged": unmerged_counter,
+            "excluded_labels": excluded_counters,
+            "excluded_words": excluded_word_counters})
+
+    # The fingerprint of the documents' content is compared to the one of
+    # the documents that were last written, which are kept if it is the same
+    manifest = None
+    if options.skip_unchanged and output is None and documents is None:
+        manifest = release_note_manifest.ReleaseNoteManifest(output_dir)
+        fingerprint = release_note_manifest.get_fingerprint(
+            get_documents_content(
+                pull_requests, milestone_title, highlighted_pull_requests,
+                included_pull_requests, included_word_pull_requests,
+                excluded_pull_requests, excluded_word_pull_requests,
+                show_pr_nb, authors, export_authors, names,
+                first_time_authors,
+                [highlights, excl_labels, incl_labels, excl_words,
+                 incl_words]))
+        if manifest.is_up_to_date(milestone_title, fingerprint):
+            print("Release note of {} unchanged, no file was updated"
+                  .format(milestone_title), file=report_file)
+            if report:
+                report.release_note["updated_files"] = []
+            return
+
+    # All the documents are rendered in memory before being written at once
+    with run_report.measure(report, "render"):
+        rendered_documents = render_documents(
+            pull_requests, milestone_title, highlighted_pull_requests,
+            included_pull_requests, included_word_pull_requests,
+            excluded_pull_requests, excluded_word_pull_requests, show_pr_nb,
+            authors, export_authors, names, first_time_authors)
+
+    if documents is not None:
+        documents.update(rendered_documents)
+        return
 
-    if export_authors:
-        write_authors(authors, milestone_title)
-    write_final_release_note(pull_requests, milestone_title,
-                             highlighted_pull_requests, included_pull_requests,
-                             included_word_pull_requests, show_pr_nb,
-                             authors)
-    if excl_labels or excl_words:
-        write_excluded_prs_note(excluded_pull_requests,
-                                excluded_word_pull_requests,
-                                milestone_title, show_pr_nb)
+    if output is not None:
+        # No file is written: the other documents follow the release note
+        release_note_filename = "{}-release-note.md".format(milestone_title)
+        write_document(rendered_documents.pop(release_note_filename),
+                       release_note_filename, output, report=report)
+        for filename, document in rendered_documents.items():
+            write_document(document, filename, output, report=report)
+        return
+
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    if manifest is None:
+        write_documents(rendered_documents, output_dir, report)
+        return
+
+    changed_documents = manifest.get_changed_documents(milestone_title,
+                                                       rendered_documents)
+    write_documents(changed_documents, output_dir, report)
+    manifest.update(milestone_title, fingerprint, rendered_documents)
+
+    print("Updated files: {}".format(", ".join(sorted(changed_documents))
+                                     if changed_documents else "none"),
+          file=report_file)
+    if report:
+        report.release_note["updated_files"] = sorted(changed_documents)
 
 
 def main():
     arg_parser = setup_arg_parser()
     args = arg_parser.parse_args()
 
-    execute(args.input, args.authors, args.pr_nb, args.exclude,
-            args.include, args.word_exclude, args.word_include)
+    input_data = args.input
+    if args.store:
+        if not (args.repository and args.milestone):
+            arg_parser.error("--store requires --repository and --milestone")
+        with pull_request_store.PullRequestStore(args.store) as store:
+            input_data = store.load_milestone(args.repository, args.milestone,
+                                              merged_only=True)
+
+    report = run_report.RunReport() if args.report_json else None
+
+    enrichment = None
+    if args.enrich_authors:
+        if not args.token:
+            arg_parser.error("--enrich-authors requires --token")
+        enrichment = author_enrichment.AuthorEnrichment(
+            args.token, author_enrichment.AuthorCache(args.author_cache_dir,
+                                                      args.author_cache_ttl),
+            report)
+
+    execute(input_data, args.authors, args.pr_nb, args.highlights,
+            args.exclude, args.include, args.word_exclude, args.word_include,
+            args.stream, OutputOptions(
+                sys.stdout if args.stdout else None, args.output_dir,
+                skip_unchanged=args.skip_unchanged, report=report),
+            enrichment, args.classify_jobs)
+
+    if report:
+        report.save(args.report_json)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+
+import hashlib
+import json
+import os
+import threading
+import requests
+from requests.structures import CaseInsensitiveDict
+
+try:
+    from bin import atomic_file
+except ImportError:  # Executed as a stand-alone script from the bin folder
+    import atomic_file
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "github-generate-release-note")
+DEFAULT_CACHE_SIZE = 50 * 1024 * 1024  # Bytes
+# Share of the maximum size the cache is reduced to when it is exceeded, so
+# that the entries are not listed again on every following response
+EVICTION_RATIO = 0.8
+
+# Response headers that are kept with the cached body
+CACHED_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Link")
+
+
+def get_size(path):
+    """ Get the size of a file, or 0 if it does not exist. """
+
+    try:
+        return os.stat(path).st_size
+    except OSError:
+        return 0
+
+
+class ResponseCache:
+    """ On-disk cache of the responses sent by the GitHub API. Every response
+        is stored in its own file, keyed by its URL, its parameters and the
+        credentials it was requested with, along with its body and the
+        validators (ETag / Last-Modified) that are needed to send
+        conditional requests: a response is never served to a request sent
+        with other credentials, which might not be allowed to see it. When
+        the cache exceeds its maximum size, the least recently used
+        responses are evicted. """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR,
+                 max_size=DEFAULT_CACHE_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+        # Total size of the entries, only listed on the first response and
+        # then kept up to date with the stored responses
+        self.size = None
+        self.lock = threading.Lock()
+
+    def get_path(self, url, params, authorization=None):
+        """ Get the path of the file caching the response to a request sent
+            with the Authorization header, if any. Only a digest of the
+            credentials is part of the file name. """
+
+        key = json.dumps([url, sorted((params or {}).items()),
+                          authorization])
+        digest = hashlib.sha256(key.encode("utf8")).hexdigest()
+        return os.path.join(self.directory, "{}.json".format(digest))
+
+    def load(self, url, params, authorization=None):
+        """ Load the cached entry for a request, or None if there is none. """
+
+        path = self.get_path(url, params, authorization)
+        try:
+            with open(path, "r", encoding="utf8") as cache_file:
+                entry = json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+
+        # Mark the entry as recently used for the eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def get_conditional_headers(self, entry):
+        """ Get the headers turning a request into a conditional request. """
+
+        headers = {}
+        if entry:
+            if entry["headers"].get("ETag"):
+                headers["If-None-Match"] = entry["headers"]["ETag"]
+            if entry["headers"].get("Last-Modified"):
+                headers["If-Modified-Since"] = \
+                    entry["headers"]["Last-Modified"]
+        return headers
+
+    def store(self, url, params, response, authorization=None):
+        """ Save a successful response if it can be validated later on. """
+
+        if "ETag" not in response.headers and \
+                "Last-Modified" not in response.headers:
+            return
+
+        entry = {
+            "url": url,
+            "headers": {header: response.headers[header]
+                        for header in CACHED_HEADERS
+                        if header in response.headers},
+            "body": response.text
+        }
+
+        # Write in a temporary file first so that concurrent readers never
+        # see a partially written entry
+        path = self.get_path(url, params, authorization)
+        previous_size = get_size(path)
+        with atomic_file.atomic_write(path) as cache_file:
+            json.dump(entry, cache_file, separators=(",", ":"))
+
+        with self.lock:
+            if self.size is None:
+                self.size = self.evict(self.max_size)
+            else:
+                self.size = self.size + get_size(path) - previous_size
+            if self.size > self.max_size:
+                self.size = self.evict(int(self.max_size * EVICTION_RATIO))
+
+    def to_response(self, entry):
+        """ Rebuild a response from a cached entry. """
+
+        response = requests.Response()
+        response.status_code = 200
+        response.url = entry["url"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response.encoding = "utf-8"
+        response._content = entry["body"].encode("utf-8")
+        return response
+
+    def evict(self, size):
+        """ Remove the least recently used entries until the size of the
+            cache is below size, and return the size of the remaining
+            entries. """
+
+        entries = []
+        total_size = 0
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:  # Already evicted by another thread
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total_size = total_size + stat.st_size
+
+        for _, entry_size, path in sorted(entries):
+            if total_size <= size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total_size = total_size - entry_size
+        return total_size
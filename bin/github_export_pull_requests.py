@@ -1,10 +1,31 @@
 #!/usr/bin/env python
 
 import argparse
-import requests
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from requests.exceptions import RequestException
 import json
 
+try:
+    from bin import github_cache, github_session, github_transport, \
+        milestone_snapshot, page_checkpoint, pull_request_store, run_report
+except ImportError:  # Executed as a stand-alone script from the bin folder
+    import github_cache
+    import github_session
+    import github_transport
+    import milestone_snapshot
+    import page_checkpoint
+    import pull_request_store
+    import run_report
+
+# Set the number of results on a page to 100 to reduce the number of pages
+# GitHub sets it to 30 by default
+REQUESTS_PER_PAGE = 100
+# Maximum number of results GitHub returns for a single search
+GITHUB_SEARCH_LIMIT = 1000
+# Format of the timestamps used by GitHub and in the search qualifiers
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
 
 def setup_arg_parser():
     """ Initialize the argument parser and set the list of arguments. """
@@ -46,92 +67,594 @@ def setup_arg_parser():
         "-t", "--token",
         help="""GitHub authentication token (optional: might be needed to 
                 perform a lot of requests in a short amount of time)""")
+    arg_parser.add_argument(
+        "-j", "--concurrency",
+        type=int,
+        default=1,
+        help="""number of result pages requested in parallel once the total
+                number of pull requests is known (default: 1, the pages are
+                requested one after the other)""")
+    arg_parser.add_argument(
+        "--cache-dir",
+        dest="cache_dir",
+        default=github_cache.DEFAULT_CACHE_DIR,
+        help="""directory in which GitHub's responses are cached to send
+                conditional requests and not download again the pages that
+                were not modified (default: {})"""
+        .format(github_cache.DEFAULT_CACHE_DIR))
+    arg_parser.add_argument(
+        "--no-cache",
+        dest="no_cache",
+        action="store_true",
+        default=False,
+        help="do not use nor update the cache of GitHub's responses")
+    arg_parser.add_argument(
+        "--snapshot",
+        help="""snapshot file of the last export of the milestone: if it
+                exists, only the pull requests that were updated since then
+                are requested and merged into it, otherwise all the pull
+                requests are requested; the snapshot is then updated""")
+    arg_parser.add_argument(
+        "--resume",
+        action="store_true",
+        default=False,
+        help="""resume an interrupted export: the pages that were already
+                received, checkpointed in the [OUTPUT].checkpoint directory,
+                are not requested again""")
+    arg_parser.add_argument(
+        "--store",
+        help="""SQLite store the exported pull requests are upserted into, to
+                format their release note again later without requesting
+                GitHub""")
+    arg_parser.add_argument(
+        "--report-json",
+        dest="report_json",
+        help="""JSON file in which the run report is written: time spent
+                in HTTP requests and JSON decoding, bytes received, retries
+                and rate limit waits""")
+    arg_parser.add_argument(
+        "--transport",
+        choices=github_transport.TRANSPORT_MODES,
+        default=github_transport.LIVE,
+        help="""how the requests are sent to GitHub (default: live): live,
+                record (the responses are also recorded in the cassette
+                directory) or replay (the recorded responses are used
+                without any network access)""")
+    arg_parser.add_argument(
+        "--cassette-dir",
+        dest="cassette_dir",
+        default=github_transport.DEFAULT_CASSETTE_DIR,
+        help="""directory in which the responses are recorded and from
+                which they are replayed (default: {})"""
+        .format(github_transport.DEFAULT_CASSETTE_DIR))
+    arg_parser.add_argument(
+        "--replay-latency",
+        dest="replay_latency",
+        type=float,
+        default=0,
+        help="""latency in milliseconds added to every replayed response
+                (default: 0)""")
 
     return arg_parser
 
 
-def request_pull_requests(repository, milestone, sorting, token):
-    """ Send the request to retrieve all the pull requests associated to a
-        a milestone for a given repository and catch the response. If there
-        are several pages, retrieve them all and concatenate while preserving
-        the sorting order. """
+def build_search_parameters(owner, repo, milestone):
+    """ Format the repository and milestone as search qualifiers. """
+
+    repo_param = "repo:{}/{}".format(owner, repo)
+    if milestone.strip().find(' ') == -1:
+        milestone_param = "milestone:{}".format(milestone)
+    else:
+        milestone_param = "milestone:\"{}\"".format(milestone)
+    return repo_param, milestone_param
 
-    GITHUB_REQUEST_URL = "https://api.github.com/search/issues"
+
+def build_milestones_parameter(milestones):
+    """ Format several milestones as a single search qualifier matching the
+        pull requests associated to any of them. """
+
+    milestone_params = []
+    for milestone in milestones:
+        _, milestone_param = build_search_parameters("", "", milestone)
+        milestone_params.append(milestone_param)
+    return "({})".format(" OR ".join(milestone_params))
+
+
+def build_search_url(repository, milestone, sorting, qualifiers=()):
+    """ Build the URL of the search request for the closed pull requests
+        associated to a milestone in a given repository. Additional search
+        qualifiers can be provided to restrict the results. If the milestone
+        qualifier combines several milestones, GitHub's advanced search is
+        used, as the legacy search does not support the OR operator. """
+
+    GITHUB_REQUEST_URL = "{}/search/issues".format(
+        github_session.GITHUB_API_URL)
     TYPE_PR_REQUEST = "type:pr"
     STATE_CLOSED_REQUEST = "state:closed"
 
     requested_parameters = "?q={}+{}+{}+{}+{}".format(
         milestone, TYPE_PR_REQUEST, STATE_CLOSED_REQUEST, repository, sorting)
-    request_url = "{}{}".format(GITHUB_REQUEST_URL, requested_parameters)
-
-    # Set the number of results on a page to 100 to reduce the number of pages
-    # GitHub sets it to 30 by default
-    REQUESTS_PER_PAGE = 100
-    page = 1  # Start with the first page
-    extra_parameters = {"page": page, "per_page": REQUESTS_PER_PAGE}
-
-    header = {}
-    if token:
-        header["Authorization"] = "token {}".format(token)
-
-    pull_requests = {}
-
-    while True:
-        response = requests.get(
-            request_url, headers=header, params=extra_parameters)
-
-        # Check response's status code
-        code = response.status_code
-        if code != 200:
-            if code == 404:
-                print("Error 404: page not found.")
-            else:
-                print(response.json().get("message"))
-            response.raise_for_status()
-
-        # Save the response & concatenate it with the previous pages (if any)
-        # The specified sorting order will preserved
-        if not pull_requests:
-            pull_requests = response.json()
+    for qualifier in qualifiers:
+        requested_parameters = "{}+{}".format(requested_parameters, qualifier)
+    if " OR " in milestone:
+        requested_parameters = "{}&advanced_search=true".format(
+            requested_parameters)
+    return "{}{}".format(GITHUB_REQUEST_URL, requested_parameters)
+
+
+def request_page(session, request_url, page, cache=None,
+                 per_page=REQUESTS_PER_PAGE):
+    """ Request a single page of the search results and return the response.
+        An exception is raised if GitHub did not answer with the page. """
+
+    extra_parameters = {"page": page, "per_page": per_page}
+
+    # Throttled pages are retried without losing the pages already fetched
+    response = github_session.send_request(
+        session, request_url, params=extra_parameters, cache=cache)
+
+    # Check response's status code
+    code = response.status_code
+    if code != 200:
+        if code == 404:
+            print("Error 404: page not found.")
         else:
-            pull_requests["items"].extend(response.json()["items"])
+            print(response.json().get("message"))
+        response.raise_for_status()
+
+    return response
+
+
+def fetch_page(session, request_url, page, cache=None, checkpoint=None):
+    """ Get a page of the search results as a (page data, True if there is a
+        next page) tuple. If a checkpoint is provided, pages it contains are
+        not requested again, and the other ones are saved into it as soon as
+        they are received. """
+
+    if checkpoint:
+        saved_page = checkpoint.load(request_url, page)
+        if saved_page:
+            return saved_page
+
+    response = request_page(session, request_url, page, cache)
+    link = response.headers.get("Link", False)
+    has_next = bool(link) and 'rel="next"' in link
+    data = github_session.decode_json(session, response)
+
+    if checkpoint:
+        checkpoint.save(request_url, page, data, has_next)
+    return data, has_next
+
+
+def get_pages_count(total_count):
+    """ Compute the number of pages needed to retrieve all the results of a
+        search, knowing that GitHub never returns more than 1000 results. """
+
+    results_count = min(total_count, GITHUB_SEARCH_LIMIT)
+    return max(1, -(-results_count // REQUESTS_PER_PAGE))
+
+
+def iter_pull_request_pages(repository, milestone, sorting, token,
+                            session=None, concurrency=1, cache=None,
+                            qualifiers=(), checkpoint=None):
+    """ Send the request to retrieve all the pull requests associated to a
+        a milestone for a given repository, and yield the pages of the
+        response one by one, in the sorting order, as soon as they are
+        received. An existing session can be provided to reuse its
+        connections across several exports. If concurrency is greater than 1,
+        all the pages after the first one are requested in parallel. If a
+        response cache is provided, pages that have not been modified since
+        they were cached are not downloaded again. Additional search
+        qualifiers can be provided to restrict the results. If a checkpoint
+        is provided, the pages are saved into it as soon as they are
+        received, and the pages it already contains are not requested
+        again. """
+
+    request_url = build_search_url(repository, milestone, sorting, qualifiers)
+
+    if session is None:
+        session = github_session.create_session(
+            token, pool_size=max(10, concurrency))
+
+    first_page, has_next = fetch_page(session, request_url, 1, cache,
+                                      checkpoint)
+
+    # GitHub silently truncates the results after the first 1000 ones: split
+    # the search in creation date windows that fit under that limit instead,
+    # unless the search is already one of these windows. All the windows are
+    # needed to sort the results back, so they are yielded as a single page
+    if first_page["total_count"] > GITHUB_SEARCH_LIMIT and not any(
+            qualifier.startswith("created:") for qualifier in qualifiers):
+        yield request_sharded_pull_requests(
+            repository, milestone, sorting, session, concurrency, cache,
+            qualifiers, first_page, checkpoint)
+        return
+
+    yield first_page
+
+    if concurrency > 1:
+        # The first page gives the total number of results, so all the other
+        # pages are known and can be requested at the same time
+        pages_count = get_pages_count(first_page["total_count"])
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            pages = executor.map(
+                lambda page: fetch_page(session, request_url, page, cache,
+                                        checkpoint),
+                range(2, pages_count + 1))
+            # Pages are returned in their order, so the specified sorting
+            # order is preserved
+            for data, _ in pages:
+                yield data
+        return
+
+    # Go through the next pages (if any) one after the other
+    page = 1
+    while has_next:
+        page = page + 1
+        data, has_next = fetch_page(session, request_url, page, cache,
+                                    checkpoint)
+        yield data
+
+
+def request_pull_requests(repository, milestone, sorting, token,
+                          session=None, concurrency=1, cache=None,
+                          qualifiers=(), checkpoint=None):
+    """ Retrieve all the pull requests associated to a milestone for a given
+        repository. If there are several pages, retrieve them all and
+        concatenate while preserving the sorting order. The parameters are
+        the same as iter_pull_request_pages'. """
+
+    pages = iter_pull_request_pages(
+        repository, milestone, sorting, token, session=session,
+        concurrency=concurrency, cache=cache, qualifiers=qualifiers,
+        checkpoint=checkpoint)
+
+    # Concatenate the pages with the first one
+    # The specified sorting order will preserved
+    pull_requests = next(pages)
+    for page in pages:
+        pull_requests["items"].extend(page["items"])
+
+    return pull_requests
+
+
+def request_milestones_pull_requests(repository, milestones, sorting, token,
+                                     session=None, concurrency=1,
+                                     cache=None):
+    """ Retrieve the pull requests associated to several milestones of a
+        given repository with a single search, and split them by milestone.
+        Return a dictionary containing the pull requests of each milestone,
+        in the sorting order, with the same structure as a single milestone's
+        search results. """
+
+    pull_requests = request_pull_requests(
+        repository, build_milestones_parameter(milestones), sorting, token,
+        session=session, concurrency=concurrency, cache=cache)
+
+    # Milestones are matched case-insensitively by the search
+    milestones_pull_requests = {}
+    for milestone in milestones:
+        milestones_pull_requests.setdefault(milestone.casefold(), {
+            "total_count": 0,
+            "incomplete_results": pull_requests["incomplete_results"],
+            "items": []})
+    for item in pull_requests["items"]:
+        milestone = item["milestone"]["title"].casefold()
+        if milestone in milestones_pull_requests:
+            milestones_pull_requests[milestone]["items"].append(item)
+
+    for milestone_pull_requests in milestones_pull_requests.values():
+        milestone_pull_requests["total_count"] = \
+            len(milestone_pull_requests["items"])
+    return {milestone: milestones_pull_requests[milestone.casefold()]
+            for milestone in milestones}
+
+
+def sort_pull_requests(items, sorting):
+    """ Sort pull requests locally in the same order as GitHub would for the
+        requested sorting. Results sorted by relevance cannot be sorted
+        locally and are left untouched. """
+
+    SORTING_FIELDS = {"created": "created_at", "updated": "updated_at",
+                      "comments": "comments"}
 
-        # Go to the next page (if any)
-        link = response.headers.get("Link", False)
-        if link and 'rel="next"' in link:
-            page = page + 1
-            extra_parameters["page"] = page
+    criterion, _, order = sorting.replace("sort:", "").partition("-")
+    if criterion not in SORTING_FIELDS:
+        return items
+
+    field = SORTING_FIELDS[criterion]
+    return sorted(items, key=lambda item: item[field],
+                  reverse=(order == "desc"))
+
+
+def count_pull_requests(session, repository, milestone, sorting, cache,
+                        qualifiers):
+    """ Get the number of results of a search along with its first result,
+        or None if there is no result. """
+
+    request_url = build_search_url(repository, milestone, sorting, qualifiers)
+    results = github_session.decode_json(
+        session, request_page(session, request_url, 1, cache, per_page=1))
+    first_result = results["items"][0] if results["items"] else None
+    return results["total_count"], first_result
+
+
+def split_date_windows(count_window, start, end, count):
+    """ Recursively bisect the [start, end] creation date window, which
+        contains count results, until each window contains at most 1000
+        results, and return these windows. count_window(start, end) returns
+        the number of results of a window. A window that cannot be split
+        anymore is kept even if it is too big, in which case some results
+        will be missing. """
+
+    if count <= GITHUB_SEARCH_LIMIT or end <= start:
+        if count > GITHUB_SEARCH_LIMIT:
+            print("Warning: {} pull requests created at {}, only {} will be "
+                  "retrieved".format(count, start.strftime(DATE_FORMAT),
+                                     GITHUB_SEARCH_LIMIT))
+        return [(start, end)] if count > 0 else []
+
+    middle = start + (end - start) // 2
+    windows = []
+    for window_start, window_end in ((start, middle),
+                                     (middle + timedelta(seconds=1), end)):
+        windows.extend(split_date_windows(
+            count_window, window_start, window_end,
+            count_window(window_start, window_end)))
+    return windows
+
+
+def format_date_window(start, end):
+    """ Format a creation date window as a search qualifier. """
+
+    return "created:{}..{}".format(start.strftime(DATE_FORMAT),
+                                   end.strftime(DATE_FORMAT))
+
+
+def parse_date(date):
+    """ Parse a timestamp returned by GitHub. """
+
+    return datetime.strptime(date, DATE_FORMAT).replace(tzinfo=timezone.utc)
+
+
+def request_sharded_pull_requests(repository, milestone, sorting, session,
+                                  concurrency, cache, qualifiers,
+                                  first_page, checkpoint=None):
+    """ Retrieve the pull requests of a search that exceeds GitHub's limit of
+        1000 results by splitting it into creation date windows that each fit
+        under that limit. The windows are requested in parallel if concurrency
+        is greater than 1, and their results are merged back in the requested
+        sorting order. """
+
+    # The oldest and newest pull requests give the initial window to split
+    _, oldest = count_pull_requests(session, repository, milestone,
+                                    "sort:created-asc", cache, qualifiers)
+    _, newest = count_pull_requests(session, repository, milestone,
+                                    "sort:created-desc", cache, qualifiers)
+
+    def count_window(start, end):
+        count, _ = count_pull_requests(
+            session, repository, milestone, "sort:created-asc", cache,
+            list(qualifiers) + [format_date_window(start, end)])
+        return count
+
+    windows = split_date_windows(
+        count_window, parse_date(oldest["created_at"]),
+        parse_date(newest["created_at"]), first_page["total_count"])
+    print("{} pull requests split in {} searches".format(
+        first_page["total_count"], len(windows)))
+
+    def request_window(window):
+        return request_pull_requests(
+            repository, milestone, sorting, None, session=session,
+            cache=cache,
+            qualifiers=list(qualifiers) + [format_date_window(*window)],
+            checkpoint=checkpoint)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        shards = list(executor.map(request_window, windows))
+
+    # Windows do not overlap, but a pull request might still be returned
+    # twice if it was modified while the windows were requested
+    items = {}
+    for shard in shards:
+        for item in shard["items"]:
+            items[item["number"]] = item
+
+    pull_requests = first_page
+    pull_requests["items"] = sort_pull_requests(list(items.values()), sorting)
+    pull_requests["total_count"] = len(pull_requests["items"])
+    return pull_requests
+
+
+def request_updated_numbers(repository, updated_at, session, cache):
+    """ Get the numbers of all the pull requests of a repository updated
+        since a time, whatever their milestone and state, or None if there
+        are more of them than a search can return. """
+
+    request_url = "{}/search/issues?q=type:pr+{}+updated:>={}".format(
+        github_session.GITHUB_API_URL, repository, updated_at)
+
+    numbers = set()
+    page, has_next = 0, True
+    while has_next:
+        page = page + 1
+        data, has_next = fetch_page(session, request_url, page, cache)
+        if data["total_count"] > GITHUB_SEARCH_LIMIT:
+            return None
+        numbers.update(item["number"] for item in data["items"])
+    return numbers
+
+
+def request_updated_pull_requests(repository, milestone, sorting, token,
+                                  snapshot_file, session=None, concurrency=1,
+                                  cache=None, checkpoint=None):
+    """ Retrieve the pull requests associated to a milestone incrementally.
+        If a snapshot of a previous export exists, only the pull requests
+        updated since then are requested and merged into it; otherwise, all
+        the pull requests are requested. Pull requests removed from the
+        milestone (or reopened) since the snapshot are not returned by the
+        search of the updated ones, but they were updated as well: the pull
+        requests of the snapshot updated since then that are no longer part
+        of the milestone are dropped. The size of the merged snapshot is
+        still checked against the number of pull requests of the milestone,
+        in case they were modified in the meantime, and all the pull
+        requests are requested again if they differ. The snapshot is then
+        updated. """
+
+    query = "{} {}".format(repository, milestone)
+    snapshot = milestone_snapshot.load_snapshot(snapshot_file, query)
+    if session is None:
+        session = github_session.create_session(token)
+
+    if snapshot is None or snapshot["updated_at"] is None:
+        pull_requests = request_pull_requests(
+            repository, milestone, sorting, token, session=session,
+            concurrency=concurrency, cache=cache, checkpoint=checkpoint)
+    else:
+        # Pull requests updated at the exact time of the snapshot are
+        # requested again, as others might have been updated at that time
+        updated_pull_requests = request_pull_requests(
+            repository, milestone, sorting, token, session=session,
+            concurrency=concurrency, cache=cache,
+            qualifiers=["updated:>={}".format(snapshot["updated_at"])],
+            checkpoint=checkpoint)
+        print("{} pull requests updated since {}".format(
+            len(updated_pull_requests["items"]), snapshot["updated_at"]))
+
+        # The pull requests of the repository updated since the snapshot,
+        # whatever their milestone, include the ones that left the milestone
+        updated_numbers = request_updated_numbers(
+            repository, snapshot["updated_at"], session, cache)
+        if updated_numbers is None:
+            # Any of them might have left it: the check of the size of the
+            # snapshot then requests all the pull requests again
+            removed = set(item["number"] for item in snapshot["items"])
         else:
-            break
+            removed = updated_numbers - set(
+                item["number"] for item in updated_pull_requests["items"])
+        pull_requests = milestone_snapshot.merge_pull_requests(
+            snapshot, updated_pull_requests, removed)
+        pull_requests["items"] = sort_pull_requests(
+            pull_requests["items"], sorting)
+
+        total_count, _ = count_pull_requests(session, repository, milestone,
+                                             sorting, cache, [])
+        if total_count != len(pull_requests["items"]):
+            print("{} pull requests in the milestone but {} in the snapshot, "
+                  "exporting all of them again".format(
+                      total_count, len(pull_requests["items"])))
+            pull_requests = request_pull_requests(
+                repository, milestone, sorting, token, session=session,
+                concurrency=concurrency, cache=cache, checkpoint=checkpoint)
 
+    milestone_snapshot.save_snapshot(snapshot_file, query, pull_requests)
     return pull_requests
 
 
-def execute(repo_param, milestone_param, sorting_param, token, output):
+def stream(repo_param, milestone_param, sorting_param, token,
+           concurrency=1, cache_dir=None, snapshot_file=None, report=None):
+    """ Export the pull requests associated to a milestone and yield the
+        pages of the response as soon as they are received, so that they can
+        be formatted while the next pages are requested. With a snapshot, the
+        updated pull requests need to be merged into it first, so the whole
+        snapshot is yielded as a single page. The requests are recorded in
+        the run report if one is provided. RequestException is raised if the
+        pull requests could not be retrieved. """
+
+    cache = github_cache.ResponseCache(cache_dir) if cache_dir else None
+    session = github_session.create_session(
+        token, pool_size=max(10, concurrency), report=report)
+
+    if snapshot_file:
+        yield request_updated_pull_requests(
+            repo_param, milestone_param, sorting_param, token,
+            snapshot_file, session=session, concurrency=concurrency,
+            cache=cache)
+    else:
+        yield from iter_pull_request_pages(
+            repo_param, milestone_param, sorting_param, token,
+            session=session, concurrency=concurrency, cache=cache)
+
+
+def save_pull_requests(pull_requests, output):
+    """ Write the exported pull requests in a compact JSON file. """
+
+    with open("{}".format(output), "w", encoding="utf8") as json_file:
+        json.dump(pull_requests, json_file, separators=(",", ":"))
+
+
+def get_checkpoint_dir(output):
+    """ Get the directory in which the pages of an export are checkpointed. """
+
+    return "{}.checkpoint".format(output)
+
+
+def execute(repo_param, milestone_param, sorting_param, token, output=None,
+            concurrency=1, cache_dir=None, snapshot_file=None, resume=False,
+            report=None):
+    """ Export the pull requests associated to a milestone and return them.
+        They are also written in the output JSON file if one is provided, in
+        which case the received pages are checkpointed until the export is
+        complete so that an interrupted export can be resumed. The requests
+        are recorded in the run report if one is provided. None is returned
+        if the pull requests could not be retrieved. """
+
+    cache = github_cache.ResponseCache(cache_dir) if cache_dir else None
+    checkpoint = page_checkpoint.PageCheckpoint(
+        get_checkpoint_dir(output), resume) if output else None
+    session = github_session.create_session(
+        token, pool_size=max(10, concurrency), report=report)
+
     try:
-        pull_requests = request_pull_requests(
-            repo_param, milestone_param, sorting_param, token)
+        if snapshot_file:
+            pull_requests = request_updated_pull_requests(
+                repo_param, milestone_param, sorting_param, token,
+                snapshot_file, session=session, concurrency=concurrency,
+                cache=cache, checkpoint=checkpoint)
+        else:
+            pull_requests = request_pull_requests(
+                repo_param, milestone_param, sorting_param, token,
+                session=session, concurrency=concurrency, cache=cache,
+                checkpoint=checkpoint)
     except RequestException as _:
         print("Exception while trying to access GitHub")
-        return
+        if checkpoint:
+            print("The export can be resumed with --resume")
+        return None
 
-    with open("{}".format(output), "w", encoding="utf8") as json_file:
-        json.dump(pull_requests, json_file, indent=4)
+    if output:
+        with run_report.measure(report, "write {}".format(output)):
+            save_pull_requests(pull_requests, output)
+        checkpoint.clear()
+    return pull_requests
 
 
 def main():
     arg_parser = setup_arg_parser()
     args = arg_parser.parse_args()
 
-    repo_param = "repo:{}/{}".format(args.owner, args.repo)
-    if args.milestone.strip().find(' ') == -1:
-        milestone_param = "milestone:{}".format(args.milestone)
-    else:
-        milestone_param = "milestone:\"{}\"".format(args.milestone)
+    repo_param, milestone_param = build_search_parameters(
+        args.owner, args.repo, args.milestone)
     sorting_param = "sort:{}".format(args.sort)
 
-    execute(repo_param, milestone_param,
-            sorting_param, args.token, args.output)
+    cache_dir = None if args.no_cache else args.cache_dir
+    report = run_report.RunReport() if args.report_json else None
+    github_transport.configure(args.transport, args.cassette_dir,
+                               args.replay_latency / 1000)
+
+    pull_requests = execute(repo_param, milestone_param,
+                            sorting_param, args.token, args.output,
+                            args.concurrency, cache_dir, args.snapshot,
+                            args.resume, report)
+
+    if pull_requests is not None and args.store:
+        with pull_request_store.PullRequestStore(args.store) as store:
+            store.upsert("{}/{}".format(args.owner, args.repo),
+                         pull_requests)
+
+    if report:
+        report.save(args.report_json)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,357 @@
+#!/usr/bin/env python
+
+import argparse
+from requests.exceptions import RequestException
+
+try:
+    from bin import github_export_pull_requests, github_session, run_report
+except ImportError:  # Executed as a stand-alone script from the bin folder
+    import github_export_pull_requests
+    import github_session
+    import run_report
+
+# Only the fields that are used to format the release note, and to sort the
+# pull requests, are requested
+SEARCH_QUERY = """
+query($query: String!, $cursor: String) {
+  search(query: $query, type: ISSUE, first: 100, after: $cursor) {
+    issueCount
+    pageInfo {
+      hasNextPage
+      endCursor
+    }
+    nodes {
+      ... on PullRequest {
+        number
+        title
+        url
+        createdAt
+        updatedAt
+        mergedAt
+        comments {
+          totalCount
+        }
+        milestone {
+          title
+        }
+        author {
+          __typename
+          login
+          url
+        }
+        labels(first: 100) {
+          nodes {
+            name
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+# Number of results of a search, and creation date of its first result
+COUNT_QUERY = """
+query($query: String!) {
+  search(query: $query, type: ISSUE, first: 1) {
+    issueCount
+    nodes {
+      ... on PullRequest {
+        createdAt
+      }
+    }
+  }
+}
+"""
+
+# Author of the pull requests whose user account was deleted
+GHOST_USER = {"login": "ghost", "html_url": "https://github.com/ghost"}
+# Suffix of the logins of the GitHub Apps in the REST API, which the GraphQL
+# API leaves out
+BOT_SUFFIX = "[bot]"
+
+
+def setup_arg_parser():
+    """ Initialize the argument parser and set the list of arguments. """
+
+    arg_parser = argparse.ArgumentParser(
+        description="""Tool to export the full list of pull requests associated
+                       to a milestone for a specified GitHub repository as a
+                       JSON file, using GitHub's GraphQL API to only request
+                       the information needed to format the release note. The
+                       JSON file has the same structure as the one exported
+                       with GitHub's REST API.""")
+    arg_parser.add_argument(
+        "-o", "--owner",
+        required=True,
+        help="owner of the GitHub repository to extract the information from")
+    arg_parser.add_argument(
+        "-r", "--repo",
+        required=True,
+        help="name of the GitHub repository to extract the information from")
+    arg_parser.add_argument(
+        "-m", "--milestone",
+        required=True,
+        help="name of the milestone to extract the information with")
+    arg_parser.add_argument(
+        "-s", "--sort",
+        choices=["created-desc", "created-asc", "comments-desc",
+                 "comments-asc", "updated-desc", "updated-asc",
+                 "relevance-desc"],
+        default="updated-desc",
+        help="""sort the pull requests in the requested order
+                (default: updated-desc): newest (created-desc),
+                oldest (created-asc), most commented (comments-desc),
+                least commented (comments-asc),
+                recently updated (updated-desc),
+                least recently updated (updated-asc),
+                best match (relevance-desc)""")
+    arg_parser.add_argument(
+        "--output",
+        default="githublist.json",
+        help="filename for the output JSON file (default: githublist.json)")
+    arg_parser.add_argument(
+        "-t", "--token",
+        required=True,
+        help="""GitHub authentication token (mandatory: GitHub's GraphQL API
+                cannot be used without authentication)""")
+
+    return arg_parser
+
+
+def convert_author(author):
+    """ Convert the author of a pull request returned by the GraphQL API
+        into the user returned by the REST API. """
+
+    if not author:
+        return dict(GHOST_USER)
+    login = author["login"]
+    if author.get("__typename") == "Bot":
+        login = login + BOT_SUFFIX
+    return {"login": login, "html_url": author["url"]}
+
+
+def convert_pull_request(node):
+    """ Convert a pull request returned by the GraphQL API into the structure
+        returned by the REST API, limited to the fields that are used to
+        format the release note and to sort the pull requests. """
+
+    milestone = node["milestone"]
+
+    return {
+        "number": node["number"],
+        "title": node["title"],
+        "html_url": node["url"],
+        "labels": [{"name": label["name"]}
+                   for label in node["labels"]["nodes"]],
+        "user": convert_author(node["author"]),
+        "milestone": {"title": milestone["title"]} if milestone else None,
+        "created_at": node["createdAt"],
+        "updated_at": node["updatedAt"],
+        "comments": node["comments"]["totalCount"],
+        "pull_request": {"merged_at": node["mergedAt"]}
+    }
+
+
+def send_query(session, query, variables):
+    """ Send a GraphQL query and return its data. RequestException is raised
+        if GitHub reports errors in the body of the response. """
+
+    response = github_session.send_request(
+        session, "{}/graphql".format(github_session.GITHUB_API_URL),
+        json_data={"query": query, "variables": variables})
+
+    # Check response's status code, and the errors that GitHub reports
+    # in the body of the response
+    if response.status_code != 200:
+        print(response.json().get("message"))
+        response.raise_for_status()
+    data = github_session.decode_json(session, response)
+    if data.get("errors"):
+        for error in data["errors"]:
+            print(error.get("message"))
+        raise RequestException("GraphQL request failed")
+    return data["data"]
+
+
+def build_search_query(repository, milestone, sorting, qualifiers=()):
+    """ Build the search query of the pull requests associated to a
+        milestone, restricted by additional qualifiers if there are some. """
+
+    TYPE_PR_REQUEST = "type:pr"
+    STATE_CLOSED_REQUEST = "state:closed"
+
+    return " ".join([milestone, TYPE_PR_REQUEST, STATE_CLOSED_REQUEST,
+                     repository, sorting] + list(qualifiers))
+
+
+def count_pull_requests(session, repository, milestone, sorting,
+                        qualifiers):
+    """ Get the number of results of a search along with the creation date
+        of its first result, or None if there is no result. """
+
+    search = send_query(session, COUNT_QUERY, {
+        "query": build_search_query(repository, milestone, sorting,
+                                    qualifiers)})["search"]
+    nodes = [node for node in search["nodes"] if node]
+    return search["issueCount"], nodes[0]["createdAt"] if nodes else None
+
+
+def iter_pull_request_pages(repository, milestone, sorting, token,
+                            session=None, qualifiers=()):
+    """ Send the GraphQL request to retrieve all the pull requests associated
+        to a milestone for a given repository, following the cursors of the
+        pages if there are several, and yield the pages one by one with the
+        same structure as the REST API's search results, in the sorting
+        order. Additional search qualifiers can be provided to restrict the
+        results. Like the REST API's, GraphQL's search never returns more
+        than 1000 results: larger searches are split in creation date
+        windows, as the REST exporter does. """
+
+    query = build_search_query(repository, milestone, sorting, qualifiers)
+
+    if session is None:
+        session = github_session.create_session(token)
+
+    cursor = None
+    received = 0
+
+    while True:
+        search = send_query(session, SEARCH_QUERY,
+                            {"query": query, "cursor": cursor})["search"]
+
+        # All the windows are needed to sort the results back, so they are
+        # yielded as a single page
+        if cursor is None and \
+                search["issueCount"] > \
+                github_export_pull_requests.GITHUB_SEARCH_LIMIT and \
+                not any(qualifier.startswith("created:")
+                        for qualifier in qualifiers):
+            yield request_sharded_pull_requests(
+                repository, milestone, sorting, session, qualifiers,
+                search["issueCount"])
+            return
+
+        received = received + len(search["nodes"])
+        yield {"total_count": search["issueCount"],
+               "incomplete_results": False,
+               # Issues are returned as empty nodes
+               "items": [convert_pull_request(node)
+                         for node in search["nodes"] if node]}
+
+        if not search["pageInfo"]["hasNextPage"]:
+            break
+        cursor = search["pageInfo"]["endCursor"]
+
+    if received < search["issueCount"]:
+        print("Warning: {} pull requests found but only {} retrieved".format(
+            search["issueCount"], received))
+
+
+def request_sharded_pull_requests(repository, milestone, sorting, session,
+                                  qualifiers, total_count):
+    """ Retrieve the pull requests of a search that exceeds GitHub's limit of
+        1000 results by splitting it into creation date windows that each fit
+        under that limit, and merge them back in the requested sorting
+        order. """
+
+    # The oldest and newest pull requests give the initial window to split
+    _, oldest = count_pull_requests(session, repository, milestone,
+                                    "sort:created-asc", qualifiers)
+    _, newest = count_pull_requests(session, repository, milestone,
+                                    "sort:created-desc", qualifiers)
+
+    def count_window(start, end):
+        count, _ = count_pull_requests(
+            session, repository, milestone, "sort:created-asc",
+            list(qualifiers) + [
+                github_export_pull_requests.format_date_window(start, end)])
+        return count
+
+    windows = github_export_pull_requests.split_date_windows(
+        count_window, github_export_pull_requests.parse_date(oldest),
+        github_export_pull_requests.parse_date(newest), total_count)
+    print("{} pull requests split in {} searches".format(total_count,
+                                                         len(windows)))
+
+    # A pull request might be returned twice if it was modified while the
+    # windows were requested
+    items = {}
+    for window in windows:
+        for page in iter_pull_request_pages(
+                repository, milestone, sorting, None, session,
+                list(qualifiers) + [
+                    github_export_pull_requests.format_date_window(
+                        *window)]):
+            for item in page["items"]:
+                items[item["number"]] = item
+
+    items = github_export_pull_requests.sort_pull_requests(
+        list(items.values()), sorting)
+    return {"total_count": len(items), "incomplete_results": False,
+            "items": items}
+
+
+def request_pull_requests(repository, milestone, sorting, token,
+                          session=None):
+    """ Retrieve all the pull requests associated to a milestone for a given
+        repository through the GraphQL API, and concatenate the pages while
+        preserving the sorting order. """
+
+    pages = iter_pull_request_pages(repository, milestone, sorting, token,
+                                    session)
+    pull_requests = next(pages)
+    for page in pages:
+        pull_requests["items"].extend(page["items"])
+
+    return pull_requests
+
+
+def stream(repo_param, milestone_param, sorting_param, token, report=None):
+    """ Export the pull requests associated to a milestone and yield the
+        pages of the response as soon as they are received. The requests are
+        recorded in the run report if one is provided. RequestException is
+        raised if the pull requests could not be retrieved. """
+
+    return iter_pull_request_pages(
+        repo_param, milestone_param, sorting_param, token,
+        github_session.create_session(token, report=report))
+
+
+def execute(repo_param, milestone_param, sorting_param, token, output=None,
+            report=None):
+    """ Export the pull requests associated to a milestone and return them.
+        They are also written in the output JSON file if one is provided.
+        The requests are recorded in the run report if one is provided.
+        None is returned if the pull requests could not be retrieved. """
+
+    try:
+        pull_requests = request_pull_requests(
+            repo_param, milestone_param, sorting_param, token,
+            github_session.create_session(token, report=report))
+    except RequestException as _:
+        print("Exception while trying to access GitHub")
+        return None
+
+    if output:
+        with run_report.measure(report, "write {}".format(output)):
+            github_export_pull_requests.save_pull_requests(pull_requests,
+                                                           output)
+    return pull_requests
+
+
+def main():
+    arg_parser = setup_arg_parser()
+    args = arg_parser.parse_args()
+
+    repo_param, milestone_param = \
+        github_export_pull_requests.build_search_parameters(
+            args.owner, args.repo, args.milestone)
+    sorting_param = "sort:{}".format(args.sort)
+
+    execute(repo_param, milestone_param, sorting_param, args.token,
+            args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+
+import email.utils
+import time
+import requests
+from requests.exceptions import ConnectionError as RequestsConnectionError, \
+    Timeout
+
+try:
+    from bin import github_transport, rate_limit, run_report
+except ImportError:  # Executed as a stand-alone script from the bin folder
+    import github_transport
+    import rate_limit
+    import run_report
+
+GITHUB_API_URL = "https://api.github.com"
+
+# Responses with these status codes may be retried: 403 and 429 are only
+# retried when they come from GitHub's (secondary) rate limits
+RETRY_STATUS_CODES = (403, 429, 500, 502, 503, 504)
+MAX_RETRIES = 5
+BACKOFF_FACTOR = 2  # Seconds, doubled after each failed attempt
+MAX_BACKOFF = 60  # Seconds
+REQUEST_TIMEOUT = 30  # Seconds
+
+
+def create_session(token=None, pool_size=10, report=None):
+    """ Create a HTTP session that can be shared by all the requests sent to
+        the GitHub API. Connections are kept alive and pooled, so that a new
+        TLS handshake is not needed for every page, and compressed responses
+        are negotiated. The session holds the rate limiter pacing all the
+        requests sent through it, and the run report recording them if one
+        is provided. Requests are sent through the current transport of
+        github_transport: when responses are replayed from a cassette, they
+        are not paced. """
+
+    transport = github_transport.current
+    session = requests.Session()
+    adapter = transport.get_adapter(pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    session.headers.update({
+        "Accept": "application/vnd.github+json",
+        "Accept-Encoding": "gzip, deflate",
+        "Connection": "keep-alive"})
+    if token:
+        session.headers["Authorization"] = "token {}".format(token)
+    session.rate_limiter = None if transport.mode == github_transport.REPLAY \
+        else rate_limit.RateLimiter(authenticated=bool(token))
+    session.run_report = report
+
+    return session
+
+
+def is_rate_limited(response):
+    """ Check whether a 403/429 response was caused by GitHub's primary or
+        secondary rate limits rather than by missing permissions. """
+
+    if response.status_code == 429:
+        return True
+    if "Retry-After" in response.headers:
+        return True
+    if response.headers.get("X-RateLimit-Remaining") == "0":
+        return True
+    try:
+        message = response.json().get("message", "")
+    except ValueError:
+        return False
+    return "rate limit" in message.lower()
+
+
+def get_retry_delay(response, attempt):
+    """ Compute the number of seconds to wait before retrying a request.
+        GitHub's "Retry-After" header is used first, then the
+        "X-RateLimit-Reset" timestamp if the rate limit is exhausted; an
+        exponential backoff is used otherwise. """
+
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            if retry_after.isdigit():
+                return int(retry_after)
+            retry_date = email.utils.parsedate_to_datetime(retry_after)
+            return max(0, retry_date.timestamp() - time.time())
+
+        reset = response.headers.get("X-RateLimit-Reset")
+        if response.headers.get("X-RateLimit-Remaining") == "0" and reset:
+            # Add a second to make sure the limit has effectively been reset
+            return max(0, int(reset) - time.time()) + 1
+
+    return min(BACKOFF_FACTOR * 2 ** attempt, MAX_BACKOFF)
+
+
+def decode_json(session, response):
+    """ Decode the JSON body of a response, timing it in the session's run
+        report if it has one. """
+
+    with run_report.measure(getattr(session, "run_report", None),
+                            "json_decode"):
+        return response.json()
+
+
+def send_request(session, url, params=None, headers=None,
+                 max_retries=MAX_RETRIES, cache=None, json_data=None):
+    """ Send a GET request through the session and return the response, or a
+        POST request if JSON data is provided. Rate-limited responses, server
+        errors and network errors are retried up to max_retries times before
+        the last response is returned (or the last exception is raised). If a
+        response cache is provided, the request is made conditional and the
+        cached body is reused when GitHub answers that it has not been
+        modified; responses are only reused for the session's credentials.
+        Requests are paced by the session's rate limiter, if it has one, and
+        recorded in its run report, if it has one. """
+
+    rate_limiter = getattr(session, "rate_limiter", None)
+    report = getattr(session, "run_report", None)
+
+    entry = None
+    if json_data is not None:
+        cache = None  # Only GET requests can be cached
+    authorization = session.headers.get("Authorization")
+    if cache:
+        entry = cache.load(url, params, authorization)
+        headers = dict(headers or {})
+        headers.update(cache.get_conditional_headers(entry))
+
+    for attempt in range(max_retries + 1):
+        if rate_limiter:
+            wait = rate_limiter.acquire(url)
+            if report and wait > 0:
+                report.add_time("rate_limit_wait", wait)
+        start = time.perf_counter()
+        try:
+            if json_data is not None:
+                response = session.post(url, json=json_data, headers=headers,
+                                        timeout=REQUEST_TIMEOUT)
+            else:
+                response = session.get(url, params=params, headers=headers,
+                                       timeout=REQUEST_TIMEOUT)
+        except (RequestsConnectionError, Timeout):
+            if report:
+                report.add_counter("network_errors")
+            if attempt == max_retries:
+                raise
+            if report:
+                report.add_counter("retries")
+            delay = get_retry_delay(None, attempt)
+            print("Network error while accessing GitHub, retrying in {:.0f}s"
+                  .format(delay))
+            time.sleep(delay)
+            continue
+
+        if report:
+            report.add_time("http", time.perf_counter() - start)
+            report.add_counter("requests")
+            report.add_counter("bytes_received", len(response.content))
+        if rate_limiter:
+            rate_limiter.update(response)
+
+        code = response.status_code
+        if code not in RETRY_STATUS_CODES or attempt == max_retries:
+            break
+        if code in (403, 429) and not is_rate_limited(response):
+            break
+
+        if report:
+            report.add_counter("retries")
+        delay = get_retry_delay(response, attempt)
+        print("Error {} from GitHub, retrying in {:.0f}s".format(code, delay))
+        time.sleep(delay)
+
+    if cache:
+        if response.status_code == 304 and entry:
+            if report:
+                report.add_counter("cache_hits")
+            return cache.to_response(entry)
+        if response.status_code == 200:
+            cache.store(url, params, response, authorization)
+
+    return response
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+
+import hashlib
+import json
+import os
+import time
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.exceptions import RequestException
+from requests.structures import CaseInsensitiveDict
+
+try:
+    from bin import atomic_file
+except ImportError:  # Executed as a stand-alone script from the bin folder
+    import atomic_file
+
+LIVE = "live"
+RECORD = "record"
+REPLAY = "replay"
+TRANSPORT_MODES = (LIVE, RECORD, REPLAY)
+DEFAULT_CASSETTE_DIR = "cassette"
+
+# Headers that are not recorded: the recorded body is already decoded, and
+# its length might differ once it is written again
+EXCLUDED_HEADERS = ("Content-Encoding", "Transfer-Encoding", "Content-Length")
+# Headers removed from the recorded requests, so that every response is
+# recorded in full instead of being a 304 answered from the local cache
+CONDITIONAL_HEADERS = ("If-None-Match", "If-Modified-Since")
+
+
+class CassetteMissError(RequestException):
+    """ Raised when replaying a request that was not recorded. """
+
+
+def get_cassette_path(cassette_dir, request):
+    """ Get the path of the file in which the response to a request is
+        recorded, identified by the request's method, URL and body. The
+        authentication token is not part of it, so a cassette recorded with
+        a token can be replayed without one. """
+
+    body = request.body or b""
+    if isinstance(body, str):
+        body = body.encode("utf8")
+    digest = hashlib.sha256(request.method.encode("utf8") + b" " +
+                            request.url.encode("utf8") + b"\n" +
+                            body).hexdigest()[:32]
+    return os.path.join(cassette_dir, "{}.json".format(digest))
+
+
+class RecordingAdapter(HTTPAdapter):
+    """ Transport adapter sending the requests to GitHub, and recording
+        every response (status code, headers including the pagination's
+        Link header, and body) in the cassette directory. """
+
+    def __init__(self, cassette_dir, **kwargs):
+        super().__init__(**kwargs)
+        self.cassette_dir = cassette_dir
+        os.makedirs(cassette_dir, exist_ok=True)
+
+    def send(self, request, **kwargs):
+        for header in CONDITIONAL_HEADERS:
+            request.headers.pop(header, None)
+
+        response = super().send(request, **kwargs)
+
+        path = get_cassette_path(self.cassette_dir, request)
+        with atomic_file.atomic_write(path) as cassette_file:
+            json.dump({
+                "method": request.method,
+                "url": request.url,
+                "status_code": response.status_code,
+                "reason": response.reason,
+                "headers": {header: value
+                            for header, value in response.headers.items()
+                            if header not in EXCLUDED_HEADERS},
+                "body": response.content.decode("utf8")
+            }, cassette_file, indent=1)
+
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """ Transport adapter answering the requests with the responses recorded
+        in the cassette directory, without any network access, after an
+        optional latency (in seconds). """
+
+    def __init__(self, cassette_dir, latency=0):
+        super().__init__()
+        self.cassette_dir = cassette_dir
+        self.latency = latency
+
+    def send(self, request, **kwargs):
+        path = get_cassette_path(self.cassette_dir, request)
+        try:
+            with open(path, "r", encoding="utf8") as cassette_file:
+                recorded = json.load(cassette_file)
+        except OSError:
+            raise CassetteMissError(
+                "No response recorded in {} for {} {}".format(
+                    self.cassette_dir, request.method, request.url),
+                request=request)
+
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+        response = requests.Response()
+        response.status_code = recorded["status_code"]
+        response.reason = recorded["reason"]
+        response.headers = CaseInsensitiveDict(recorded["headers"])
+        response.url = recorded["url"]
+        response.encoding = "utf-8"
+        response._content = recorded["body"].encode("utf-8")
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+class Transport:
+    """ Transport used by the HTTP sessions sent to the GitHub API: live
+        (requests are sent to GitHub), record (requests are sent to GitHub
+        and their responses are recorded in the cassette directory) or
+        replay (responses are read from the cassette directory, after an
+        optional latency in seconds, without any network access). """
+
+    def __init__(self, mode=LIVE, cassette_dir=DEFAULT_CASSETTE_DIR,
+                 latency=0):
+        if mode not in TRANSPORT_MODES:
+            raise ValueError("Unknown transport mode {}".format(mode))
+        self.mode = mode
+        self.cassette_dir = cassette_dir
+        self.latency = latency
+
+    def get_adapter(self, pool_size):
+        """ Get the transport adapter the sessions send their requests
+            through. """
+
+        if self.mode == RECORD:
+            return RecordingAdapter(self.cassette_dir,
+                                    pool_connections=pool_size,
+                                    pool_maxsize=pool_size)
+        if self.mode == REPLAY:
+            return ReplayAdapter(self.cassette_dir, self.latency)
+        return HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+
+
+# Transport of the sessions created by github_session, live unless the
+# command line requests otherwise
+current = Transport()
+
+
+def configure(mode, cassette_dir=DEFAULT_CASSETTE_DIR, latency=0):
+    """ Set the transport of the sessions that are created from now on. """
+
+    global current
+    current = Transport(mode, cassette_dir, latency)
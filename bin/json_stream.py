@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+
+import json
+import re
+
+try:  # Faster parser, used if it is installed
+    import ijson
+except ImportError:
+    ijson = None
+
+CHUNK_SIZE = 64 * 1024  # Characters read from the file at once
+WHITESPACE = re.compile(r"\s*")
+
+
+class JsonStreamReader:
+    """ Minimal incremental JSON reader, which only keeps the part of the
+        file that has not been decoded yet in memory. It is used to walk the
+        top-level object of an exported JSON file and decode the pull
+        requests one by one. """
+
+    def __init__(self, json_file):
+        self.json_file = json_file
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+
+    def read_more(self):
+        """ Read the next chunk of the file, dropping what has already been
+            decoded. Return False if the end of the file has been reached. """
+
+        if self.eof:
+            return False
+        chunk = self.json_file.read(CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        return True
+
+    def next_char(self):
+        """ Skip whitespaces and return the next character without consuming
+            it, or an empty string at the end of the file. """
+
+        while True:
+            self.position = WHITESPACE.match(
+                self.buffer, self.position).end()
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.read_more():
+                return ""
+
+    def expect(self, characters):
+        """ Consume the next character, which must be one of characters. """
+
+        char = self.next_char()
+        if not char or char not in characters:
+            raise ValueError("Expected one of '{}' at position {}, got '{}'"
+                             .format(characters, self.position, char))
+        self.position = self.position + 1
+        return char
+
+    def decode_value(self):
+        """ Decode the next JSON value, reading more of the file as long as
+            the value is incomplete. """
+
+        self.next_char()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(
+                    self.buffer, self.position)
+                # A value that ends the buffer might be truncated (numbers)
+                if end < len(self.buffer) or self.eof:
+                    self.position = end
+                    return value
+            except ValueError:
+                if self.eof:
+                    raise
+            self.read_more()
+
+    def iter_array(self):
+        """ Decode the elements of the array starting at the current position
+            one by one. """
+
+        self.expect("[")
+        if self.next_char() == "]":
+            self.position = self.position + 1
+            return
+        while True:
+            yield self.decode_value()
+            if self.expect(",]") == "]":
+                return
+
+
+def iter_items_fallback(json_file):
+    """ Iterate over the pull requests of an exported JSON file with the
+        incremental reader. """
+
+    reader = JsonStreamReader(json_file)
+    reader.expect("{")
+    if reader.next_char() == "}":
+        return
+    while True:
+        key = reader.decode_value()
+        reader.expect(":")
+        if key == "items":
+            yield from reader.iter_array()
+        else:
+            reader.decode_value()
+        if reader.expect(",}") == "}":
+            return
+
+
+def iter_items(input_file):
+    """ Iterate over the pull requests of an exported JSON file without
+        loading the whole file in memory. ijson is used if it is installed,
+        and a pure Python incremental reader otherwise. """
+
+    if ijson:
+        with open("{}".format(input_file), "rb") as json_file:
+            yield from ijson.items(json_file, "items.item", use_float=True)
+    else:
+        with open("{}".format(input_file), "r",
+                  encoding="utf8") as json_file:
+            yield from iter_items_fallback(json_file)
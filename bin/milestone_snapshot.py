@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+
+import json
+
+try:
+    from bin import atomic_file
+except ImportError:  # Executed as a stand-alone script from the bin folder
+    import atomic_file
+
+
+def load_snapshot(snapshot_file, query):
+    """ Load the snapshot of a previous export. None is returned if there is
+        no snapshot yet, or if it was made for a different milestone or
+        repository. """
+
+    try:
+        with open(snapshot_file, "r", encoding="utf8") as json_file:
+            snapshot = json.load(json_file)
+    except (OSError, ValueError):
+        return None
+
+    if snapshot.get("query") != query:
+        print("Ignoring snapshot {} made for a different query"
+              .format(snapshot_file))
+        return None
+
+    return snapshot
+
+
+def save_snapshot(snapshot_file, query, pull_requests):
+    """ Save the pull requests of an export along with the query that was
+        used and the most recent update time among the pull requests, which
+        is the starting point of the next incremental export. """
+
+    snapshot = dict(pull_requests)
+    snapshot["query"] = query
+    snapshot["updated_at"] = get_high_water_mark(pull_requests["items"])
+
+    with atomic_file.atomic_write(snapshot_file) as json_file:
+        json.dump(snapshot, json_file, separators=(",", ":"))
+
+
+def get_high_water_mark(items):
+    """ Get the most recent update time among the pull requests. ISO 8601
+        timestamps returned by GitHub can be compared as strings. """
+
+    return max((item["updated_at"] for item in items), default=None)
+
+
+def merge_pull_requests(snapshot, updated_pull_requests, removed=()):
+    """ Merge pull requests that were created or updated since the snapshot
+        into it. Pull requests are identified by their number: updated ones
+        replace their previous version, new ones are added at the end, and
+        the ones whose number is in removed are dropped. """
+
+    items = {item["number"]: item for item in snapshot["items"]
+             if item["number"] not in removed}
+    for item in updated_pull_requests["items"]:
+        items[item["number"]] = item
+
+    merged = dict(updated_pull_requests)
+    merged["items"] = list(items.values())
+    merged["total_count"] = len(merged["items"])
+    return merged
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+
+import hashlib
+import json
+import os
+import shutil
+
+try:
+    from bin import atomic_file
+except ImportError:  # Executed as a stand-alone script from the bin folder
+    import atomic_file
+
+
+class PageCheckpoint:
+    """ Checkpoint of the pages of an export, stored in a directory next to
+        the exported file. Every page received from GitHub is written there
+        atomically, so that an export that was interrupted can be resumed
+        from the pages that were already completely received. """
+
+    def __init__(self, directory, resume=False):
+        """ Open the checkpoint directory. Unless the export is resumed, the
+            pages of a previous export are removed. """
+
+        self.directory = directory
+        if not resume:
+            self.clear()
+        os.makedirs(directory, exist_ok=True)
+
+    def get_path(self, request_url, page):
+        """ Get the path of the file containing a page of a search. """
+
+        digest = hashlib.sha256(request_url.encode("utf8")).hexdigest()[:16]
+        return os.path.join(self.directory,
+                            "{}-page-{:04d}.json".format(digest, page))
+
+    def load(self, request_url, page):
+        """ Load a page of a search as (page data, True if there is a next
+            page), or None if the page has not been received yet. """
+
+        try:
+            with open(self.get_path(request_url, page), "r",
+                      encoding="utf8") as json_file:
+                checkpoint = json.load(json_file)
+        except (OSError, ValueError):
+            return None
+        return checkpoint["data"], checkpoint["has_next"]
+
+    def save(self, request_url, page, data, has_next):
+        """ Save a page of a search. The page is written in a temporary file
+            first so that a partially written page is never loaded. """
+
+        path = self.get_path(request_url, page)
+        with atomic_file.atomic_write(path) as json_file:
+            json.dump({"data": data, "has_next": has_next}, json_file,
+                      separators=(",", ":"))
+
+    def clear(self):
+        """ Remove all the pages, once the export is complete. """
+
+        shutil.rmtree(self.directory, ignore_errors=True)
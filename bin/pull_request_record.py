@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+
+import sys
+
+
+class PullRequestRecord:
+    """ Compact record of the fields of a pull request that are used to
+        classify and render it in the release note. Records are built once
+        per pull request when it is read, so that the following stages do
+        not go through the nested dictionaries returned by GitHub again. """
+
+    __slots__ = ("number", "title", "link", "link_text", "labels", "author",
+                 "merged", "merged_at", "milestone")
+
+    def __init__(self, number, title, link, labels, author, merged_at,
+                 milestone):
+        self.number = number
+        self.title = title
+        self.link = link
+        self.link_text = "PR #{}".format(number)  # Link text with --pr-nb
+        self.labels = labels  # Frozen set of the (interned) labels' names
+        self.author = author  # (login, profile link) tuple
+        self.merged = merged_at is not None
+        self.merged_at = merged_at  # ISO 8601 date, or None if not merged
+        self.milestone = milestone
+
+    @classmethod
+    def from_item(cls, item):
+        """ Build the record of a pull request returned by GitHub's search
+            API. """
+
+        milestone = item["milestone"]
+        return cls(item["number"], item["title"], item["html_url"],
+                   frozenset(sys.intern(label["name"])
+                             for label in item["labels"] or ()),
+                   (item["user"]["login"], item["user"]["html_url"]),
+                   item["pull_request"]["merged_at"],
+                   milestone["title"] if milestone else None)
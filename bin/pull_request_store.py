@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+
+import sqlite3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS authors (
+    login TEXT PRIMARY KEY,
+    html_url TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pull_requests (
+    repository TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    milestone TEXT COLLATE NOCASE,
+    position INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    html_url TEXT NOT NULL,
+    author TEXT NOT NULL REFERENCES authors (login),
+    merged_at TEXT,
+    updated_at TEXT,
+    PRIMARY KEY (repository, number)
+);
+CREATE INDEX IF NOT EXISTS pull_requests_milestone
+    ON pull_requests (repository, milestone, position);
+CREATE INDEX IF NOT EXISTS pull_requests_merged
+    ON pull_requests (repository, milestone, position)
+    WHERE merged_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS pull_requests_unmerged
+    ON pull_requests (repository, milestone)
+    WHERE merged_at IS NULL;
+CREATE TABLE IF NOT EXISTS labels (
+    repository TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (repository, number, name)
+);
+DROP INDEX IF EXISTS labels_name;
+"""
+
+# Queries selecting the pull requests of a milestone, formatted with the
+# filter of the merged pull requests if only they are selected. The labels
+# are looked up from the pull requests of the milestone (CROSS JOIN keeps
+# that order) by the primary key of the labels, rather than from all the
+# labels of the repository
+MERGED_FILTER = " AND merged_at IS NOT NULL"
+LABELS_QUERY = (
+    "SELECT labels.number, labels.name FROM pull_requests "
+    "CROSS JOIN labels USING (repository, number) "
+    "WHERE repository = ? AND milestone = ?{} ORDER BY labels.rowid")
+PULL_REQUESTS_QUERY = (
+    "SELECT number, title, pull_requests.html_url, login, "
+    "authors.html_url, milestone, merged_at, updated_at "
+    "FROM pull_requests "
+    "JOIN authors ON authors.login = pull_requests.author "
+    "WHERE repository = ? AND milestone = ?{} ORDER BY position")
+UNMERGED_COUNT_QUERY = (
+    "SELECT COUNT(*) FROM pull_requests "
+    "WHERE repository = ? AND milestone = ? AND merged_at IS NULL")
+
+
+class PullRequestStore:
+    """ Persistent SQLite store of the exported pull requests, with their
+        labels and authors. Exports are upserted into it, and the pull
+        requests of a milestone can then be selected with indexed queries to
+        format its release note again, without requesting GitHub nor parsing
+        a whole JSON file. """
+
+    def __init__(self, database):
+        self.connection = sqlite3.connect(database)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def upsert(self, repository, pull_requests):
+        """ Insert the exported pull requests of a repository ("owner/repo"),
+            or update them if they are already stored. Their position in the
+            export is kept so that they are selected in the same order. Pull
+            requests that are no longer part of a milestone remain stored
+            with it until they are exported again. """
+
+        with self.connection:
+            for position, item in enumerate(pull_requests["items"]):
+                user = item["user"]
+                milestone = item.get("milestone")
+                self.connection.execute(
+                    "INSERT INTO authors (login, html_url) VALUES (?, ?) "
+                    "ON CONFLICT (login) DO UPDATE "
+                    "SET html_url = excluded.html_url",
+                    (user["login"], user["html_url"]))
+                self.connection.execute(
+                    "INSERT INTO pull_requests (repository, number, "
+                    "milestone, position, title, html_url, author, "
+                    "merged_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (repository, number) DO UPDATE "
+                    "SET milestone = excluded.milestone, "
+                    "position = excluded.position, title = excluded.title, "
+                    "html_url = excluded.html_url, author = excluded.author, "
+                    "merged_at = excluded.merged_at, "
+                    "updated_at = excluded.updated_at",
+                    (repository, item["number"],
+                     milestone["title"] if milestone else None, position,
+                     item["title"], item["html_url"], user["login"],
+                     item["pull_request"]["merged_at"],
+                     item.get("updated_at")))
+                self.connection.execute(
+                    "DELETE FROM labels WHERE repository = ? AND number = ?",
+                    (repository, item["number"]))
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO labels (repository, number, name) "
+                    "VALUES (?, ?, ?)",
+                    [(repository, item["number"], label["name"])
+                     for label in item["labels"]])
+
+    def load_milestone(self, repository, milestone, merged_only=False):
+        """ Select the pull requests of a milestone (case-insensitively) in
+            the order they were exported, with the structure returned by
+            GitHub's REST API limited to the fields that are used to format
+            the release note. If merged_only is set, only the merged pull
+            requests are selected, and the number of the unmerged ones is
+            returned as "unmerged_count" (the formatter ignores them
+            anyway). """
+
+        merged_filter = MERGED_FILTER if merged_only else ""
+
+        labels = {}
+        for number, name in self.connection.execute(
+                LABELS_QUERY.format(merged_filter), (repository, milestone)):
+            labels.setdefault(number, []).append({"name": name})
+
+        items = []
+        for number, title, html_url, login, author_url, milestone_title, \
+                merged_at, updated_at in self.connection.execute(
+                    PULL_REQUESTS_QUERY.format(merged_filter),
+                    (repository, milestone)):
+            items.append({
+                "number": number,
+                "title": title,
+                "html_url": html_url,
+                "labels": labels.get(number, []),
+                "user": {"login": login, "html_url": author_url},
+                "milestone": {"title": milestone_title},
+                "pull_request": {"merged_at": merged_at},
+                "updated_at": updated_at
+            })
+
+        pull_requests = {"total_count": len(items),
+                         "incomplete_results": False, "items": items}
+        if merged_only:
+            pull_requests["unmerged_count"], = self.connection.execute(
+                UNMERGED_COUNT_QUERY, (repository, milestone)).fetchone()
+            pull_requests["total_count"] = len(items) + \
+                pull_requests["unmerged_count"]
+        return pull_requests
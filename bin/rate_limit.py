@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+
+import threading
+import time
+
+# Requests allowed by GitHub per time window (in seconds) for each resource
+AUTHENTICATED_LIMITS = {"search": (30, 60), "core": (5000, 3600),
+                        "graphql": (5000, 3600)}
+UNAUTHENTICATED_LIMITS = {"search": (10, 60), "core": (60, 3600),
+                          "graphql": (0, 3600)}
+
+
+def get_resource(url):
+    """ Get the GitHub API resource whose rate limit applies to a URL. """
+
+    if "/search/" in url:
+        return "search"
+    if url.endswith("/graphql"):
+        return "graphql"
+    return "core"
+
+
+class TokenBucket:
+    """ Token bucket pacing the requests sent for a resource: tokens are
+        refilled continuously so that the whole limit is spread over GitHub's
+        time window instead of being used in a single burst. """
+
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self.tokens = float(limit)
+        self.updated = time.monotonic()
+        self.remaining = None  # Last values reported by GitHub
+        self.reset = None
+        self.blocked_until = 0.0  # No request can be sent before that time
+        self.blocked_reset = None  # Reset the requests were blocked until
+
+    def refill(self, now):
+        """ Add the tokens earned since the last refill. """
+
+        if self.window > 0 and now > self.updated:
+            self.tokens = min(self.limit, self.tokens + (
+                now - self.updated) * self.limit / self.window)
+        self.updated = max(self.updated, now)
+
+    def reserve(self):
+        """ Take a token and return the number of seconds to wait before it
+            can be used. """
+
+        now = time.monotonic()
+
+        # GitHub's own count takes precedence: once it is exhausted, nothing
+        # can be sent before the reset (plus a second to make sure it has
+        # effectively been reset), whatever the bucket contains
+        if self.remaining == 0 and self.reset != self.blocked_reset:
+            self.blocked_reset = self.reset
+            reset_wait = (self.reset or 0) - time.time() + 1
+            if reset_wait > 0:
+                # The whole budget is available again after the reset
+                self.blocked_until = now + reset_wait
+                self.tokens = float(self.limit)
+                self.updated = self.blocked_until
+
+        start = max(now, self.blocked_until)
+        self.refill(start)
+        self.tokens = self.tokens - 1
+        wait = start - now
+        if self.tokens < 0 and self.limit > 0:
+            wait = wait + -self.tokens * self.window / self.limit
+        return wait
+
+
+class RateLimiter:
+    """ Scheduler shared by all the requests sent to the GitHub API. It keeps
+        track of the search, core and GraphQL budgets from the headers of the
+        responses, and paces the requests so that the budgets are never
+        exhausted: when a budget is low, the requests wait just long enough
+        instead of failing. """
+
+    def __init__(self, authenticated=True):
+        limits = AUTHENTICATED_LIMITS if authenticated \
+            else UNAUTHENTICATED_LIMITS
+        self.buckets = {resource: TokenBucket(limit, window)
+                        for resource, (limit, window) in limits.items()}
+        self.lock = threading.Lock()
+        self.waited = 0.0  # Total time spent waiting for the budgets
+
+    def acquire(self, url):
+        """ Wait until a request can be sent to the URL, and return the
+            number of seconds waited. """
+
+        resource = get_resource(url)
+        with self.lock:
+            wait = self.buckets[resource].reserve()
+            self.waited = self.waited + wait
+        if wait > 0:
+            print("Waiting {:.1f}s for the {} rate limit budget"
+                  .format(wait, resource))
+            time.sleep(wait)
+        return max(wait, 0)
+
+    def update(self, response):
+        """ Update a budget with the rate limit headers of a response. """
+
+        headers = response.headers
+        if "X-RateLimit-Remaining" not in headers:
+            return
+
+        resource = headers.get("X-RateLimit-Resource",
+                               get_resource(response.request.url))
+        with self.lock:
+            bucket = self.buckets.get(resource)
+            if bucket is None:
+                bucket = self.buckets[resource] = TokenBucket(
+                    int(headers.get("X-RateLimit-Limit", 0)), 3600)
+            bucket.refill(time.monotonic())
+            if "X-RateLimit-Limit" in headers:
+                bucket.limit = int(headers["X-RateLimit-Limit"])
+            bucket.remaining = int(headers["X-RateLimit-Remaining"])
+            if "X-RateLimit-Reset" in headers:
+                bucket.reset = int(headers["X-RateLimit-Reset"])
+            # Never send more requests than GitHub still allows
+            bucket.tokens = min(bucket.tokens, bucket.remaining)
+
+    def get_budget(self):
+        """ Get the current budget of each resource as reported by GitHub,
+            for logging purposes. """
+
+        with self.lock:
+            return {resource: {"limit": bucket.limit,
+                               "remaining": bucket.remaining,
+                               "reset": bucket.reset}
+                    for resource, bucket in self.buckets.items()
+                    if bucket.remaining is not None}
+
+    def format_budget(self):
+        """ Format the current budgets as a readable line. """
+
+        budget = self.get_budget()
+        if not budget:
+            return "Rate limit budget: unknown"
+        return "Rate limit budget: {}".format(", ".join(
+            "{} {}/{}".format(resource, values["remaining"], values["limit"])
+            for resource, values in sorted(budget.items())))
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import contextlib
+import io
+import json
+import os
+from requests.exceptions import RequestException
+
+try:
+    from bin import format_release_note, github_cache, \
+        github_export_pull_requests, github_session, run_report
+except ImportError:  # Executed as a stand-alone script from the bin folder
+    import format_release_note
+    import github_cache
+    import github_export_pull_requests
+    import github_session
+    import run_report
+
+
+def load_manifest(manifest_file):
+    """ Load the list of targets from a JSON manifest. The manifest contains a
+        list of objects with the "owner", "repo" and "milestone" of each
+        target, and optionally the "output" directory its files are written
+        into (default: [owner]/[repo]). """
+
+    with open(manifest_file, "r", encoding="utf8") as json_file:
+        targets = json.load(json_file)
+
+    for target in targets:
+        for key in ("owner", "repo", "milestone"):
+            if key not in target:
+                raise ValueError("Target {} in {} has no {}"
+                                 .format(target, manifest_file, key))
+        target.setdefault("output",
+                          os.path.join(target["owner"], target["repo"]))
+
+    return targets
+
+
+def get_target_name(target):
+    """ Get a readable name for a target. """
+
+    return "{}/{} {}".format(target["owner"], target["repo"],
+                             target["milestone"])
+
+
+def export_repository(targets, sorting_param, session, cache):
+    """ Export the pull requests of targets that all belong to the same
+        repository, with a single search covering all their milestones if
+        there are several. Return the pull requests of each target, or None
+        for all of them if they could not be retrieved. """
+
+    owner, repo = targets[0]["owner"], targets[0]["repo"]
+    milestones = [target["milestone"] for target in targets]
+
+    try:
+        if len(milestones) == 1:
+            repo_param, milestone_param = \
+                github_export_pull_requests.build_search_parameters(
+                    owner, repo, milestones[0])
+            return [github_export_pull_requests.request_pull_requests(
+                repo_param, milestone_param, sorting_param, None,
+                session=session, cache=cache)]
+
+        repo_param, _ = github_export_pull_requests.build_search_parameters(
+            owner, repo, "")
+        pull_requests = \
+            github_export_pull_requests.request_milestones_pull_requests(
+                repo_param, milestones, sorting_param, None,
+                session=session, cache=cache)
+        return [pull_requests[milestone] for milestone in milestones]
+    except RequestException as _:
+        print("Exception while trying to access GitHub for {}/{}"
+              .format(owner, repo))
+        return [None] * len(targets)
+
+
+def format_target(pull_requests, output_dir, format_options,
+                  skip_unchanged=False, record_report=False):
+    """ Format the pull requests of a target in its output directory (only
+        writing the files whose content changed if skip_unchanged is set),
+        and return the final report, which is captured so that the reports of
+        the targets formatted in parallel do not get mixed. If record_report
+        is set, the run report of the formatting is returned as well (as a
+        dictionary, to be sent back from the worker process), or None
+        otherwise. """
+
+    final_report = io.StringIO()
+    target_report = run_report.RunReport() if record_report else None
+    with contextlib.redirect_stdout(final_report):
+        format_release_note.execute(
+            pull_requests, output_options=format_release_note.OutputOptions(
+                output_dir=output_dir, skip_unchanged=skip_unchanged,
+                report=target_report), **format_options)
+    return final_report.getvalue(), \
+        target_report.to_dict() if target_report else None
+
+
+def execute(targets, sorting_param, token, format_options, concurrency=1,
+            cache_dir=None, jobs=None, save=False, report=None,
+            skip_unchanged=False):
+    """ Generate the release notes of several targets at once. All the
+        targets are exported through a single session, with at most
+        concurrency requests sent to GitHub at the same time and a single
+        search for all the milestones of a same repository, and formatted
+        in parallel in a pool of jobs processes (default: one per CPU). The
+        files of each target are written in its own output directory (only
+        the ones whose content changed if skip_unchanged is set). The
+        requests and the time spent exporting and formatting are recorded in
+        the run report if one is provided, along with the stages of the
+        formatting of every target (which are added up) and the counters of
+        its final report (indexed by the name of the target). """
+
+    session = github_session.create_session(
+        token, pool_size=max(10, concurrency), report=report)
+    cache = github_cache.ResponseCache(cache_dir) if cache_dir else None
+
+    # Targets of the same repository are exported with a single search
+    repositories = {}
+    for target in targets:
+        repositories.setdefault((target["owner"], target["repo"]),
+                                []).append(target)
+
+    with run_report.measure(report, "export"), \
+            ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        repositories_exports = executor.map(
+            lambda repository_targets: export_repository(
+                repository_targets, sorting_param, session, cache),
+            repositories.values())
+        exports = {}
+        for repository_targets, repository_exports in zip(
+                repositories.values(), repositories_exports):
+            for target, pull_requests in zip(repository_targets,
+                                             repository_exports):
+                exports[id(target)] = pull_requests
+    exports = [exports[id(target)] for target in targets]
+    if session.rate_limiter:
+        print(session.rate_limiter.format_budget())
+
+    with run_report.measure(report, "format"), \
+            ProcessPoolExecutor(max_workers=jobs) as executor:
+        formattings = []
+        for target, pull_requests in zip(targets, exports):
+            if pull_requests is None:
+                formattings.append(None)
+                continue
+            os.makedirs(target["output"], exist_ok=True)
+            if save:
+                github_export_pull_requests.save_pull_requests(
+                    pull_requests,
+                    os.path.join(target["output"], "githublist.json"))
+            formattings.append(executor.submit(
+                format_target, pull_requests, target["output"],
+                format_options, skip_unchanged, report is not None))
+
+        for target, formatting in zip(targets, formattings):
+            print("==== {} ====".format(get_target_name(target)))
+            if formatting is None:
+                print("Skipped: the pull requests could not be retrieved")
+                continue
+            final_report, target_report = formatting.result()
+            print(final_report, end="")
+            if target_report:
+                for stage, values in target_report["stages"].items():
+                    report.add_time(stage, values["seconds"],
+                                    values["count"])
+                report.release_note[get_target_name(target)] = \
+                    target_report["release_note"]
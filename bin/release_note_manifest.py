@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+
+import hashlib
+import json
+import os
+
+try:
+    from bin import atomic_file
+except ImportError:  # Executed as a stand-alone script from the bin folder
+    import atomic_file
+
+# Name of the directory holding the manifests of the milestones, in the
+# directory the documents are written into
+MANIFEST_DIRNAME = ".release-note-manifest"
+
+
+def get_fingerprint(content):
+    """ Get the fingerprint of JSON serializable content, which does not
+        depend on the order of the keys of its dictionaries. """
+
+    serialized = json.dumps(content, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(serialized.encode("utf8")).hexdigest()
+
+
+class ReleaseNoteManifest:
+    """ Manifest of the documents of the release notes written in a
+        directory: for each milestone, the fingerprint of the content the
+        documents were rendered from (the classified pull requests, the
+        contributors and the rules) and the fingerprint of every document
+        that was written. It allows to skip the rendering of a milestone
+        whose content did not change, and to only write the documents that
+        changed, so that their files are not modified needlessly. Each
+        milestone has its own manifest file, so that the release notes of
+        several milestones can be written in the same directory in
+        parallel without overwriting the entries of each other. """
+
+    def __init__(self, output_dir=None):
+        self.output_dir = output_dir or ""
+        self.directory = os.path.join(self.output_dir, MANIFEST_DIRNAME)
+        self.milestones = {}  # Entries of the milestones already loaded
+
+    def get_path(self, milestone_title):
+        """ Get the path of the manifest file of a milestone, named after
+            a digest of its title, which might not be a valid filename. """
+
+        digest = hashlib.sha256(milestone_title.encode("utf8")).hexdigest()
+        return os.path.join(self.directory, "{}.json".format(digest[:16]))
+
+    def load(self, milestone_title):
+        """ Load the entry of a milestone, or None if it has none. """
+
+        if milestone_title not in self.milestones:
+            try:
+                with open(self.get_path(milestone_title), "r",
+                          encoding="utf8") as json_file:
+                    entry = json.load(json_file)
+            except (OSError, ValueError):
+                entry = None
+            if entry is not None and entry.get("milestone") != \
+                    milestone_title:
+                entry = None
+            self.milestones[milestone_title] = entry
+        return self.milestones[milestone_title]
+
+    def is_up_to_date(self, milestone_title, fingerprint):
+        """ Check whether the documents of a milestone were rendered from
+            the content with that fingerprint, and are all still there. """
+
+        entry = self.load(milestone_title)
+        return entry is not None and entry["fingerprint"] == fingerprint \
+            and all(os.path.exists(os.path.join(self.output_dir, filename))
+                    for filename in entry["documents"])
+
+    def get_changed_documents(self, milestone_title, documents):
+        """ Get the rendered documents of a milestone, provided as a
+            dictionary indexed by their filename, that differ from the
+            documents that were written, or whose file does not exist. """
+
+        written = (self.load(milestone_title) or {}).get("documents", {})
+        return {filename: document
+                for filename, document in documents.items()
+                if written.get(filename) != get_fingerprint(document) or
+                not os.path.exists(os.path.join(self.output_dir, filename))}
+
+    def update(self, milestone_title, fingerprint, documents):
+        """ Record the fingerprints of the content and of the documents of a
+            milestone, and save its manifest file. """
+
+        entry = self.milestones[milestone_title] = {
+            "milestone": milestone_title,
+            "fingerprint": fingerprint,
+            "documents": {filename: get_fingerprint(document)
+                          for filename, document in documents.items()}
+        }
+
+        os.makedirs(self.directory, exist_ok=True)
+        with atomic_file.atomic_write(self.get_path(milestone_title)) \
+                as json_file:
+            json.dump(entry, json_file, indent=4, sort_keys=True)
+            json_file.write("\n")
@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import time
+
+# Sections of the release note a pull request can be classified into
+HIGHLIGHTED = "highlighted"
+LABEL_EXCLUDED = "label-excluded"
+LABEL_INCLUDED = "label-included"
+WORD_EXCLUDED = "word-excluded"
+WORD_INCLUDED = "word-included"
+REGULAR = "regular"
+
+# Number of pull requests sent at once to a worker process to be classified
+CHUNK_SIZE = 2000
+
+# Rules of a worker process, received once when the process is started
+worker_rules = None
+
+
+class WordMatcher:
+    """ Aho-Corasick automaton finding all the words of a set that appear in
+        a text in a single pass over the text, whatever the number of words.
+        Every word is associated to a value, and the smallest value among the
+        words found in a text is returned. """
+
+    def __init__(self, words):
+        """ Build the automaton from (word, value) pairs. """
+
+        self.transitions = [{}]
+        self.fallbacks = [0]
+        self.values = [None]  # Smallest value of the words ending in a state
+
+        for word, value in words:
+            state = 0
+            for char in word:
+                next_state = self.transitions[state].get(char)
+                if next_state is None:
+                    next_state = len(self.transitions)
+                    self.transitions.append({})
+                    self.fallbacks.append(0)
+                    self.values.append(None)
+                    self.transitions[state][char] = next_state
+                state = next_state
+            self.values[state] = self.min_value(self.values[state], value)
+
+        # Breadth-first traversal to link every state to the state of its
+        # longest suffix, and inherit the values of the words ending there
+        queue = deque(self.transitions[0].values())
+        for state in queue:
+            self.values[state] = self.min_value(self.values[state],
+                                                self.values[0])
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.transitions[state].items():
+                queue.append(next_state)
+                fallback = self.fallbacks[state]
+                while fallback and char not in self.transitions[fallback]:
+                    fallback = self.fallbacks[fallback]
+                fallback = self.transitions[fallback].get(char, 0)
+                self.fallbacks[next_state] = fallback
+                self.values[next_state] = self.min_value(
+                    self.values[next_state], self.values[fallback])
+
+    @staticmethod
+    def min_value(first, second):
+        """ Get the smallest of two values that might be None. """
+
+        if first is None:
+            return second
+        if second is None:
+            return first
+        return min(first, second)
+
+    def find(self, text):
+        """ Get the smallest value of the words found in the text, or None if
+            none of the words appears in it. """
+
+        transitions = self.transitions
+        fallbacks = self.fallbacks
+        values = self.values
+
+        found = values[0]
+        state = 0
+        for char in text:
+            while state and char not in transitions[state]:
+                state = fallbacks[state]
+            state = transitions[state].get(char, 0)
+            if values[state] is not None:
+                found = self.min_value(found, values[state])
+        return found
+
+
+class RuleSet:
+    """ Compiled set of the rules used to classify the pull requests into the
+        sections of the release note, built once from all the labels and
+        words to highlight, include or exclude.
+
+        Each pull request is classified into a single section. The rules are
+        applied with the following precedence: highlighted labels, excluded
+        labels, included labels, excluded words and included words; pull
+        requests that match none of them are regular ones. Among rules of the
+        same kind, the first one provided wins. Labels are matched exactly
+        and case-sensitively, words are searched case-insensitively in the
+        titles. """
+
+    def __init__(self, highlighted_labels, excluded_labels, included_labels,
+                 excluded_words, included_words):
+        """ Build the rules from the lists and dictionaries of labels and
+            words of interest, as set up by format_release_note. """
+
+        # Every rule is identified by its rank, which sets its precedence
+        self.rules = []
+        self.label_ranks = {}
+        words = []
+
+        if highlighted_labels:
+            self.add_labels(highlighted_labels, HIGHLIGHTED, None)
+        for key, labels in excluded_labels.items():
+            self.add_labels(labels, LABEL_EXCLUDED, key)
+        for key, labels in included_labels.items():
+            self.add_labels(labels, LABEL_INCLUDED, key)
+        for key, rule_words in excluded_words.items():
+            words.extend(self.add_words(rule_words, WORD_EXCLUDED, key))
+        for key, rule_words in included_words.items():
+            words.extend(self.add_words(rule_words, WORD_INCLUDED, key))
+
+        self.word_matcher = WordMatcher(words) if words else None
+
+    def add_rule(self, section, key):
+        """ Add a rule and return its rank. """
+
+        self.rules.append((section, key))
+        return len(self.rules) - 1
+
+    def add_labels(self, labels, section, key):
+        """ Add a rule matching any of the labels. """
+
+        rank = self.add_rule(section, key)
+        for label in [labels] if isinstance(labels, str) else labels:
+            # A label used by several rules belongs to the first one
+            self.label_ranks.setdefault(label, rank)
+
+    def add_words(self, words, section, key):
+        """ Add a rule matching any of the words, and return the (word, rank)
+            pairs to search for. """
+
+        rank = self.add_rule(section, key)
+        return [(word, rank)
+                for word in ([words] if isinstance(words, str) else words)]
+
+    def classify(self, title, labels):
+        """ Get the section of the release note a pull request belongs to, as
+            a (section, key) tuple, key being the rule's labels or words as
+            they were provided (None for highlighted and regular sections). """
+
+        rank = None
+        label_ranks = self.label_ranks
+        for label in labels:
+            label_rank = label_ranks.get(label)
+            if label_rank is not None and (rank is None or label_rank < rank):
+                rank = label_rank
+
+        # Words rules all come after labels rules
+        if rank is None and self.word_matcher:
+            rank = self.word_matcher.find(title.lower())
+
+        if rank is None:
+            return REGULAR, None
+        return self.rules[rank]
+
+
+def init_worker(rules):
+    """ Initialize a worker process with the rules it classifies the pull
+        requests with. """
+
+    global worker_rules
+    worker_rules = rules
+
+
+def classify_chunk(chunk):
+    """ Classify a chunk of pull requests, provided as (title, labels)
+        pairs, in a worker process. """
+
+    classify = worker_rules.classify
+    return [classify(title, labels) for title, labels in chunk]
+
+
+class ParallelClassifier:
+    """ Classification of the pull requests in a pool of worker processes,
+        for inputs so large that lowering the titles and matching the rules
+        make a single process CPU-bound. The rule set is pickled once for
+        every worker, and the pull requests are sent to them by chunks, as
+        (title, labels) pairs only. The pull requests are yielded back in
+        their input order along with their classification, so that they are
+        placed in the same sections, in the same order, as if they had been
+        classified one after the other. """
+
+    def __init__(self, rules, jobs, chunk_size=CHUNK_SIZE):
+        self.rules = rules
+        self.jobs = jobs
+        self.chunk_size = chunk_size
+        self.wait_time = 0.0  # Time spent waiting for the worker processes
+
+    def classify(self, pull_requests):
+        """ Classify the merged pull requests among the records of the pull
+            requests, and yield every record along with its (section, key)
+            classification, None for the pull requests that were not
+            merged. """
+
+        with ProcessPoolExecutor(max_workers=self.jobs,
+                                 initializer=init_worker,
+                                 initargs=(self.rules,)) as executor:
+            pending = deque()  # (chunk, future) in the input order
+            chunk = []
+            for pr in pull_requests:
+                chunk.append(pr)
+                if len(chunk) < self.chunk_size:
+                    continue
+                pending.append((chunk, self.submit(executor, chunk)))
+                chunk = []
+                # Only a few chunks per worker are kept in memory
+                while len(pending) > 2 * self.jobs:
+                    yield from self.collect(*pending.popleft())
+            if chunk:
+                pending.append((chunk, self.submit(executor, chunk)))
+            while pending:
+                yield from self.collect(*pending.popleft())
+
+    @staticmethod
+    def submit(executor, chunk):
+        """ Send the merged pull requests of a chunk to a worker process. """
+
+        return executor.submit(classify_chunk, [(pr.title, pr.labels)
+                                                for pr in chunk if pr.merged])
+
+    def collect(self, chunk, future):
+        """ Wait for the classification of a chunk, and yield its pull
+            requests along with their classification. """
+
+        start = time.perf_counter()
+        classifications = iter(future.result())
+        self.wait_time = self.wait_time + time.perf_counter() - start
+
+        for pr in chunk:
+            yield pr, next(classifications) if pr.merged else None
@@ -0,0 +1,447 @@
+#!/usr/bin/env python
+
+import argparse
+import hashlib
+import hmac
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import io
+import json
+import threading
+from urllib.parse import unquote
+from requests.exceptions import RequestException
+
+try:
+    from bin import format_release_note, github_cache, \
+        github_export_pull_requests, github_session
+except ImportError:  # Executed as a stand-alone script from the bin folder
+    import format_release_note
+    import github_cache
+    import github_export_pull_requests
+    import github_session
+
+# Actions of the pull_request webhook events that can change the release note
+PULL_REQUEST_ACTIONS = ("closed", "reopened", "edited", "labeled",
+                        "unlabeled", "milestoned", "demilestoned")
+
+
+def setup_arg_parser():
+    """ Initialize the argument parser and set the list of arguments. """
+
+    arg_parser = argparse.ArgumentParser(
+        description="""Local HTTP service serving the release notes of
+                       milestones on demand. The pull requests of a milestone
+                       are exported from GitHub the first time its release
+                       note is requested, and then kept up to date in memory
+                       with GitHub's pull_request webhook events, so that the
+                       release notes are served without requesting GitHub
+                       again.""")
+    arg_parser.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="address the service listens on (default: 127.0.0.1)")
+    arg_parser.add_argument(
+        "--port",
+        type=int,
+        default=8000,
+        help="port the service listens on (default: 8000)")
+    arg_parser.add_argument(
+        "--webhook-secret",
+        dest="webhook_secret",
+        help="""secret of the GitHub webhook, used to check the signature of
+                the webhook events (optional: events are not checked without
+                it)""")
+    arg_parser.add_argument(
+        "-s", "--sort",
+        choices=["created-desc", "created-asc", "comments-desc",
+                 "comments-asc", "updated-desc", "updated-asc",
+                 "relevance-desc"],
+        default="updated-desc",
+        help="""sort the pull requests in the requested order
+                (default: updated-desc)""")
+    arg_parser.add_argument(
+        "-t", "--token",
+        help="""GitHub authentication token (optional: might be needed to
+                perform a lot of requests in a short amount of time)""")
+    arg_parser.add_argument(
+        "-j", "--concurrency",
+        type=int,
+        default=1,
+        help="""number of result pages requested in parallel once the total
+                number of pull requests is known (default: 1)""")
+    arg_parser.add_argument(
+        "--cache-dir",
+        dest="cache_dir",
+        default=github_cache.DEFAULT_CACHE_DIR,
+        help="""directory in which GitHub's responses are cached (default:
+                {})""".format(github_cache.DEFAULT_CACHE_DIR))
+    arg_parser.add_argument(
+        "--no-cache",
+        dest="no_cache",
+        action="store_true",
+        default=False,
+        help="do not use nor update the cache of GitHub's responses")
+    arg_parser.add_argument(
+        "--authors",
+        action="store_true",
+        default=False,
+        help="also render the list of pull requests authors in its own "
+             "document")
+    arg_parser.add_argument(
+        "--pr-nb",
+        dest="pr_nb",
+        action="store_true",
+        default=False,
+        help="include the merged pull requests' number with their link")
+    arg_parser.add_argument(
+        "--highlights",
+        nargs="+",
+        help="labels that need to be highlighted in the release note")
+    arg_parser.add_argument(
+        "--label-exclude",
+        dest="exclude",
+        nargs="+",
+        help="labels that will be excluded from the release note")
+    arg_parser.add_argument(
+        "--label-include",
+        dest="include",
+        nargs="+",
+        help="labels that will be included in the release note but in a "
+             "subsection")
+    arg_parser.add_argument(
+        "--word-exclude",
+        dest="word_exclude",
+        nargs="+",
+        help="words in the title of the pull requests that will be excluded "
+             "from the release note")
+    arg_parser.add_argument(
+        "--word-include",
+        dest="word_include",
+        nargs="+",
+        help="words in the title of the pull requests that will be included "
+             "in the release note but in a subsection")
+
+    return arg_parser
+
+
+def convert_pull_request(pull_request):
+    """ Convert a pull request sent in a webhook event, as returned by the
+        pull requests REST API, into the structure returned by the search
+        API, limited to the fields that are used to sort the pull requests
+        and format the release note. """
+
+    milestone = pull_request.get("milestone")
+    return {
+        "number": pull_request["number"],
+        "title": pull_request["title"],
+        "html_url": pull_request["html_url"],
+        "labels": [{"name": label["name"]}
+                   for label in pull_request.get("labels") or ()],
+        "user": {"login": pull_request["user"]["login"],
+                 "html_url": pull_request["user"]["html_url"]},
+        "milestone": {"title": milestone["title"]} if milestone else None,
+        "state": pull_request["state"],
+        "comments": pull_request.get("comments", 0),
+        "created_at": pull_request["created_at"],
+        "updated_at": pull_request["updated_at"],
+        "pull_request": {"merged_at": pull_request.get("merged_at")}
+    }
+
+
+def apply_pull_request(state, milestone, item):
+    """ Apply a pull request received in a webhook event to the pull
+        requests of a milestone (lowered), and return whether they changed.
+        Closed pull requests belong to the milestone they are associated to,
+        and are removed from the other ones. Events older than the pull
+        request that is already known, which GitHub might deliver late, are
+        ignored. """
+
+    known = state["items"].get(item["number"])
+    if known is not None and known.get("updated_at") and \
+            known["updated_at"] > item["updated_at"]:
+        return False
+
+    if item["state"] == "closed" and item["milestone"] and \
+            item["milestone"]["title"].lower() == milestone:
+        state["items"][item["number"]] = item
+        return True
+    return state["items"].pop(item["number"], None) is not None
+
+
+def check_signature(secret, body, signature):
+    """ Check the X-Hub-Signature-256 header of a webhook event. """
+
+    expected = "sha256={}".format(hmac.new(
+        secret.encode("utf8"), body, hashlib.sha256).hexdigest())
+    return hmac.compare_digest(expected, signature or "")
+
+
+class ReleaseNoteService:
+    """ State of the service: the pull requests of every milestone whose
+        release note was requested, exported once through a single warm HTTP
+        session and then updated in place by the webhook events, along with
+        their rendered documents until they change. """
+
+    def __init__(self, token, sorting_param, format_options, concurrency=1,
+                 cache_dir=None):
+        self.session = github_session.create_session(
+            token, pool_size=max(10, concurrency))
+        self.cache = github_cache.ResponseCache(cache_dir) \
+            if cache_dir else None
+        self.sorting_param = sorting_param
+        self.format_options = format_options
+        self.concurrency = concurrency
+        # (repository, lowered milestone) -> {"items": {number: item},
+        # "documents": rendered documents or None, "version": number of
+        # times the pull requests changed}
+        self.milestones = {}
+        # (repository, lowered milestone) -> lists of the pull requests
+        # received in webhook events during each export of the milestone
+        self.pending_events = {}
+        self.lock = threading.Lock()
+
+    def load_milestone(self, repository, milestone, refresh=False):
+        """ Get the state of a milestone, exporting its pull requests from
+            GitHub if they are not known yet, or if refresh is set. The
+            pull requests received in webhook events during the export are
+            applied to the exported ones, since the export might not include
+            them. RequestException is raised if they could not be
+            retrieved. """
+
+        key = (repository, milestone.lower())
+        events = []
+        with self.lock:
+            if key in self.milestones and not refresh:
+                return self.milestones[key]
+            self.pending_events.setdefault(key, []).append(events)
+
+        try:
+            owner, _, repo = repository.partition("/")
+            repo_param, milestone_param = \
+                github_export_pull_requests.build_search_parameters(
+                    owner, repo, milestone)
+            pull_requests = \
+                github_export_pull_requests.request_pull_requests(
+                    repo_param, milestone_param, self.sorting_param, None,
+                    session=self.session, concurrency=self.concurrency,
+                    cache=self.cache)
+        finally:
+            with self.lock:
+                self.pending_events[key].remove(events)
+                if not self.pending_events[key]:
+                    del self.pending_events[key]
+
+        with self.lock:
+            # Another request might have loaded the milestone meanwhile, in
+            # which case the events were applied to it as well
+            state = self.milestones.get(key)
+            if state is not None and not refresh:
+                return state
+            if state is None:
+                state = self.milestones[key] = {"version": 0}
+            state["items"] = {item["number"]: item
+                              for item in pull_requests["items"]}
+            for item in events:
+                apply_pull_request(state, key[1], item)
+            state["documents"] = None
+            state["version"] = state["version"] + 1
+            return state
+
+    def refresh_milestone(self, repository, milestone):
+        """ Export the pull requests of a milestone from GitHub again. The
+            previous pull requests keep being served and updated until the
+            export is complete. """
+
+        return self.load_milestone(repository, milestone, refresh=True)
+
+    def render(self, repository, milestone):
+        """ Get the documents of the release note of a milestone, indexed by
+            their filename, rendering them if the pull requests changed since
+            they were last rendered. The documents are only kept if the pull
+            requests did not change while they were rendered. """
+
+        state = self.load_milestone(repository, milestone)
+        with self.lock:
+            if state["documents"] is not None:
+                return state["documents"]
+            version = state["version"]
+            items = github_export_pull_requests.sort_pull_requests(
+                list(state["items"].values()), self.sorting_param)
+
+        documents = {}
+        format_release_note.execute(
+            {"items": items}, output_options=format_release_note.OutputOptions(
+                documents=documents, report_file=io.StringIO()),
+            **self.format_options)
+
+        with self.lock:
+            if state["version"] == version:
+                state["documents"] = documents
+        return documents
+
+    def handle_pull_request_event(self, payload):
+        """ Update the milestones of the event's repository with the pull
+            request of a pull_request webhook event, and return the number of
+            milestones that were updated. The pull request is also kept for
+            the milestones of the repository that are being exported, to be
+            applied once their export is complete. """
+
+        if payload.get("action") not in PULL_REQUEST_ACTIONS:
+            return 0
+
+        repository = payload["repository"]["full_name"]
+        item = convert_pull_request(payload["pull_request"])
+
+        updated = 0
+        with self.lock:
+            for (state_repository, _), exports in \
+                    self.pending_events.items():
+                if state_repository == repository:
+                    for events in exports:
+                        events.append(item)
+            for (state_repository, state_milestone), state in \
+                    self.milestones.items():
+                if state_repository == repository and \
+                        apply_pull_request(state, state_milestone, item):
+                    state["documents"] = None
+                    state["version"] = state["version"] + 1
+                    updated = updated + 1
+        return updated
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """ Handler of the requests sent to the service:
+        - GET /[owner]/[repo]/[milestone]: release note of the milestone
+        - GET /[owner]/[repo]/[milestone]/[filename]: any other document of
+          the milestone, such as [milestone]-authors.md
+        - POST /[owner]/[repo]/[milestone]/refresh: export the pull requests
+          of the milestone from GitHub again
+        - POST /webhook: GitHub webhook events
+        Milestones containing a slash need to be percent-encoded. """
+
+    def send_text(self, code, text, content_type="text/plain"):
+        body = text.encode("utf8")
+        self.send_response(code)
+        self.send_header("Content-Type",
+                         "{}; charset=utf-8".format(content_type))
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def get_target(self):
+        """ Get the (repository, milestone, rest of the path) targeted by the
+            request, or None if the path does not target a milestone. """
+
+        parts = self.path.split("?")[0].strip("/").split("/")
+        if len(parts) < 3:
+            return None
+        return ("{}/{}".format(unquote(parts[0]), unquote(parts[1])),
+                unquote(parts[2]), [unquote(part) for part in parts[3:]])
+
+    def do_GET(self):
+        target = self.get_target()
+        if target is None or len(target[2]) > 1:
+            self.send_text(404, "Not found\n")
+            return
+        repository, milestone, rest = target
+
+        try:
+            documents = self.server.service.render(repository, milestone)
+        except RequestException as exception:
+            self.send_text(502, "Exception while trying to access GitHub: "
+                                "{}\n".format(exception))
+            return
+
+        if not documents:
+            self.send_text(404, "No pull requests in {} {}\n".format(
+                repository, milestone))
+            return
+
+        if rest:
+            filename = rest[0]
+        else:
+            filename = next(name for name in documents
+                            if name.endswith("-release-note.md"))
+        if filename not in documents:
+            self.send_text(404, "No document {}\n".format(filename))
+            return
+        self.send_text(200, documents[filename], "text/markdown")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+
+        if self.path.rstrip("/") == "/webhook":
+            self.handle_webhook(body)
+            return
+
+        target = self.get_target()
+        if target is None or target[2] != ["refresh"]:
+            self.send_text(404, "Not found\n")
+            return
+        try:
+            self.server.service.refresh_milestone(target[0], target[1])
+        except RequestException as exception:
+            self.send_text(502, "Exception while trying to access GitHub: "
+                                "{}\n".format(exception))
+            return
+        self.send_text(200, "Refreshed\n")
+
+    def handle_webhook(self, body):
+        """ Handle a GitHub webhook event. """
+
+        secret = self.server.webhook_secret
+        if secret and not check_signature(
+                secret, body, self.headers.get("X-Hub-Signature-256")):
+            self.send_text(401, "Invalid signature\n")
+            return
+
+        event = self.headers.get("X-GitHub-Event")
+        if event == "ping":
+            self.send_text(200, "pong\n")
+            return
+        if event != "pull_request":
+            self.send_text(202, "Ignored event {}\n".format(event))
+            return
+
+        try:
+            payload = json.loads(body)
+            updated = self.server.service.handle_pull_request_event(payload)
+        except (ValueError, KeyError, TypeError) as _:
+            self.send_text(400, "Invalid pull_request event\n")
+            return
+        self.send_text(200, "{} milestone(s) updated\n".format(updated))
+
+
+def serve(service, host, port, webhook_secret=None):
+    """ Serve the release notes until the process is interrupted. """
+
+    server = ThreadingHTTPServer((host, port), ServiceHandler)
+    server.service = service
+    server.webhook_secret = webhook_secret
+    print("Serving release notes on http://{}:{}".format(
+        *server.server_address))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    arg_parser = setup_arg_parser()
+    args = arg_parser.parse_args()
+
+    format_options = {
+        "export_authors": args.authors, "show_pr_nb": args.pr_nb,
+        "highlights": args.highlights, "excl_labels": args.exclude,
+        "incl_labels": args.include, "excl_words": args.word_exclude,
+        "incl_words": args.word_include}
+    service = ReleaseNoteService(
+        args.token, "sort:{}".format(args.sort), format_options,
+        args.concurrency, None if args.no_cache else args.cache_dir)
+    serve(service, args.host, args.port, args.webhook_secret)
+
+
+if __name__ == "__main__":
+    main()
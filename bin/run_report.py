@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+
+import contextlib
+import cProfile
+import json
+import threading
+import time
+import tracemalloc
+
+
+def measure(report, stage):
+    """ Measure the time spent in a block as an occurrence of a stage of the
+        run report, if there is one. """
+
+    if report is None:
+        return contextlib.nullcontext()
+    return report.stage(stage)
+
+
+class RunReport:
+    """ Instrumentation of a run: wall time spent in each stage (HTTP
+        requests, JSON decoding, classification, files writing...) along with
+        counters (bytes transferred, retries, rate limit waits...) and the
+        final report of the release note. Stages and counters can be updated
+        from several threads. Profiling with cProfile and tracemalloc can be
+        enabled for the whole run. """
+
+    def __init__(self):
+        self.started = time.time()
+        self.stages = {}  # Stage name -> {"count": ..., "seconds": ...}
+        self.counters = {"requests": 0, "bytes_received": 0, "retries": 0,
+                         "network_errors": 0, "cache_hits": 0}
+        self.release_note = {}  # Counters of the final report
+        self.lock = threading.Lock()
+        self.profiler = None
+        self.profile_file = None
+        self.trace_memory = False
+        self.memory_peak = None
+
+    def add_time(self, stage, seconds, count=1):
+        """ Add the time spent in count occurrences of a stage. """
+
+        with self.lock:
+            values = self.stages.setdefault(stage,
+                                            {"count": 0, "seconds": 0.0})
+            values["count"] = values["count"] + count
+            values["seconds"] = values["seconds"] + seconds
+
+    def add_counter(self, counter, value=1):
+        """ Increase a counter. """
+
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+    @contextlib.contextmanager
+    def stage(self, stage):
+        """ Measure the time spent in the block as an occurrence of a
+            stage. """
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+
+    def start_profiling(self, profile_file=None, trace_memory=False):
+        """ Profile the run with cProfile if a file to save the statistics
+            into is provided, and trace its memory allocations with
+            tracemalloc if trace_memory is set. """
+
+        if profile_file:
+            self.profile_file = profile_file
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        if trace_memory:
+            self.trace_memory = True
+            tracemalloc.start()
+
+    def stop_profiling(self):
+        """ Stop the profiling and save its statistics. """
+
+        if self.profiler:
+            self.profiler.disable()
+            self.profiler.dump_stats(self.profile_file)
+            self.profiler = None
+        if self.trace_memory and tracemalloc.is_tracing():
+            _, self.memory_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+    def to_dict(self):
+        """ Get the whole report as a dictionary. """
+
+        with self.lock:
+            report = {
+                "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ",
+                                            time.gmtime(self.started)),
+                "duration": time.time() - self.started,
+                "stages": {stage: dict(values)
+                           for stage, values in self.stages.items()},
+                "counters": dict(self.counters),
+                "release_note": dict(self.release_note)
+            }
+        if self.profile_file:
+            report["profile"] = self.profile_file
+        if self.memory_peak is not None:
+            report["memory_peak"] = self.memory_peak
+        return report
+
+    def save(self, report_file):
+        """ Save the report in a JSON file. """
+
+        with open(report_file, "w", encoding="utf8") as json_file:
+            json.dump(self.to_dict(), json_file, indent=4)
+            json_file.write("\n")
@@ -1,8 +1,11 @@
 #!/usr/bin/env python
 
-from bin import github_export_pull_requests, format_release_note
+from bin import author_enrichment, github_cache, \
+    github_export_pull_requests, github_graphql_export, github_transport, \
+    format_release_note, pull_request_store, release_note_batch, run_report
 import argparse
 import os
+from requests.exceptions import RequestException
 
 
 def setup_arg_parser():
@@ -18,16 +21,36 @@ def setup_arg_parser():
                        in a separate file.""")
     arg_parser.add_argument(
         "-o", "--owner",
-        required=True,
         help="owner of the GitHub repository to extract the information from")
     arg_parser.add_argument(
         "-r", "--repo",
-        required=True,
         help="name of the GitHub repository to extract the information from")
     arg_parser.add_argument(
         "-m", "--milestone",
-        required=True,
         help="name of the milestone to extract the information with")
+    arg_parser.add_argument(
+        "--manifest",
+        help="""JSON file listing several targets to generate the release
+                notes of at once, instead of a single owner, repository and
+                milestone: the file contains a list of objects with the
+                "owner", "repo" and "milestone" of each target, and
+                optionally the "output" directory its files are written into
+                (default: [owner]/[repo])""")
+    arg_parser.add_argument(
+        "--jobs",
+        type=int,
+        help="""number of processes formatting the release notes in parallel
+                with --manifest (default: one per CPU)""")
+    arg_parser.add_argument(
+        "--classify-jobs",
+        dest="classify_jobs",
+        type=int,
+        default=1,
+        help="""number of processes classifying the pull requests of the
+                milestone in parallel, which is useful for very large
+                milestones (default: 1, the pull requests are classified by
+                the main process); with --manifest, the release notes are
+                already formatted in parallel by --jobs processes""")
     arg_parser.add_argument(
         "-s", "--sort",
         choices=["created-desc", "created-asc", "comments-desc",
@@ -45,17 +68,104 @@ def setup_arg_parser():
         "-t", "--token",
         help="""GitHub authentication token (optional: might be needed to 
                 perform a lot of requests in a short amount of time)""")
+    arg_parser.add_argument(
+        "--backend",
+        choices=["rest", "graphql"],
+        default="rest",
+        help="""GitHub API used to export the pull requests (default: rest);
+                the GraphQL API only requests the information needed for the
+                release note but requires an authentication token, and does
+                not support the concurrency, cache, snapshot and resume
+                options""")
+    arg_parser.add_argument(
+        "-j", "--concurrency",
+        type=int,
+        default=1,
+        help="""number of result pages requested in parallel once the total
+                number of pull requests is known (default: 1, the pages are
+                requested one after the other)""")
+    arg_parser.add_argument(
+        "--cache-dir",
+        dest="cache_dir",
+        default=github_cache.DEFAULT_CACHE_DIR,
+        help="""directory in which GitHub's responses are cached to send
+                conditional requests and not download again the pages that
+                were not modified (default: {})"""
+        .format(github_cache.DEFAULT_CACHE_DIR))
+    arg_parser.add_argument(
+        "--no-cache",
+        dest="no_cache",
+        action="store_true",
+        default=False,
+        help="do not use nor update the cache of GitHub's responses")
+    arg_parser.add_argument(
+        "--snapshot",
+        help="""snapshot file of the last export of the milestone: if it
+                exists, only the pull requests that were updated since then
+                are requested and merged into it, otherwise all the pull
+                requests are requested; the snapshot is then updated""")
+    arg_parser.add_argument(
+        "--resume",
+        action="store_true",
+        default=False,
+        help="""resume an interrupted export with --save: the pages that
+                were already received, checkpointed in the
+                githublist.json.checkpoint directory, are not requested
+                again""")
+    arg_parser.add_argument(
+        "--store",
+        help="""SQLite store the exported pull requests are upserted into, to
+                format their release note again later without requesting
+                GitHub""")
+    arg_parser.add_argument(
+        "--offline",
+        action="store_true",
+        default=False,
+        help="""format the release note from the pull requests of the
+                milestone selected in the --store SQLite store, without
+                requesting GitHub""")
     arg_parser.add_argument(
         "--authors",
         action="store_true",
         default=False,
         help="save the list of pull requests authors in a dedicated file")
+    arg_parser.add_argument(
+        "--enrich-authors",
+        dest="enrich_authors",
+        action="store_true",
+        default=False,
+        help="""add the co-authors of the pull requests (the authors of their
+                commits, including the Co-authored-by trailers) to the
+                contributors, show their display names, and list the
+                contributors who had no pull request merged in the
+                repository before this milestone in a dedicated section; the
+                users, pull requests and searches are looked up by batches
+                with GitHub's GraphQL API, which requires --token, and
+                cached in the authors folder of the cache directory""")
+    arg_parser.add_argument(
+        "--author-cache-ttl",
+        dest="author_cache_ttl",
+        type=float,
+        default=author_enrichment.DEFAULT_TTL,
+        help="""number of hours after which the cached users, pull
+                requests and searches are looked up again with --enrich-authors
+                (default: {})""".format(author_enrichment.DEFAULT_TTL))
     arg_parser.add_argument(
         "--pr-nb",
         dest="pr_nb",
         action="store_true",
         default=False,
         help="include the merged pull requests' number with their link")
+    arg_parser.add_argument(
+        "--skip-unchanged",
+        dest="skip_unchanged",
+        action="store_true",
+        default=False,
+        help="""keep the fingerprint of each release note's content in a
+                manifest of its output directory, and only render and write
+                its files again if the classified pull requests, the
+                contributors or the rules changed since the previous run;
+                only the files whose content changed are then written""")
     arg_parser.add_argument(
         "--highlights",
         nargs="+",
@@ -122,36 +232,184 @@ def setup_arg_parser():
         "--save",
         action="store_true",
         default=False,
-        help="do not remove the exported JSON file at the end of the process")
+        help="""save the exported pull requests in a compact JSON file named
+                githublist.json""")
+    arg_parser.add_argument(
+        "--report-json",
+        dest="report_json",
+        help="""JSON file in which the run report is written: time spent in
+                each stage (HTTP requests, JSON decoding, classification,
+                rendering, writing of each file), bytes received, retries,
+                rate limit waits and the counters of the final report""")
+    arg_parser.add_argument(
+        "--profile",
+        help="""profile the run with cProfile and save the statistics in
+                this file""")
+    arg_parser.add_argument(
+        "--trace-memory",
+        dest="trace_memory",
+        action="store_true",
+        default=False,
+        help="""trace the memory allocations with tracemalloc and add their
+                peak to the run report""")
+    arg_parser.add_argument(
+        "--transport",
+        choices=github_transport.TRANSPORT_MODES,
+        default=github_transport.LIVE,
+        help="""how the requests are sent to GitHub (default: live): live,
+                record (the responses are also recorded in the cassette
+                directory) or replay (the recorded responses are used
+                without any network access)""")
+    arg_parser.add_argument(
+        "--cassette-dir",
+        dest="cassette_dir",
+        default=github_transport.DEFAULT_CASSETTE_DIR,
+        help="""directory in which the responses are recorded and from
+                which they are replayed (default: {})"""
+        .format(github_transport.DEFAULT_CASSETTE_DIR))
+    arg_parser.add_argument(
+        "--replay-latency",
+        dest="replay_latency",
+        type=float,
+        default=0,
+        help="""latency in milliseconds added to every replayed response
+                (default: 0)""")
 
     return arg_parser
 
 
-def main():
-    arg_parser = setup_arg_parser()
-    args = arg_parser.parse_args()
+def generate(arg_parser, args, sorting_param, report):
+    """ Generate the release notes requested by the command line
+        arguments. """
+
+    if args.manifest:
+        # Options of a single export, which cannot be applied to a batch
+        for option, used in (("--backend graphql", args.backend == "graphql"),
+                             ("--snapshot", args.snapshot),
+                             ("--resume", args.resume),
+                             ("--store", args.store),
+                             ("--offline", args.offline),
+                             ("--enrich-authors", args.enrich_authors),
+                             ("--classify-jobs", args.classify_jobs != 1)):
+            if used:
+                arg_parser.error("{} is not supported with --manifest"
+                                 .format(option))
+
+        format_options = {
+            "export_authors": args.authors, "show_pr_nb": args.pr_nb,
+            "highlights": args.highlights, "excl_labels": args.exclude,
+            "incl_labels": args.include, "excl_words": args.word_exclude,
+            "incl_words": args.word_include}
+        release_note_batch.execute(
+            release_note_batch.load_manifest(args.manifest), sorting_param,
+            args.token, format_options, args.concurrency,
+            None if args.no_cache else args.cache_dir, args.jobs, args.save,
+            report, args.skip_unchanged)
+        return
+
+    if not (args.owner and args.repo and args.milestone):
+        arg_parser.error("the following arguments are required without "
+                         "--manifest: -o/--owner, -r/--repo, -m/--milestone")
+
+    if args.resume and not (args.save and args.backend == "rest"):
+        arg_parser.error("--resume requires --save and the rest backend")
+    if args.backend == "graphql":
+        for option, used in (
+                ("--snapshot", args.snapshot),
+                ("-j/--concurrency", args.concurrency != 1),
+                ("--cache-dir", args.cache_dir !=
+                 github_cache.DEFAULT_CACHE_DIR)):
+            if used:
+                arg_parser.error("{} is not supported by the graphql backend"
+                                 .format(option))
+    if args.offline and not args.store:
+        arg_parser.error("--offline requires --store")
+    if args.enrich_authors and not args.token:
+        arg_parser.error("--enrich-authors requires --token")
+
+    repository = "{}/{}".format(args.owner, args.repo)
 
     # Format the input parameters needed to issue the request
-    repo_param = "repo:{}/{}".format(args.owner, args.repo)
-    if args.milestone.strip().find(' ') == -1:
-        milestone_param = "milestone:{}".format(args.milestone)
+    repo_param, milestone_param = \
+        github_export_pull_requests.build_search_parameters(
+            args.owner, args.repo, args.milestone)
+
+    if args.offline:
+        with pull_request_store.PullRequestStore(args.store) as store:
+            pull_requests = store.load_milestone(repository, args.milestone,
+                                                 merged_only=True)
+    elif args.save or args.store:
+        # The whole response is needed to be saved in the JSON file or
+        # upserted in the store
+        json_file = "githublist.json" if args.save else None
+        if args.backend == "graphql":
+            pull_requests = github_graphql_export.execute(
+                repo_param, milestone_param, sorting_param, args.token,
+                json_file, report)
+        else:
+            pull_requests = github_export_pull_requests.execute(
+                repo_param, milestone_param, sorting_param, args.token,
+                json_file, args.concurrency,
+                None if args.no_cache else args.cache_dir, args.snapshot,
+                args.resume, report)
+        if pull_requests is None:
+            return
+        if args.store:
+            with pull_request_store.PullRequestStore(args.store) as store:
+                store.upsert(repository, pull_requests)
     else:
-        milestone_param = "milestone:\"{}\"".format(args.milestone)
-    sorting_param = "sort:{}".format(args.sort)
+        # The pages of the response are formatted as soon as they are received
+        if args.backend == "graphql":
+            pull_requests = github_graphql_export.stream(
+                repo_param, milestone_param, sorting_param, args.token,
+                report)
+        else:
+            pull_requests = github_export_pull_requests.stream(
+                repo_param, milestone_param, sorting_param, args.token,
+                args.concurrency, None if args.no_cache else args.cache_dir,
+                args.snapshot, report)
 
-    # Name of the JSON file containing the data from GitHub
-    json_file = "githublist.json"
+    enrichment = None
+    if args.enrich_authors:
+        enrichment = author_enrichment.AuthorEnrichment(
+            args.token, None if args.no_cache else
+            author_enrichment.AuthorCache(
+                os.path.join(args.cache_dir, "authors"),
+                args.author_cache_ttl), report)
 
-    github_export_pull_requests.execute(
-        repo_param, milestone_param, sorting_param, args.token, json_file)
+    output_options = format_release_note.OutputOptions(
+        skip_unchanged=args.skip_unchanged, report=report)
+    try:
+        format_release_note.execute(pull_requests, args.authors, args.pr_nb,
+                                    args.highlights, args.exclude,
+                                    args.include, args.word_exclude,
+                                    args.word_include,
+                                    output_options=output_options,
+                                    enrichment=enrichment,
+                                    classify_jobs=args.classify_jobs)
+    except RequestException as _:
+        print("Exception while trying to access GitHub")
 
-    format_release_note.execute(json_file, args.authors, args.pr_nb,
-                                args.highlights, args.exclude, args.include,
-                                args.word_exclude, args.word_include)
 
-    # Remove the JSON file containing the response from GitHub
-    if not args.save:
-        os.remove(json_file)
+def main():
+    arg_parser = setup_arg_parser()
+    args = arg_parser.parse_args()
+
+    sorting_param = "sort:{}".format(args.sort)
+    github_transport.configure(args.transport, args.cassette_dir,
+                               args.replay_latency / 1000)
+
+    report = None
+    if args.report_json or args.profile or args.trace_memory:
+        report = run_report.RunReport()
+        report.start_profiling(args.profile, args.trace_memory)
+    try:
+        generate(arg_parser, args, sorting_param, report)
+    finally:
+        if report:
+            report.stop_profiling()
+            if args.report_json:
+                report.save(args.report_json)
 
 
 if __name__ == "__main__":
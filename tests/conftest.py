@@ -0,0 +1,33 @@
+import os
+import sys
+import threading
+
+import pytest
+
+# The bin package is imported from the root of the repository
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks import bench_pipeline  # noqa: E402
+from bin import github_session  # noqa: E402
+
+
+@pytest.fixture
+def search_server(monkeypatch):
+    """ Start the benchmark's stand-in of GitHub's search API with some pull
+        requests, and send the GitHub requests to it. """
+
+    servers = []
+
+    def start(items):
+        server = bench_pipeline.SearchServer(items, 0)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        servers.append(server)
+        monkeypatch.setattr(github_session, "GITHUB_API_URL",
+                            "http://{}:{}".format(*server.server_address))
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,76 @@
+import os
+import stat
+
+import pytest
+
+from bin import atomic_file
+
+posix_only = pytest.mark.skipif(os.name != "posix",
+                                reason="POSIX permissions")
+
+
+@pytest.fixture
+def umask():
+    previous = os.umask(0o027)
+    yield 0o027
+    os.umask(previous)
+
+
+def get_mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_file_is_replaced(tmp_path):
+    path = str(tmp_path / "note.md")
+    with atomic_file.atomic_write(path) as note_file:
+        note_file.write("first")
+    with atomic_file.atomic_write(path) as note_file:
+        note_file.write("second")
+        # The file is only replaced once the writing is complete
+        with open(path, "r", encoding="utf8") as previous_file:
+            assert previous_file.read() == "first"
+    with open(path, "r", encoding="utf8") as note_file:
+        assert note_file.read() == "second"
+    assert os.listdir(str(tmp_path)) == ["note.md"]
+
+
+def test_binary_file(tmp_path):
+    path = str(tmp_path / "data.bin")
+    with atomic_file.atomic_write(path, "wb") as data_file:
+        data_file.write(b"\x00\x01")
+    with open(path, "rb") as data_file:
+        assert data_file.read() == b"\x00\x01"
+
+
+def test_failed_writing_keeps_the_file(tmp_path):
+    path = str(tmp_path / "note.md")
+    with atomic_file.atomic_write(path) as note_file:
+        note_file.write("first")
+    with pytest.raises(RuntimeError):
+        with atomic_file.atomic_write(path) as note_file:
+            note_file.write("second")
+            raise RuntimeError("interrupted")
+    with open(path, "r", encoding="utf8") as note_file:
+        assert note_file.read() == "first"
+    assert os.listdir(str(tmp_path)) == ["note.md"]
+
+
+@posix_only
+def test_new_file_follows_the_umask(tmp_path, umask):
+    path = str(tmp_path / "note.md")
+    with atomic_file.atomic_write(path) as note_file:
+        note_file.write("note")
+    assert get_mode(path) == 0o666 & ~umask
+    # The umask of the process is left untouched
+    assert os.umask(umask) == umask
+
+
+@posix_only
+def test_existing_file_keeps_its_permissions(tmp_path, umask):
+    path = str(tmp_path / "note.md")
+    with open(path, "w", encoding="utf8") as note_file:
+        note_file.write("note")
+    os.chmod(path, 0o604)
+    with atomic_file.atomic_write(path) as note_file:
+        note_file.write("updated note")
+    assert get_mode(path) == 0o604
@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta, timezone
+
+from benchmarks import bench_pipeline
+from bin import github_export_pull_requests, github_session
+
+
+def test_split_date_windows():
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    dates = [start + timedelta(minutes=minute) for minute in range(2500)]
+
+    def count_window(window_start, window_end):
+        return sum(window_start <= date <= window_end for date in dates)
+
+    windows = github_export_pull_requests.split_date_windows(
+        count_window, dates[0], dates[-1], len(dates))
+    counts = [count_window(*window) for window in windows]
+    assert all(count <= github_export_pull_requests.GITHUB_SEARCH_LIMIT
+               for count in counts)
+    assert sum(counts) == len(dates)
+    for (_, previous_end), (next_start, _) in zip(windows, windows[1:]):
+        assert next_start > previous_end
+
+
+def test_window_that_cannot_be_split_is_kept(capsys):
+    date = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    assert github_export_pull_requests.split_date_windows(
+        lambda *_: 1500, date, date, 1500) == [(date, date)]
+    assert "only 1000 will be retrieved" in capsys.readouterr().out
+
+
+def test_empty_windows_are_dropped():
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    end = start + timedelta(days=1)
+    assert github_export_pull_requests.split_date_windows(
+        lambda window_start, _: 1000 if window_start == start else 0,
+        start, end, 1000) == [(start, end)]
+    assert github_export_pull_requests.split_date_windows(
+        lambda window_start, _: 0, start, end, 0) == []
+
+
+def test_search_beyond_the_limit_is_sharded(search_server):
+    items = bench_pipeline.generate_pull_requests(2500, 5, 30, 0)
+    server = search_server(items)
+    session = github_session.create_session("token", pool_size=4)
+    pull_requests = github_export_pull_requests.request_pull_requests(
+        "repo:o/r", "milestone:v1.0.0", "sort:created-desc", "token",
+        session=session, concurrency=4)
+    assert [item["number"] for item in pull_requests["items"]] == \
+        list(range(2500, 0, -1))
+    assert pull_requests["total_count"] == 2500
+    assert all(query.count("created:") == 1 for query, per_page
+               in server.queries[3:])
@@ -0,0 +1,41 @@
+import io
+import json
+import os
+
+from bin import format_release_note
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def load_pull_requests():
+    with open(os.path.join(FIXTURES_DIR, "search_pull_requests.json"), "r",
+              encoding="utf8") as json_file:
+        return json.load(json_file)
+
+
+def format_note(output_options):
+    format_release_note.execute(
+        load_pull_requests(), True, True, None, None, None, ["documentation"],
+        None, output_options=output_options)
+
+
+def test_documents_are_written_in_files(tmp_path):
+    format_note(format_release_note.OutputOptions(
+        output_dir=str(tmp_path), report_file=io.StringIO()))
+    assert sorted(os.listdir(str(tmp_path))) == [
+        "v1.0-authors.md", "v1.0-documentation.md", "v1.0-release-note.md"]
+
+
+def test_output_receives_all_the_documents(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    documents = {}
+    format_note(format_release_note.OutputOptions(
+        documents=documents, report_file=io.StringIO()))
+
+    output = io.StringIO()
+    format_note(format_release_note.OutputOptions(
+        output, output_dir=str(tmp_path), report_file=io.StringIO()))
+    assert os.listdir(str(tmp_path)) == []
+    release_note = documents.pop("v1.0-release-note.md")
+    assert output.getvalue().startswith(release_note)
+    assert output.getvalue() == release_note + "".join(documents.values())
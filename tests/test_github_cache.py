@@ -0,0 +1,72 @@
+import os
+
+from benchmarks import bench_pipeline
+from bin import github_cache, github_export_pull_requests, github_session, \
+    run_report
+
+
+class Response:
+    """ Stand-in for a response of the GitHub API. """
+
+    def __init__(self, body, etag):
+        self.headers = {"ETag": etag, "Content-Type": "application/json"}
+        self.text = body
+
+
+def export(cache, token="token", report=None):
+    session = github_session.create_session(token, report=report)
+    return github_export_pull_requests.request_pull_requests(
+        "repo:o/r", "milestone:v1.0.0", "sort:updated-desc", token,
+        session=session, cache=cache)
+
+
+def test_unmodified_pages_are_reused(search_server, tmp_path):
+    server = search_server(bench_pipeline.generate_pull_requests(250, 5, 30,
+                                                                 0))
+    cache = github_cache.ResponseCache(str(tmp_path))
+    first = export(cache)
+    assert server.not_modified == 0
+
+    report = run_report.RunReport()
+    assert export(cache, report=report) == first
+    assert server.not_modified == 3
+    assert report.counters["cache_hits"] == 3
+
+
+def test_responses_are_not_shared_between_tokens(search_server, tmp_path):
+    server = search_server(bench_pipeline.generate_pull_requests(50, 5, 30,
+                                                                 0))
+    cache = github_cache.ResponseCache(str(tmp_path))
+    export(cache, token="first")
+    export(cache, token="second")
+    export(cache, token=None)
+    assert server.not_modified == 0
+    export(cache, token="second")
+    assert server.not_modified == 1
+
+
+def test_least_recently_used_responses_are_evicted(tmp_path, monkeypatch):
+    body = "x" * 1000
+    cache = github_cache.ResponseCache(str(tmp_path), max_size=5000)
+    listings = []
+    listdir = os.listdir
+    monkeypatch.setattr(os, "listdir",
+                        lambda path: listings.append(path) or listdir(path))
+
+    for page in range(4):
+        cache.store("https://api.github.com/search/issues", {"page": page},
+                    Response(body, '"{}"'.format(page)))
+        os.utime(cache.get_path("https://api.github.com/search/issues",
+                                {"page": page}), (page, page))
+    # The size is only listed once, then kept up to date
+    assert len(listings) == 1
+    cache.load("https://api.github.com/search/issues", {"page": 0})
+
+    cache.store("https://api.github.com/search/issues", {"page": 4},
+                Response(body, '"4"'))
+    assert len(listings) == 2
+    assert cache.size <= 5000 * github_cache.EVICTION_RATIO
+    kept = [page for page in range(5) if cache.load(
+        "https://api.github.com/search/issues", {"page": page})]
+    # The first page was used again, so the second one is evicted first
+    assert kept == [0, 3, 4]
@@ -0,0 +1,85 @@
+import pytest
+
+from benchmarks import bench_pipeline
+from bin import github_cache, github_export_pull_requests, \
+    github_graphql_export, github_session, github_transport
+
+
+@pytest.fixture
+def use_transport(monkeypatch):
+    def use(mode, cassette_dir):
+        monkeypatch.setattr(github_transport, "current",
+                            github_transport.Transport(mode, cassette_dir))
+    return use
+
+
+def export(token="token", concurrency=1, cache=None):
+    return github_export_pull_requests.request_pull_requests(
+        "repo:o/r", "milestone:v1.0.0", "sort:created-asc", token,
+        session=github_session.create_session(token),
+        concurrency=concurrency, cache=cache)
+
+
+def test_recorded_export_is_replayed(search_server, use_transport,
+                                     tmp_path):
+    server = search_server(bench_pipeline.generate_pull_requests(250, 5, 30,
+                                                                 0))
+    cassette_dir = str(tmp_path / "cassette")
+    use_transport(github_transport.RECORD, cassette_dir)
+    recorded = export(concurrency=3)
+    requests = server.requests
+
+    # Replayed responses are neither requested nor paced, and a cassette
+    # recorded with a token can be replayed without it
+    use_transport(github_transport.REPLAY, cassette_dir)
+    assert github_session.create_session(None).rate_limiter is None
+    assert export(token=None) == recorded
+    assert server.requests == requests
+
+
+def test_graphql_queries_are_replayed(search_server, use_transport,
+                                      tmp_path):
+    search_server(bench_pipeline.generate_pull_requests(150, 5, 30, 0))
+    cassette_dir = str(tmp_path / "cassette")
+    use_transport(github_transport.RECORD, cassette_dir)
+    recorded = github_graphql_export.request_pull_requests(
+        "repo:o/r", "milestone:v1.0.0", "sort:created-asc", "token")
+
+    use_transport(github_transport.REPLAY, cassette_dir)
+    assert github_graphql_export.request_pull_requests(
+        "repo:o/r", "milestone:v1.0.0", "sort:created-asc", "token") == \
+        recorded
+    # Queries are identified by their body
+    with pytest.raises(github_transport.CassetteMissError):
+        github_graphql_export.request_pull_requests(
+            "repo:o/r", "milestone:v1.0.0", "sort:created-desc", "token")
+
+
+def test_responses_are_recorded_in_full(search_server, use_transport,
+                                        tmp_path):
+    server = search_server(bench_pipeline.generate_pull_requests(50, 5, 30,
+                                                                 0))
+    cache = github_cache.ResponseCache(str(tmp_path / "cache"))
+    export(cache=cache)
+
+    # The cached response is not used to record a 304 Not Modified
+    cassette_dir = str(tmp_path / "cassette")
+    use_transport(github_transport.RECORD, cassette_dir)
+    recorded = export(cache=cache)
+    assert server.not_modified == 0
+
+    use_transport(github_transport.REPLAY, cassette_dir)
+    assert export() == recorded
+
+
+def test_request_that_was_not_recorded(use_transport, tmp_path):
+    use_transport(github_transport.REPLAY, str(tmp_path))
+    with pytest.raises(github_transport.CassetteMissError):
+        export()
+    assert github_export_pull_requests.execute(
+        "repo:o/r", "milestone:v1.0.0", "sort:created-asc", None) is None
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        github_transport.Transport("rewind")
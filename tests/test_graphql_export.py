@@ -0,0 +1,57 @@
+import io
+import json
+import sys
+
+from benchmarks import bench_pipeline
+from bin import format_release_note, github_export_pull_requests, \
+    github_graphql_export
+
+
+def format_documents(pull_requests):
+    documents = {}
+    format_release_note.execute(
+        pull_requests, True, True, ["label-0"], ["label-1"], ["label-2"],
+        None, None, output_options=format_release_note.OutputOptions(
+            documents=documents, report_file=io.StringIO()))
+    return documents
+
+
+def test_convert_author():
+    assert github_graphql_export.convert_author({
+        "__typename": "Bot", "login": "dependabot",
+        "url": "https://github.com/apps/dependabot"}) == {
+        "login": "dependabot[bot]",
+        "html_url": "https://github.com/apps/dependabot"}
+    assert github_graphql_export.convert_author({
+        "__typename": "User", "login": "octocat",
+        "url": "https://github.com/octocat"})["login"] == "octocat"
+    assert github_graphql_export.convert_author(None) == \
+        github_graphql_export.GHOST_USER
+
+
+def test_rest_and_graphql_exports_format_identically(search_server, tmp_path,
+                                                     monkeypatch):
+    items = bench_pipeline.generate_pull_requests(250, 5, 30, 0)
+    for item in items:
+        item["milestone"] = {"title": "Release 1.0"}
+    items[2]["user"] = {"login": "dependabot[bot]",
+                        "html_url": "https://github.com/apps/dependabot"}
+    search_server(items)
+
+    rest = github_export_pull_requests.request_pull_requests(
+        *github_export_pull_requests.build_search_parameters(
+            "o", "r", "Release 1.0"), "sort:created-desc", "token")
+
+    output = tmp_path / "githublist.json"
+    monkeypatch.setattr(sys, "argv", [
+        "github_graphql_export.py", "-o", "o", "-r", "r", "-m",
+        "Release 1.0", "-s", "created-desc", "-t", "token", "--output",
+        str(output)])
+    github_graphql_export.main()
+    with open(str(output), "r", encoding="utf8") as json_file:
+        graphql = json.load(json_file)
+
+    assert len(graphql["items"]) == len(rest["items"]) == 250
+    documents = format_documents(rest)
+    assert format_documents(graphql) == documents
+    assert "dependabot[bot]" in documents["Release 1.0-authors.md"]
@@ -0,0 +1,81 @@
+import copy
+
+from benchmarks import bench_pipeline
+from bin import github_export_pull_requests, milestone_snapshot
+
+
+def export(snapshot_file):
+    return github_export_pull_requests.request_updated_pull_requests(
+        "repo:o/r", "milestone:v1.0.0", "sort:created-asc", "token",
+        snapshot_file)
+
+
+def get_numbers(pull_requests):
+    return [item["number"] for item in pull_requests["items"]]
+
+
+def update(item, updated_at, **fields):
+    item = copy.deepcopy(item)
+    item.update(fields, updated_at=updated_at)
+    return item
+
+
+def test_merge_pull_requests():
+    snapshot = {"items": [{"number": 1, "title": "a"},
+                          {"number": 2, "title": "b"}]}
+    merged = milestone_snapshot.merge_pull_requests(
+        snapshot, {"total_count": 1, "items": [{"number": 3, "title": "c"},
+                                               {"number": 1, "title": "d"}]},
+        removed={2})
+    assert merged["items"] == [{"number": 1, "title": "d"},
+                               {"number": 3, "title": "c"}]
+    assert merged["total_count"] == 2
+
+
+def test_only_updated_pull_requests_are_requested(search_server, tmp_path):
+    items = bench_pipeline.generate_pull_requests(30, 5, 30, 0)
+    server = search_server(items)
+    snapshot_file = str(tmp_path / "snapshot.json")
+    assert get_numbers(export(snapshot_file)) == list(range(1, 31))
+
+    items[4] = update(items[4], "2021-01-01T00:00:00Z", title="Updated")
+    server.set_items(items)
+    server.queries = []
+    pull_requests = export(snapshot_file)
+    assert get_numbers(pull_requests) == list(range(1, 31))
+    assert pull_requests["items"][4]["title"] == "Updated"
+    assert all("updated:>=" in query for query, per_page in server.queries
+               if per_page > 1)
+
+
+def test_pull_request_removed_while_another_is_added(search_server,
+                                                     tmp_path):
+    items = bench_pipeline.generate_pull_requests(30, 5, 30, 0)
+    server = search_server(items)
+    snapshot_file = str(tmp_path / "snapshot.json")
+    export(snapshot_file)
+
+    # The milestone still has 30 pull requests, but not the same ones
+    items[4] = update(items[4], "2021-01-01T00:00:00Z",
+                      milestone={"title": "v2.0.0"})
+    items.append(update(items[5], "2021-01-01T00:00:00Z", number=31,
+                        created_at="2021-01-01T00:00:00Z"))
+    server.set_items(items)
+    server.queries = []
+    expected = [number for number in range(1, 32) if number != 5]
+    assert get_numbers(export(snapshot_file)) == expected
+    # The removed pull request was found without exporting everything again
+    assert all("updated:>=" in query for query, per_page in server.queries
+               if per_page > 1)
+    assert get_numbers(export(snapshot_file)) == expected
+
+
+def test_reopened_pull_request_is_removed(search_server, tmp_path):
+    items = bench_pipeline.generate_pull_requests(30, 5, 30, 0)
+    server = search_server(items)
+    snapshot_file = str(tmp_path / "snapshot.json")
+    export(snapshot_file)
+
+    items[9] = update(items[9], "2021-01-01T00:00:00Z", state="open")
+    server.set_items(items)
+    assert 10 not in get_numbers(export(snapshot_file))
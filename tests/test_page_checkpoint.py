@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+from benchmarks import bench_pipeline
+from bin import github_export_pull_requests, page_checkpoint
+
+
+def export(output, concurrency=1, resume=False):
+    return github_export_pull_requests.execute(
+        "repo:o/r", "milestone:v1.0.0", "sort:created-asc", "token",
+        output=output, concurrency=concurrency, resume=resume)
+
+
+def test_checkpoint_pages(tmp_path):
+    checkpoint = page_checkpoint.PageCheckpoint(str(tmp_path / "pages"))
+    checkpoint.save("url", 1, {"items": [1]}, True)
+    assert checkpoint.load("url", 1) == ({"items": [1]}, True)
+    assert checkpoint.load("url", 2) is None
+    assert checkpoint.load("other url", 1) is None
+
+    # A partially written page is never loaded
+    with open(checkpoint.get_path("url", 2), "w") as page_file:
+        page_file.write('{"data": {"ite')
+    assert checkpoint.load("url", 2) is None
+
+    assert page_checkpoint.PageCheckpoint(
+        str(tmp_path / "pages"), resume=True).load("url", 1)
+    assert page_checkpoint.PageCheckpoint(
+        str(tmp_path / "pages")).load("url", 1) is None
+
+
+@pytest.mark.parametrize("concurrency", [1, 4])
+def test_interrupted_export_is_resumed(search_server, tmp_path, capsys,
+                                       concurrency):
+    server = search_server(bench_pipeline.generate_pull_requests(350, 5, 30,
+                                                                 0))
+    output = str(tmp_path / "githublist.json")
+    checkpoint_dir = github_export_pull_requests.get_checkpoint_dir(output)
+
+    server.failing_pages = {3}
+    assert export(output, concurrency) is None
+    assert "can be resumed with --resume" in capsys.readouterr().out
+    assert os.path.isdir(checkpoint_dir)
+    assert not os.path.exists(output)
+
+    server.failing_pages = set()
+    server.requests = 0
+    pull_requests = export(output, concurrency, resume=True)
+    assert [item["number"] for item in pull_requests["items"]] == \
+        list(range(1, 351))
+    # Only the missing pages are requested again
+    assert server.requests == (2 if concurrency == 1 else 1)
+    assert os.path.exists(output)
+    assert not os.path.exists(checkpoint_dir)
+
+
+def test_export_without_resume_starts_over(search_server, tmp_path):
+    server = search_server(bench_pipeline.generate_pull_requests(350, 5, 30,
+                                                                 0))
+    output = str(tmp_path / "githublist.json")
+    server.failing_pages = {3}
+    export(output)
+
+    server.failing_pages = set()
+    server.requests = 0
+    assert len(export(output)["items"]) == 350
+    assert server.requests == 4
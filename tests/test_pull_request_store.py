@@ -0,0 +1,98 @@
+import pytest
+
+from bin import pull_request_store
+
+
+def make_pull_request(number, milestone="v1.0", merged=True, labels=(),
+                      login="octocat", title=None):
+    return {
+        "number": number,
+        "title": title or "Pull request {}".format(number),
+        "html_url": "https://github.com/o/r/pull/{}".format(number),
+        "labels": [{"name": label} for label in labels],
+        "user": {"login": login,
+                 "html_url": "https://github.com/{}".format(login)},
+        "milestone": {"title": milestone} if milestone else None,
+        "pull_request": {"merged_at": "2024-01-01T00:00:00Z"
+                         if merged else None},
+        "updated_at": "2024-01-01T00:00:00Z"
+    }
+
+
+@pytest.fixture
+def store():
+    with pull_request_store.PullRequestStore(":memory:") as store:
+        yield store
+
+
+def get_numbers(pull_requests):
+    return [item["number"] for item in pull_requests["items"]]
+
+
+def test_milestone_is_loaded_in_the_export_order(store):
+    store.upsert("o/r", {"items": [
+        make_pull_request(3, labels=["bug", "ui"]),
+        make_pull_request(1, merged=False),
+        make_pull_request(2, milestone="v2.0"),
+        make_pull_request(4, milestone=None)]})
+    store.upsert("o/other", {"items": [make_pull_request(5)]})
+
+    pull_requests = store.load_milestone("o/r", "V1.0")
+    assert get_numbers(pull_requests) == [3, 1]
+    assert pull_requests["items"][0]["labels"] == [{"name": "bug"},
+                                                   {"name": "ui"}]
+    assert pull_requests["items"][0]["user"] == {
+        "login": "octocat", "html_url": "https://github.com/octocat"}
+
+    merged = store.load_milestone("o/r", "v1.0", merged_only=True)
+    assert get_numbers(merged) == [3]
+    assert merged["unmerged_count"] == 1
+    assert merged["total_count"] == 2
+
+
+def test_upsert_updates_stored_pull_requests(store):
+    store.upsert("o/r", {"items": [make_pull_request(1, labels=["bug"]),
+                                   make_pull_request(2)]})
+    store.upsert("o/r", {"items": [
+        make_pull_request(2, labels=["feature"]),
+        make_pull_request(1, title="Renamed", milestone="v2.0")]})
+
+    assert get_numbers(store.load_milestone("o/r", "v1.0")) == [2]
+    moved = store.load_milestone("o/r", "v2.0")["items"][0]
+    assert moved["title"] == "Renamed"
+    assert moved["labels"] == []
+
+
+@pytest.mark.parametrize("query, indexes", [
+    (pull_request_store.LABELS_QUERY.format(""),
+     ["pull_requests_milestone", "sqlite_autoindex_labels_1"]),
+    (pull_request_store.LABELS_QUERY.format(
+        pull_request_store.MERGED_FILTER),
+     ["pull_requests_merged", "sqlite_autoindex_labels_1"]),
+    (pull_request_store.PULL_REQUESTS_QUERY.format(""),
+     ["pull_requests_milestone", "sqlite_autoindex_authors_1"]),
+    (pull_request_store.PULL_REQUESTS_QUERY.format(
+        pull_request_store.MERGED_FILTER),
+     ["pull_requests_merged", "sqlite_autoindex_authors_1"]),
+    (pull_request_store.UNMERGED_COUNT_QUERY, ["pull_requests_unmerged"])])
+def test_queries_use_the_indexes(store, query, indexes):
+    store.upsert("o/r", {"items": [make_pull_request(number, labels=["bug"])
+                                   for number in range(1, 100)]})
+    plan = [row[3] for row in store.connection.execute(
+        "EXPLAIN QUERY PLAN " + query, ("o/r", "v1.0"))]
+    searches = [step for step in plan if step.startswith("SEARCH")]
+    assert not any(step.startswith("SCAN") for step in plan)
+    assert len(searches) == len(indexes)
+    for step, index in zip(searches, indexes):
+        assert " INDEX {} (".format(index) in step
+
+
+def test_unused_labels_index_is_dropped(tmp_path):
+    database = str(tmp_path / "store.db")
+    with pull_request_store.PullRequestStore(database) as store:
+        store.connection.execute("CREATE INDEX labels_name ON labels "
+                                 "(repository, name, number)")
+    with pull_request_store.PullRequestStore(database) as store:
+        assert store.connection.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'index' AND "
+            "name = 'labels_name'").fetchone() == (0,)
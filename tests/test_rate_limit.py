@@ -0,0 +1,79 @@
+import time
+
+import pytest
+
+from bin import rate_limit
+
+
+class Response:
+    """ Stand-in for a response of the GitHub API, with its rate limit
+        headers. """
+
+    def __init__(self, url, headers):
+        self.headers = headers
+        self.request = type("Request", (), {"url": url})()
+
+
+def test_get_resource():
+    assert rate_limit.get_resource(
+        "https://api.github.com/search/issues") == "search"
+    assert rate_limit.get_resource("https://api.github.com/graphql") == \
+        "graphql"
+    assert rate_limit.get_resource(
+        "https://api.github.com/repos/o/r/pulls") == "core"
+
+
+def test_bucket_spreads_the_limit_over_the_window():
+    bucket = rate_limit.TokenBucket(2, 2)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    # The third token is only earned after a second
+    assert bucket.reserve() == pytest.approx(1, abs=0.05)
+    assert bucket.reserve() == pytest.approx(2, abs=0.05)
+
+
+def test_update_caps_the_tokens_to_the_remaining_budget():
+    limiter = rate_limit.RateLimiter()
+    limiter.update(Response("https://api.github.com/search/issues", {
+        "X-RateLimit-Limit": "30", "X-RateLimit-Remaining": "1",
+        "X-RateLimit-Reset": str(int(time.time()) + 60),
+        "X-RateLimit-Resource": "search"}))
+    bucket = limiter.buckets["search"]
+    assert bucket.tokens <= 1
+    assert bucket.reserve() == 0
+    assert bucket.reserve() > 0
+    assert limiter.format_budget() == "Rate limit budget: search 1/30"
+
+
+def test_exhausted_budget_waits_for_the_reset():
+    limiter = rate_limit.RateLimiter()
+    reset = int(time.time()) + 10
+    limiter.update(Response("https://api.github.com/repos/o/r/pulls", {
+        "X-RateLimit-Limit": "5000", "X-RateLimit-Remaining": "0",
+        "X-RateLimit-Reset": str(reset)}))
+    now = time.time()
+    wait = limiter.buckets["core"].reserve()
+    # A second is added to make sure the limit has been reset
+    assert wait == pytest.approx(reset - now + 1, abs=0.05)
+    # The whole budget is available again after the reset
+    assert limiter.buckets["core"].reserve() == pytest.approx(wait,
+                                                              abs=0.05)
+
+
+def test_unknown_resource_bucket_is_created_once():
+    limiter = rate_limit.RateLimiter()
+    headers = {"X-RateLimit-Limit": "1000", "X-RateLimit-Remaining": "999",
+               "X-RateLimit-Resource": "code_scanning_upload"}
+    limiter.update(Response("https://api.github.com/x", headers))
+    bucket = limiter.buckets["code_scanning_upload"]
+    assert bucket.limit == 1000
+    limiter.update(Response("https://api.github.com/x", dict(
+        headers, **{"X-RateLimit-Remaining": "998"})))
+    assert limiter.buckets["code_scanning_upload"] is bucket
+    assert bucket.remaining == 998
+
+
+def test_responses_without_rate_limit_headers_are_ignored():
+    limiter = rate_limit.RateLimiter()
+    limiter.update(Response("https://api.github.com/search/issues", {}))
+    assert limiter.format_budget() == "Rate limit budget: unknown"
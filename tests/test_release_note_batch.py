@@ -0,0 +1,117 @@
+import json
+import os
+
+import pytest
+
+from benchmarks import bench_pipeline
+from bin import release_note_batch
+
+FORMAT_OPTIONS = {
+    "export_authors": True, "show_pr_nb": True, "highlights": None,
+    "excl_labels": None, "incl_labels": None, "excl_words": None,
+    "incl_words": None}
+
+
+def generate_pull_requests():
+    """ Pull requests alternately associated to the v1.0.0 and v2.0.0
+        milestones. """
+
+    items = bench_pipeline.generate_pull_requests(300, 5, 30, 0)
+    for item in items[1::2]:
+        item["milestone"] = {"title": "v2.0.0"}
+    return items
+
+
+def get_targets(directory, milestones, output=None):
+    return [{"owner": "o", "repo": "r", "milestone": milestone,
+             "output": os.path.join(directory, output or milestone)}
+            for milestone in milestones]
+
+
+def test_load_manifest(tmp_path):
+    manifest_file = str(tmp_path / "manifest.json")
+    with open(manifest_file, "w", encoding="utf8") as json_file:
+        json.dump([{"owner": "o", "repo": "r", "milestone": "v1.0.0"},
+                   {"owner": "o", "repo": "r", "milestone": "v2.0.0",
+                    "output": "notes"}], json_file)
+    assert [target["output"] for target in release_note_batch.load_manifest(
+        manifest_file)] == [os.path.join("o", "r"), "notes"]
+
+    with open(manifest_file, "w", encoding="utf8") as json_file:
+        json.dump([{"owner": "o", "milestone": "v1.0.0"}], json_file)
+    with pytest.raises(ValueError):
+        release_note_batch.load_manifest(manifest_file)
+
+
+def test_milestones_of_a_repository_share_a_search(search_server, tmp_path,
+                                                   capsys):
+    items = generate_pull_requests()
+    server = search_server(items)
+    release_note_batch.execute(
+        get_targets(str(tmp_path), ["v1.0.0", "v2.0.0"]),
+        "sort:created-asc", "token", FORMAT_OPTIONS, concurrency=2, jobs=2,
+        save=True)
+
+    # A single search, covering both milestones, is sent
+    assert {query for query, _ in server.queries} == {
+        "(milestone:v1.0.0 OR milestone:v2.0.0) type:pr state:closed "
+        "repo:o/r sort:created-asc"}
+    assert server.requests == 3
+
+    out = capsys.readouterr().out
+    assert out.index("==== o/r v1.0.0 ====") < \
+        out.index("==== o/r v2.0.0 ====")
+    for milestone in ("v1.0.0", "v2.0.0"):
+        directory = os.path.join(str(tmp_path), milestone)
+        with open(os.path.join(directory, "githublist.json"), "r",
+                  encoding="utf8") as json_file:
+            exported = json.load(json_file)
+        assert [item["number"] for item in exported["items"]] == [
+            item["number"] for item in items
+            if item["milestone"]["title"] == milestone]
+        with open(os.path.join(directory,
+                               "{}-release-note.md".format(milestone)),
+                  "r", encoding="utf8") as note_file:
+            note = note_file.read()
+        for item in items:
+            merged = item["pull_request"]["merged_at"] is not None
+            assert (item["html_url"] + ")" in note) == (
+                merged and item["milestone"]["title"] == milestone)
+
+
+def test_target_that_cannot_be_exported_is_skipped(search_server, tmp_path,
+                                                   capsys):
+    server = search_server(generate_pull_requests())
+    server.failing_pages = {1}
+    release_note_batch.execute(get_targets(str(tmp_path), ["v1.0.0"]),
+                               "sort:created-asc", "token", FORMAT_OPTIONS)
+    assert "Skipped: the pull requests could not be retrieved" in \
+        capsys.readouterr().out
+    assert not os.path.exists(os.path.join(str(tmp_path), "v1.0.0"))
+
+
+def get_modification_times(directory):
+    return {os.path.join(root, filename):
+            os.stat(os.path.join(root, filename)).st_mtime_ns
+            for root, _, filenames in os.walk(directory)
+            for filename in filenames}
+
+
+def test_unchanged_targets_are_not_written_again(search_server, tmp_path,
+                                                 capsys):
+    search_server(generate_pull_requests())
+    # Both targets are formatted in parallel in the same directory
+    targets = get_targets(str(tmp_path), ["v1.0.0", "v2.0.0"], "notes")
+    release_note_batch.execute(targets, "sort:created-asc", "token",
+                               FORMAT_OPTIONS, jobs=2, skip_unchanged=True)
+    written = get_modification_times(str(tmp_path))
+    assert len(written) == 6  # 2 documents and a manifest per target
+    capsys.readouterr()
+
+    release_note_batch.execute(targets, "sort:created-asc", "token",
+                               FORMAT_OPTIONS, jobs=2, skip_unchanged=True)
+    assert get_modification_times(str(tmp_path)) == written
+    out = capsys.readouterr().out
+    for milestone in ("v1.0.0", "v2.0.0"):
+        assert "Release note of {} unchanged, no file was updated".format(
+            milestone) in out
@@ -0,0 +1,54 @@
+import os
+
+from bin import release_note_manifest
+
+
+def write_documents(directory, documents):
+    for filename, document in documents.items():
+        with open(os.path.join(directory, filename), "w",
+                  encoding="utf8") as document_file:
+            document_file.write(document)
+
+
+def test_unchanged_documents_are_not_written(tmp_path):
+    directory = str(tmp_path)
+    documents = {"v1.0-release-note.md": "note", "v1.0-authors.md": "a"}
+    manifest = release_note_manifest.ReleaseNoteManifest(directory)
+    assert not manifest.is_up_to_date("v1.0", "content")
+    assert manifest.get_changed_documents("v1.0", documents) == documents
+    write_documents(directory, documents)
+    manifest.update("v1.0", "content", documents)
+
+    manifest = release_note_manifest.ReleaseNoteManifest(directory)
+    assert manifest.is_up_to_date("v1.0", "content")
+    assert not manifest.is_up_to_date("v1.0", "other content")
+    assert manifest.get_changed_documents("v1.0", dict(
+        documents, **{"v1.0-authors.md": "b"})) == {"v1.0-authors.md": "b"}
+
+    os.remove(os.path.join(directory, "v1.0-authors.md"))
+    assert not manifest.is_up_to_date("v1.0", "content")
+
+
+def test_milestones_updated_in_parallel(tmp_path):
+    directory = str(tmp_path)
+    # Both manifests are loaded before any of them is updated, as by the
+    # worker processes of a batch sharing the same output directory
+    first = release_note_manifest.ReleaseNoteManifest(directory)
+    second = release_note_manifest.ReleaseNoteManifest(directory)
+    for manifest, milestone in ((first, "v1.0"), (second, "v2.0")):
+        assert not manifest.is_up_to_date(milestone, "content")
+    for manifest, milestone in ((first, "v1.0"), (second, "v2.0")):
+        documents = {"{}-release-note.md".format(milestone): milestone}
+        write_documents(directory, documents)
+        manifest.update(milestone, "content", documents)
+
+    manifest = release_note_manifest.ReleaseNoteManifest(directory)
+    assert manifest.is_up_to_date("v1.0", "content")
+    assert manifest.is_up_to_date("v2.0", "content")
+
+
+def test_milestone_titles_are_not_filenames(tmp_path):
+    manifest = release_note_manifest.ReleaseNoteManifest(str(tmp_path))
+    manifest.update("v1.0/rc: 1?", "content", {})
+    assert release_note_manifest.ReleaseNoteManifest(
+        str(tmp_path)).is_up_to_date("v1.0/rc: 1?", "content")
@@ -0,0 +1,150 @@
+import pickle
+import random
+
+from bin import format_release_note
+from bin.release_note_rules import HIGHLIGHTED, LABEL_EXCLUDED, \
+    LABEL_INCLUDED, REGULAR, WORD_EXCLUDED, WORD_INCLUDED, RuleSet, \
+    WordMatcher
+
+
+def build_rules(highlights=None, excl_labels=None, incl_labels=None,
+                excl_words=None, incl_words=None):
+    """ Build the rules from the command line arguments, the same way as
+        format_release_note.execute does. """
+
+    return RuleSet(
+        format_release_note.setup_highlighted_labels(highlights),
+        format_release_note.setup_labels_of_interest(excl_labels),
+        format_release_note.setup_labels_of_interest(incl_labels),
+        format_release_note.setup_words_of_interest(excl_words),
+        format_release_note.setup_words_of_interest(incl_words))
+
+
+ALL_RULES = build_rules(highlights=["feature"], excl_labels=["ci"],
+                        incl_labels=["bug"], excl_words=["refactor"],
+                        incl_words=["docs"])
+
+
+def test_regular():
+    assert ALL_RULES.classify("Update the changelog", frozenset()) == \
+        (REGULAR, None)
+    assert ALL_RULES.classify("Update the changelog",
+                              frozenset(["other"])) == (REGULAR, None)
+
+
+def test_highlighted_labels_come_first():
+    assert ALL_RULES.classify(
+        "Refactor the docs",
+        frozenset(["feature", "ci", "bug"])) == (HIGHLIGHTED, None)
+
+
+def test_excluded_labels_come_before_included_labels():
+    assert ALL_RULES.classify("Refactor the docs",
+                              frozenset(["ci", "bug"])) == \
+        (LABEL_EXCLUDED, "ci")
+
+
+def test_included_labels_come_before_words():
+    assert ALL_RULES.classify("Refactor the docs", frozenset(["bug"])) == \
+        (LABEL_INCLUDED, "bug")
+
+
+def test_excluded_words_come_before_included_words():
+    assert ALL_RULES.classify("Refactor the docs", frozenset()) == \
+        (WORD_EXCLUDED, "refactor")
+    assert ALL_RULES.classify("Fix the docs", frozenset()) == \
+        (WORD_INCLUDED, "docs")
+
+
+def test_first_label_rule_wins():
+    rules = build_rules(excl_labels=["doc", "ci,doc"])
+    assert rules.classify("Title", frozenset(["ci", "doc"])) == \
+        (LABEL_EXCLUDED, "doc")
+    rules = build_rules(excl_labels=["ci,doc", "doc"])
+    assert rules.classify("Title", frozenset(["doc"])) == \
+        (LABEL_EXCLUDED, "ci,doc")
+
+
+def test_first_word_rule_wins():
+    # The first rule wins, whatever the position of the words in the title
+    rules = build_rules(incl_words=["docs", "add,fix"])
+    assert rules.classify("Add the docs", frozenset()) == \
+        (WORD_INCLUDED, "docs")
+    rules = build_rules(incl_words=["add,fix", "docs"])
+    assert rules.classify("Update the docs, fix the tests",
+                          frozenset()) == (WORD_INCLUDED, "add,fix")
+
+
+def test_labels_are_matched_exactly():
+    rules = build_rules(excl_labels=["hotfix,docs"])
+    assert rules.classify("Title", frozenset(["fix"])) == (REGULAR, None)
+    assert rules.classify("Title", frozenset(["doc"])) == (REGULAR, None)
+    assert rules.classify("Title", frozenset(["Hotfix"])) == (REGULAR, None)
+    assert rules.classify("Title", frozenset(["docs"])) == \
+        (LABEL_EXCLUDED, "hotfix,docs")
+
+
+def test_words_are_case_insensitive():
+    rules = build_rules(excl_words=["ReFactor"])
+    assert rules.classify("REFACTOR the parser", frozenset()) == \
+        (WORD_EXCLUDED, "refactor")
+
+
+def test_words_are_searched_as_substrings():
+    rules = build_rules(excl_words=["fix"])
+    assert rules.classify("Hotfixes", frozenset()) == (WORD_EXCLUDED, "fix")
+
+
+def test_overlapping_words():
+    rules = build_rules(excl_words=["bcd"], incl_words=["abc"])
+    assert rules.classify("abcd", frozenset()) == (WORD_EXCLUDED, "bcd")
+    rules = build_rules(excl_words=["he", "she", "hers"])
+    assert rules.classify("ushers", frozenset()) == (WORD_EXCLUDED, "he")
+    rules = build_rules(excl_words=["hers", "she"])
+    assert rules.classify("ushers", frozenset()) == (WORD_EXCLUDED, "hers")
+    assert rules.classify("usher", frozenset()) == (WORD_EXCLUDED, "she")
+
+
+def test_empty_word_matches_every_title():
+    rules = build_rules(excl_words=["refactor"], incl_words=[""])
+    assert rules.classify("Anything", frozenset()) == (WORD_INCLUDED, "")
+    assert rules.classify("", frozenset()) == (WORD_INCLUDED, "")
+    assert rules.classify("Refactor", frozenset()) == \
+        (WORD_EXCLUDED, "refactor")
+
+
+def test_no_rules():
+    rules = build_rules()
+    assert rules.word_matcher is None
+    assert rules.classify("Title", frozenset(["bug"])) == (REGULAR, None)
+
+
+def test_word_matcher_finds_the_smallest_value():
+    matcher = WordMatcher([("b", 2), ("ab", 3), ("abc", 1)])
+    assert matcher.find("xabcx") == 1
+    assert matcher.find("xabx") == 2
+    assert matcher.find("xax") is None
+    assert WordMatcher([]).find("abc") is None
+
+
+def test_word_matcher_agrees_with_substring_search():
+    rng = random.Random(0)
+    for _ in range(200):
+        words = ["".join(rng.choice("ab") for _ in range(rng.randrange(4)))
+                 for _ in range(rng.randrange(1, 6))]
+        matcher = WordMatcher([(word, value)
+                               for value, word in enumerate(words)])
+        for _ in range(20):
+            text = "".join(rng.choice("abc")
+                           for _ in range(rng.randrange(10)))
+            expected = min((value for value, word in enumerate(words)
+                            if word in text), default=None)
+            assert matcher.find(text) == expected
+
+
+def test_rules_are_picklable():
+    rules = pickle.loads(pickle.dumps(ALL_RULES))
+    assert rules.classify("Refactor the docs", frozenset(["bug"])) == \
+        (LABEL_INCLUDED, "bug")
+    assert rules.classify("Refactor the docs", frozenset()) == \
+        (WORD_EXCLUDED, "refactor")
@@ -0,0 +1,210 @@
+import copy
+import hashlib
+import hmac
+import json
+import os
+import threading
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from bin import release_note_service
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+REPOSITORY = "octo-org/octo-repo"
+MILESTONE = "v1.0"
+
+FORMAT_OPTIONS = {
+    "export_authors": False, "show_pr_nb": True, "highlights": None,
+    "excl_labels": None, "incl_labels": ["documentation"],
+    "excl_words": None, "incl_words": None}
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, "{}.json".format(name)), "r",
+              encoding="utf8") as json_file:
+        return json.load(json_file)
+
+
+class StubExport:
+    """ Stand-in for the export of the milestone's pull requests from
+        GitHub, which returns the recorded search results and can run a
+        callback in the middle of the export. """
+
+    def __init__(self):
+        self.pull_requests = load_fixture("search_pull_requests")
+        self.during_export = None
+        self.calls = 0
+
+    def __call__(self, *_, **__):
+        self.calls = self.calls + 1
+        pull_requests = copy.deepcopy(self.pull_requests)
+        if self.during_export:
+            callback, self.during_export = self.during_export, None
+            callback()
+        return pull_requests
+
+
+@pytest.fixture
+def export(monkeypatch):
+    stub = StubExport()
+    monkeypatch.setattr(release_note_service.github_export_pull_requests,
+                        "request_pull_requests", stub)
+    return stub
+
+
+@pytest.fixture
+def service(export):
+    return release_note_service.ReleaseNoteService(None, "sort:updated-desc",
+                                                   FORMAT_OPTIONS)
+
+
+@pytest.fixture
+def server(service):
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0),
+                                release_note_service.ServiceHandler)
+    httpd.service = service
+    httpd.webhook_secret = None
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield "http://127.0.0.1:{}".format(httpd.server_address[1])
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def get_note(url):
+    with urllib.request.urlopen("{}/{}/{}".format(url, REPOSITORY,
+                                                  MILESTONE)) as response:
+        return response.read().decode("utf8")
+
+
+def post_event(url, payload, event="pull_request"):
+    request = urllib.request.Request(
+        "{}/webhook".format(url), data=json.dumps(payload).encode("utf8"),
+        headers={"Content-Type": "application/json",
+                 "X-GitHub-Event": event})
+    with urllib.request.urlopen(request) as response:
+        return response.read().decode("utf8")
+
+
+def render_note(service):
+    documents = service.render(REPOSITORY, MILESTONE)
+    return documents["{}-release-note.md".format(MILESTONE)]
+
+
+def test_initial_note(server):
+    regular, included = get_note(server).split("### documentation")
+    assert "Add the --pr-nb option" in regular
+    assert "Update the documentation" in regular
+    assert "Update the documentation" not in included
+    assert "Try another parser" not in regular + included
+
+
+def test_merged_event(server):
+    get_note(server)
+    assert post_event(server, load_fixture("pull_request_merged")) == \
+        "1 milestone(s) updated\n"
+    note = get_note(server)
+    assert "- Fix the parser on empty files " \
+        "[PR #4](https://github.com/octo-org/octo-repo/pull/4)\n" in note
+    assert "[hubot](https://github.com/hubot)" in note
+
+
+def test_labeled_event(server):
+    get_note(server)
+    post_event(server, load_fixture("pull_request_labeled"))
+    note = get_note(server)
+    included = note.split("### documentation\n\n")[1]
+    assert included.startswith("- Update the documentation ")
+    assert note.count("Update the documentation") == 1
+
+
+def test_milestoned_event(server):
+    get_note(server)
+    post_event(server, load_fixture("pull_request_milestoned"))
+    assert "- Speed up the export " in get_note(server)
+
+
+def test_reopened_event(server, service):
+    get_note(server)
+    post_event(server, load_fixture("pull_request_reopened"))
+    state = service.load_milestone(REPOSITORY, MILESTONE)
+    assert 3 not in state["items"]
+    assert "Try another parser" not in get_note(server)
+
+
+def test_events_in_sequence(server):
+    get_note(server)
+    for name in ("pull_request_merged", "pull_request_labeled",
+                 "pull_request_milestoned", "pull_request_reopened"):
+        post_event(server, load_fixture(name))
+    note = get_note(server)
+    for title in ("Add the --pr-nb option", "Fix the parser on empty files",
+                  "Speed up the export"):
+        assert note.split("### documentation")[0].count(title) == 1
+    assert note.split("### documentation")[1].count(
+        "Update the documentation") == 1
+
+
+def test_event_of_unknown_milestone(server, export):
+    assert post_event(server, load_fixture("pull_request_merged")) == \
+        "0 milestone(s) updated\n"
+    assert export.calls == 0
+    assert "Fix the parser on empty files" not in get_note(server)
+
+
+def test_ignored_event(server):
+    assert post_event(server, {}, event="issues") == "Ignored event issues\n"
+
+
+def test_older_event_is_ignored(service):
+    render_note(service)
+    merged = load_fixture("pull_request_merged")
+    service.handle_pull_request_event(merged)
+    older = copy.deepcopy(merged)
+    older["action"] = "reopened"
+    older["pull_request"].update(state="open", merged_at=None,
+                                 updated_at="2024-03-05T16:00:00Z")
+    assert service.handle_pull_request_event(older) == 0
+    assert "Fix the parser on empty files" in render_note(service)
+
+
+def test_event_during_first_export(service, export):
+    export.during_export = lambda: service.handle_pull_request_event(
+        load_fixture("pull_request_merged"))
+    assert "Fix the parser on empty files" in render_note(service)
+
+
+def test_event_during_refresh(service, export):
+    render_note(service)
+    export.during_export = lambda: service.handle_pull_request_event(
+        load_fixture("pull_request_milestoned"))
+    service.refresh_milestone(REPOSITORY, MILESTONE)
+    assert export.calls == 2
+    assert "Speed up the export" in render_note(service)
+
+
+def test_event_during_render(service, monkeypatch):
+    format_release_note = release_note_service.format_release_note
+    execute = format_release_note.execute
+    events = [load_fixture("pull_request_merged")]
+
+    def execute_with_event(*args, **kwargs):
+        if events:
+            service.handle_pull_request_event(events.pop())
+        return execute(*args, **kwargs)
+
+    monkeypatch.setattr(format_release_note, "execute", execute_with_event)
+    # The documents rendered before the event are served once, not kept
+    assert "Fix the parser on empty files" not in render_note(service)
+    assert "Fix the parser on empty files" in render_note(service)
+
+
+def test_check_signature():
+    body = json.dumps(load_fixture("pull_request_merged")).encode("utf8")
+    signature = "sha256={}".format(hmac.new(b"secret", body,
+                                            hashlib.sha256).hexdigest())
+    assert release_note_service.check_signature("secret", body, signature)
+    assert not release_note_service.check_signature("other", body, signature)
+    assert not release_note_service.check_signature("secret", body, None)